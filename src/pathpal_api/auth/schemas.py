@@ -14,14 +14,17 @@ class UserCreate(BaseModel):
 
 
 class UserPublic(BaseModel):
-    """Public user information schema."""
+    """Public user information schema.
+
+    Emails are plain strings here: they were validated on write and come from the database.
+    """
 
     id: UUID4
-    email: EmailStr
+    email: str
     full_name: str
     is_active: bool
     created_at: datetime
-    emergency_contacts: list[EmailStr] = []
+    emergency_contacts: list[str] = []
 
     class Config:
         from_attributes = True
@@ -50,7 +53,7 @@ class EmergencyContactResponse(BaseModel):
     """Schema for emergency contact response."""
 
     id: UUID4
-    contact_email: EmailStr
+    contact_email: str
     created_at: datetime
 
     class Config:
@@ -1,19 +1,33 @@
 """Password hashing and JWT token utilities."""
 
+import hashlib
+import time
 from datetime import UTC, datetime, timedelta
+from uuid import UUID
 
+import bcrypt
+import jwt
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
+from cachetools import TTLCache
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
-from passlib.context import CryptContext
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..database.connection import get_db
+from ..database.connection import async_session, get_db
 from ..database.models import User
 from ..settings import settings
 
-# Password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Password hasher (Argon2id)
+password_hasher = PasswordHasher(
+    time_cost=settings.PASSWORD_HASH_TIME_COST,
+    memory_cost=settings.PASSWORD_HASH_MEMORY_COST_KIB,
+    parallelism=1,
+)
+
+# Hash prefixes written by passlib's bcrypt backend before the move to Argon2id
+LEGACY_BCRYPT_PREFIXES = ("$2a$", "$2b$", "$2y$")
 
 # OAuth2 scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/token")
@@ -22,50 +36,159 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/token")
 SECRET_KEY = settings.JWT_SECRET_KEY
 ALGORITHM = settings.JWT_ALGORITHM
 ACCESS_TOKEN_EXPIRE_MINUTES = settings.ACCESS_TOKEN_EXPIRE_MINUTES
+JWT_KEY = SECRET_KEY.encode()
+JWT_ALGORITHMS = [ALGORITHM]
+JWT_DECODE_OPTIONS = {"require": ["exp", "sub"]}
+
+# Decoded token cache: blake2b(token) -> (user_id, exp), plus user_id -> User
+TOKEN_CACHE_TTL_SECONDS = 300
+_token_cache: TTLCache[bytes, tuple[str, float]] = TTLCache(
+    maxsize=10_000, ttl=TOKEN_CACHE_TTL_SECONDS
+)
+_user_cache: TTLCache[str, User] = TTLCache(maxsize=10_000, ttl=TOKEN_CACHE_TTL_SECONDS)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify a plain password against its hash."""
-    return pwd_context.verify(plain_password, hashed_password)
+    """Verify a plain password against its hash.
+
+    Accounts created before the switch to Argon2id still carry passlib bcrypt
+    hashes; those verify with bcrypt, and ``password_needs_rehash`` then flags
+    them for upgrading on login.
+    """
+    if hashed_password.startswith(LEGACY_BCRYPT_PREFIXES):
+        try:
+            # passlib silently truncated to bcrypt's 72-byte limit; match it
+            return bcrypt.checkpw(plain_password.encode()[:72], hashed_password.encode())
+        except ValueError:
+            return False
+
+    try:
+        return password_hasher.verify(hashed_password, plain_password)
+    except (VerificationError, InvalidHashError):
+        return False
 
 
 def get_password_hash(password: str) -> str:
-    """Hash a password using bcrypt."""
-    return pwd_context.hash(password)
+    """Hash a password using Argon2id."""
+    return password_hasher.hash(password)
+
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    """Check whether a hash was created with outdated Argon2 parameters."""
+    try:
+        return password_hasher.check_needs_rehash(hashed_password)
+    except InvalidHashError:
+        return True
 
 
 def create_access_token(data: dict, expires_delta: timedelta | None = None) -> str:
     """Create a JWT access token."""
     to_encode = data.copy()
+    now = datetime.now(UTC)
     if expires_delta:
-        expire = datetime.now(UTC) + expires_delta
+        expire = now + expires_delta
     else:
-        expire = datetime.now(UTC) + timedelta(minutes=15)
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+        expire = now + timedelta(minutes=15)
+    to_encode.update({"exp": expire, "iat": now})
+    encoded_jwt = jwt.encode(to_encode, JWT_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 
-async def get_user_by_id(db: AsyncSession, user_id: str) -> User | None:
+def decode_access_token(token: str) -> dict:
+    """Decode and verify a JWT access token.
+
+    Raises:
+        jwt.InvalidTokenError: If the token is malformed, expired or missing claims
+    """
+    return jwt.decode(token, JWT_KEY, algorithms=JWT_ALGORITHMS, options=JWT_DECODE_OPTIONS)
+
+
+async def get_user_by_id(db: AsyncSession, user_id: UUID) -> User | None:
     """Get user by ID from database."""
-    from uuid import UUID
+    statement = select(User).where(User.id == user_id)
+    result = await db.execute(statement)
+    return result.scalar_one_or_none()
+
+
+def user_token_claims(user: User) -> dict:
+    """Build the signed user claims embedded in an access token."""
+    return {
+        "sub": str(user.id),
+        "email": user.email,
+        "name": user.full_name,
+        "active": user.is_active,
+    }
+
+
+def _user_from_claims(payload: dict, user_id: UUID) -> User | None:
+    """Build a lightweight User from token claims, or None if the token predates them."""
+    if "email" not in payload or "name" not in payload:
+        return None
+
+    return User(
+        id=user_id,
+        email=payload["email"],
+        full_name=payload["name"],
+        is_active=payload.get("active", True),
+        hashed_password="",
+    )
+
+
+def _token_cache_key(token: str) -> bytes:
+    """Hash a raw token into a compact cache key."""
+    return hashlib.blake2b(token.encode(), digest_size=16).digest()
+
+
+def _get_cached_user(token: str) -> User | None:
+    """Return the user for a previously validated, unexpired token."""
+    key = _token_cache_key(token)
+    cached = _token_cache.get(key)
+    if cached is None:
+        return None
+
+    user_id, exp = cached
+    if exp <= time.time():
+        _token_cache.pop(key, None)
+        return None
+    return _user_cache.get(user_id)
+
+
+def _cache_user(token: str, payload: dict, user: User) -> None:
+    """Remember a validated token and its user until the cache TTL or token expiry."""
+    exp = payload.get("exp")
+    if exp is None:
+        return
+
+    user_id = str(user.id)
+    _token_cache[_token_cache_key(token)] = (user_id, float(exp))
+    # Store a detached copy so cached users never carry one request's session state
+    _user_cache[user_id] = User(**user.model_dump())
 
-    from sqlalchemy import select
 
-    # Convert string to UUID
+def clear_token_cache() -> None:
+    """Drop all cached tokens and users."""
+    _token_cache.clear()
+    _user_cache.clear()
+
+
+async def _get_user_from_payload(payload: dict) -> User | None:
+    """Resolve the user for a decoded token payload."""
+    # Parse the subject once; everything downstream works with the UUID
     try:
-        uuid_id = UUID(user_id) if isinstance(user_id, str) else user_id
+        user_id = UUID(payload["sub"])
     except ValueError:
         return None
 
-    statement = select(User).where(User.id == uuid_id)
-    result = await db.execute(statement)
-    return result.scalar_one_or_none()
+    # Signed claims carry everything handlers need; only older tokens hit the database
+    user = _user_from_claims(payload, user_id)
+    if user is not None:
+        return user
 
+    async with async_session() as db:
+        return await get_user_by_id(db, user_id=user_id)
 
-async def get_current_user(
-    token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)
-) -> User:
+
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
     """Get current authenticated user from JWT token."""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -73,40 +196,58 @@ async def get_current_user(
         headers={"WWW-Authenticate": "Bearer"},
     )
 
+    cached_user = _get_cached_user(token)
+    if cached_user is not None:
+        return cached_user
+
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = decode_access_token(token)
         user_id = payload.get("sub")
         if user_id is None:
             raise credentials_exception
-    except JWTError as e:
+    except jwt.InvalidTokenError as e:
         raise credentials_exception from e
 
-    user = await get_user_by_id(db, user_id=user_id)
+    user = await _get_user_from_payload(payload)
     if user is None:
         raise credentials_exception
+
+    _cache_user(token, payload, user)
+    return user
+
+
+async def get_current_user_full(
+    current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)
+) -> User:
+    """Get current user loaded from the database rather than token claims."""
+    user = await db.get(User, current_user.id)
+    if user is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
     return user
 
 
 async def authenticate_websocket_token(token: str) -> User:
     """Authenticate JWT token for WebSocket connections."""
-    from ..database.connection import async_session
     from ..features.websockets.exceptions import WebSocketAuthError
 
     if not token:
         raise WebSocketAuthError("Token is required")
 
+    cached_user = _get_cached_user(token)
+    if cached_user is not None:
+        return cached_user
+
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = decode_access_token(token)
         user_id = payload.get("sub")
         if user_id is None:
             raise WebSocketAuthError("Invalid token payload")
-    except JWTError:
+    except jwt.InvalidTokenError:
         raise WebSocketAuthError("Invalid token")
 
-    # Get user from database
-    async with async_session() as db:
-        user = await get_user_by_id(db, user_id=user_id)
-        if user is None:
-            raise WebSocketAuthError("User not found")
+    user = await _get_user_from_payload(payload)
+    if user is None:
+        raise WebSocketAuthError("User not found")
 
+    _cache_user(token, payload, user)
     return user
@@ -1,14 +1,23 @@
 """Authentication service functions for database operations."""
 
+import os
 from datetime import UTC, datetime
+from uuid import UUID, uuid4
 
-from sqlalchemy import select
+from anyio import CapacityLimiter, to_thread
+from sqlalchemy import Insert, delete, select
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
 from ..database.models import EmergencyContact, User
+from .exceptions import UserAlreadyExistsException, UserNotFoundException
 from .schemas import UserCreate
-from .security import get_password_hash, verify_password
+from .security import get_password_hash, password_needs_rehash, verify_password
+
+# Password hashing is CPU-bound; run it off the event loop, at most one hash per core
+password_hash_limiter = CapacityLimiter(os.cpu_count() or 1)
 
 
 async def get_user_by_email(db: AsyncSession, email: str) -> User | None:
@@ -18,26 +27,31 @@ async def get_user_by_email(db: AsyncSession, email: str) -> User | None:
     return result.scalar_one_or_none()
 
 
-async def get_user_by_id(db: AsyncSession, user_id: str) -> User | None:
+async def get_user_by_id(db: AsyncSession, user_id: UUID) -> User | None:
     """Get user by ID with emergency contacts."""
-    from uuid import UUID
-
-    # Convert string to UUID
-    try:
-        uuid_id = UUID(user_id) if isinstance(user_id, str) else user_id
-    except ValueError:
-        return None
-
     statement = (
-        select(User).where(User.id == uuid_id).options(selectinload(User.emergency_contacts))
+        select(User).where(User.id == user_id).options(selectinload(User.emergency_contacts))
     )
     result = await db.execute(statement)
     return result.scalar_one_or_none()
 
 
+def _insert(db: AsyncSession, model: type) -> Insert:
+    """Build a dialect-specific INSERT that supports ON CONFLICT clauses."""
+    if db.get_bind().dialect.name == "postgresql":
+        return postgresql_insert(model)
+    return sqlite_insert(model)
+
+
 async def create_user(db: AsyncSession, user_create: UserCreate) -> User:
-    """Create a new user."""
-    hashed_password = get_password_hash(user_create.password)
+    """Create a new user.
+
+    Raises:
+        UserAlreadyExistsException: If the email is already registered
+    """
+    hashed_password = await to_thread.run_sync(
+        get_password_hash, user_create.password, limiter=password_hash_limiter
+    )
 
     db_user = User(
         email=user_create.email,
@@ -47,9 +61,18 @@ async def create_user(db: AsyncSession, user_create: UserCreate) -> User:
         created_at=datetime.now(UTC),
     )
 
-    db.add(db_user)
+    # Single atomic insert; no returned id means the email is already registered
+    statement = (
+        _insert(db, User)
+        .values(**db_user.model_dump())
+        .on_conflict_do_nothing(index_elements=["email"])
+        .returning(User.id)
+    )
+    result = await db.execute(statement)
+    if result.scalar_one_or_none() is None:
+        await db.rollback()
+        raise UserAlreadyExistsException(f"User with email {user_create.email} already exists")
     await db.commit()
-    await db.refresh(db_user)
 
     return db_user
 
@@ -59,61 +82,72 @@ async def authenticate_user(db: AsyncSession, email: str, password: str) -> User
     user = await get_user_by_email(db, email)
     if not user:
         return None
-    if not verify_password(password, user.hashed_password):
+    is_valid = await to_thread.run_sync(
+        verify_password, password, user.hashed_password, limiter=password_hash_limiter
+    )
+    if not is_valid:
         return None
+
+    # Lazily upgrade hashes created with older Argon2 parameters
+    if password_needs_rehash(user.hashed_password):
+        user.hashed_password = await to_thread.run_sync(
+            get_password_hash, password, limiter=password_hash_limiter
+        )
+        await db.commit()
     return user
 
 
-async def add_emergency_contact(db: AsyncSession, user_id: str, contact_email: str) -> User:
-    """Add emergency contact for user."""
-    from uuid import UUID
+async def get_emergency_contact_emails(db: AsyncSession, user_id: UUID) -> list[str]:
+    """Get a user's emergency contact emails without loading full contact rows."""
+    statement = select(EmergencyContact.contact_email).where(EmergencyContact.user_id == user_id)
+    result = await db.execute(statement)
+    return list(result.scalars())
 
-    # Convert string to UUID
-    try:
-        uuid_id = UUID(user_id) if isinstance(user_id, str) else user_id
-    except ValueError as e:
-        raise ValueError("Invalid user ID format") from e
 
-    # Check if contact already exists
-    existing_result = await db.execute(
-        select(EmergencyContact).where(
-            EmergencyContact.user_id == uuid_id, EmergencyContact.contact_email == contact_email
-        )
-    )
-    existing_contact = existing_result.scalar_one_or_none()
+async def _get_user_with_contact_emails(db: AsyncSession, user_id: UUID) -> tuple[User, list[str]]:
+    """Load user and their emergency contact emails.
 
-    if not existing_contact:
-        emergency_contact = EmergencyContact(
-            user_id=uuid_id, contact_email=contact_email, created_at=datetime.now(UTC)
-        )
-        db.add(emergency_contact)
-        await db.commit()
+    Raises:
+        UserNotFoundException: If the user was deleted after their token was issued
+    """
+    user = await db.get(User, user_id)
+    if user is None:
+        await db.rollback()
+        raise UserNotFoundException(f"User {user_id} not found")
+    return user, await get_emergency_contact_emails(db, user_id)
 
-    # Return updated user with emergency contacts
-    updated_user = await get_user_by_id(db, user_id)
-    return updated_user
 
+async def add_emergency_contact(
+    db: AsyncSession, user_id: UUID, contact_email: str
+) -> tuple[User, list[str]]:
+    """Add emergency contact for user, returning the user and updated contact emails."""
+    # Insert unless the contact already exists (uq_user_contact)
+    statement = (
+        _insert(db, EmergencyContact)
+        .values(
+            id=uuid4(), user_id=user_id, contact_email=contact_email, created_at=datetime.now(UTC)
+        )
+        .on_conflict_do_nothing(index_elements=["user_id", "contact_email"])
+    )
+    await db.execute(statement)
 
-async def remove_emergency_contact(db: AsyncSession, user_id: str, contact_email: str) -> User:
-    """Remove emergency contact for user."""
-    from uuid import UUID
+    # Return updated user with emergency contacts
+    updated_user, contact_emails = await _get_user_with_contact_emails(db, user_id)
+    await db.commit()
+    return updated_user, contact_emails
 
-    # Convert string to UUID
-    try:
-        uuid_id = UUID(user_id) if isinstance(user_id, str) else user_id
-    except ValueError as e:
-        raise ValueError("Invalid user ID format") from e
 
-    statement = select(EmergencyContact).where(
-        EmergencyContact.user_id == uuid_id, EmergencyContact.contact_email == contact_email
+async def remove_emergency_contact(
+    db: AsyncSession, user_id: UUID, contact_email: str
+) -> tuple[User, list[str]]:
+    """Remove emergency contact for user, returning the user and updated contact emails."""
+    await db.execute(
+        delete(EmergencyContact).where(
+            EmergencyContact.user_id == user_id, EmergencyContact.contact_email == contact_email
+        )
     )
-    result = await db.execute(statement)
-    contact = result.scalar_one_or_none()
-
-    if contact:
-        await db.delete(contact)
-        await db.commit()
 
     # Return updated user with emergency contacts
-    updated_user = await get_user_by_id(db, user_id)
-    return updated_user
+    updated_user, contact_emails = await _get_user_with_contact_emails(db, user_id)
+    await db.commit()
+    return updated_user, contact_emails
@@ -1,20 +1,32 @@
 """Database connection and engine configuration."""
 
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import Connection, inspect, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlmodel import SQLModel
 
 from ..settings import settings
 
+# Connection pool sizing (SQLite uses its own single-connection pools)
+pool_options = (
+    {}
+    if settings.DATABASE_URL.startswith("sqlite")
+    else {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+    }
+)
+
 # Create async engine
 engine = create_async_engine(
     settings.DATABASE_URL,
     echo=False,  # Set to True for SQL debugging
     future=True,
+    **pool_options,
 )
 
 # Create session factory
-async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+async_session = async_sessionmaker(engine, expire_on_commit=False)
 
 
 async def init_db() -> None:
@@ -23,16 +35,62 @@ async def init_db() -> None:
         # Import all models to ensure they're registered
         from . import models  # noqa: F401
 
-        # Create all tables
+        # Create all tables, then bring tables from older releases up to date
         await conn.run_sync(SQLModel.metadata.create_all)
+        await conn.run_sync(upgrade_schema)
+
+
+def upgrade_schema(connection: Connection) -> None:
+    """Apply schema changes that ``create_all`` skips on tables that already exist.
+
+    ``create_all`` only creates missing tables, so columns, constraints and indexes
+    added to existing tables are applied here. Each step checks before changing
+    anything, so this is safe to run on every startup.
+    """
+    inspector = inspect(connection)
+
+    # Trips store decoded route coordinates alongside the encoded polyline
+    trip_columns = {column["name"] for column in inspector.get_columns("trips")}
+    if "route_coordinates" not in trip_columns:
+        connection.execute(text("ALTER TABLE trips ADD COLUMN route_coordinates JSON"))
+
+    # Emergency contact upserts rely on ON CONFLICT (user_id, contact_email)
+    contact_uniques = {
+        constraint["name"] for constraint in inspector.get_unique_constraints("emergency_contacts")
+    } | {index["name"] for index in inspector.get_indexes("emergency_contacts") if index["unique"]}
+    if "uq_user_contact" not in contact_uniques:
+        # Keep one row per duplicated contact so the unique index can be built
+        connection.execute(
+            text(
+                "DELETE FROM emergency_contacts WHERE EXISTS ("
+                "SELECT 1 FROM emergency_contacts AS kept"
+                " WHERE kept.user_id = emergency_contacts.user_id"
+                " AND kept.contact_email = emergency_contacts.contact_email"
+                " AND kept.id < emergency_contacts.id)"
+            )
+        )
+        connection.execute(
+            text(
+                "CREATE UNIQUE INDEX uq_user_contact ON emergency_contacts (user_id, contact_email)"
+            )
+        )
+
+    # Indexes declared on the models, e.g. the trip listing index
+    for table in SQLModel.metadata.sorted_tables:
+        existing_indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing_indexes:
+                index.create(connection)
 
 
 async def get_db() -> AsyncSession:
-    """Get database session."""
+    """Get database session.
+
+    Services commit their own writes, so read-only requests never pay for a COMMIT.
+    """
     async with async_session() as session:
         try:
             yield session
-            await session.commit()
         except Exception:
             await session.rollback()
             raise
@@ -5,6 +5,7 @@ from enum import Enum
 from typing import TYPE_CHECKING
 from uuid import UUID, uuid4
 
+from sqlalchemy import JSON, Column, Index, UniqueConstraint
 from sqlmodel import Field, Relationship, SQLModel
 
 if TYPE_CHECKING:
@@ -31,7 +32,7 @@ class User(SQLModel, table=True):
 
     id: UUID = Field(default_factory=uuid4, primary_key=True)
     email: str = Field(unique=True, index=True, max_length=254)
-    hashed_password: str = Field(max_length=128)
+    hashed_password: str = Field(max_length=255)
     full_name: str = Field(max_length=50)
     is_active: bool = Field(default=True)
     created_at: datetime = Field(default_factory=utcnow)
@@ -47,6 +48,7 @@ class EmergencyContact(SQLModel, table=True):
     """Emergency contact model linked to users."""
 
     __tablename__ = "emergency_contacts"
+    __table_args__ = (UniqueConstraint("user_id", "contact_email", name="uq_user_contact"),)
 
     id: UUID = Field(default_factory=uuid4, primary_key=True)
     user_id: UUID = Field(foreign_key="users.id")
@@ -61,6 +63,8 @@ class Trip(SQLModel, table=True):
     """Core trip model with route information."""
 
     __tablename__ = "trips"
+    # Serves trip listing, newest first, for both offset and (created_at, id) keyset pages
+    __table_args__ = (Index("ix_trips_owner_created_at_id", "owner_id", "created_at", "id"),)
 
     id: UUID = Field(default_factory=uuid4, primary_key=True)
     owner_id: UUID = Field(foreign_key="users.id")
@@ -74,6 +78,8 @@ class Trip(SQLModel, table=True):
 
     # Route information from Mapbox
     route_geometry: str = Field()  # Polyline-encoded route
+    # Decoded [[lat, lon], ...] pairs, stored once so reads skip decoding
+    route_coordinates: list[list[float]] | None = Field(default=None, sa_column=Column(JSON))
     distance_meters: int = Field(ge=0)
     duration_seconds: int = Field(ge=0)
     travel_mode: TravelMode = Field(default=TravelMode.WALKING)
@@ -130,3 +136,16 @@ class Alert(SQLModel, table=True):
 
     # Relationships
     user: User = Relationship(back_populates="alerts")
+
+
+class LocationHistory(SQLModel, table=True):
+    """Location point shared during a trip, kept for route analysis."""
+
+    __tablename__ = "location_history"
+
+    id: UUID = Field(default_factory=uuid4, primary_key=True)
+    trip_id: UUID = Field(foreign_key="trips.id", index=True)
+    user_id: UUID = Field(foreign_key="users.id")
+    latitude: float = Field(ge=-90.0, le=90.0)
+    longitude: float = Field(ge=-180.0, le=180.0)
+    recorded_at: datetime = Field(default_factory=utcnow)
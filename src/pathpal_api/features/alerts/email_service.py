@@ -1,38 +1,136 @@
 """Emergency email notification service."""
 
+import asyncio
 import logging
-from typing import List
+from email.message import EmailMessage
+from pathlib import Path
 
-from fastapi_mail import ConnectionConfig, FastMail, MessageSchema
+import aiosmtplib
+from fastapi_mail import ConnectionConfig
+from jinja2 import Environment, FileSystemLoader
 
 from ...settings import settings
 from .exceptions import EmailNotificationError
 
 logger = logging.getLogger(__name__)
 
+# SMTP configuration shared by every email service instance
+mail_config = ConnectionConfig(
+    MAIL_USERNAME=settings.SMTP_USERNAME,
+    MAIL_PASSWORD=settings.SMTP_PASSWORD,
+    MAIL_FROM=settings.SMTP_FROM_EMAIL,
+    MAIL_PORT=settings.SMTP_PORT,
+    MAIL_SERVER=settings.SMTP_SERVER,
+    MAIL_STARTTLS=settings.SMTP_STARTTLS,
+    MAIL_SSL_TLS=settings.SMTP_SSL_TLS,
+    USE_CREDENTIALS=True,
+    VALIDATE_CERTS=True,
+)
+
+# Templates are static; compile them once at import instead of on every alert
+TEMPLATE_FOLDER = Path(__file__).parent / "templates"
+template_env = Environment(loader=FileSystemLoader(TEMPLATE_FOLDER), auto_reload=False)
+emergency_alert_template = template_env.get_template("emergency_alert.html")
+
+
+class SMTPConnectionPool:
+    """Small pool of long-lived SMTP connections reused across alert emails.
+
+    Opening a connection costs a TCP + TLS handshake and a login; keeping a few
+    open means only alerts that find every connection busy pay it, while
+    concurrent alerts still send in parallel instead of queueing on one session.
+    """
+
+    def __init__(self, config: ConnectionConfig, max_connections: int = 4):
+        """Initialize the pool without connecting."""
+        self.config = config
+        self._idle: list[aiosmtplib.SMTP] = []
+        self._slots = asyncio.Semaphore(max_connections)
+
+    async def _connect(self) -> aiosmtplib.SMTP:
+        """Open and authenticate a new SMTP session."""
+        client = aiosmtplib.SMTP(
+            hostname=self.config.MAIL_SERVER,
+            port=self.config.MAIL_PORT,
+            use_tls=self.config.MAIL_SSL_TLS,
+            start_tls=self.config.MAIL_STARTTLS,
+            validate_certs=self.config.VALIDATE_CERTS,
+            timeout=self.config.TIMEOUT,
+        )
+        await client.connect()
+        if self.config.USE_CREDENTIALS:
+            try:
+                await client.login(
+                    self.config.MAIL_USERNAME, self.config.MAIL_PASSWORD.get_secret_value()
+                )
+            except BaseException:
+                client.close()
+                raise
+        return client
+
+    async def send_message(self, message: EmailMessage) -> None:
+        """Send a message over an idle pooled connection, reconnecting if it was dropped."""
+        if self.config.SUPPRESS_SEND:
+            return
+
+        async with self._slots:
+            client = self._idle.pop() if self._idle else None
+            if client is None or not client.is_connected:
+                client = await self._connect()
+
+            try:
+                try:
+                    await client.send_message(message)
+                except aiosmtplib.SMTPServerDisconnected:
+                    # Server closed the idle connection; reconnect once and retry
+                    client = await self._connect()
+                    await client.send_message(message)
+            except BaseException:
+                # The connection won't go back to the pool, so don't leave it open
+                client.close()
+                raise
+
+            # Only connections that just sent successfully go back to the pool
+            self._idle.append(client)
+
+    async def close(self) -> None:
+        """Close every idle pooled connection."""
+        idle, self._idle = self._idle, []
+        for client in idle:
+            if client.is_connected:
+                try:
+                    await client.quit()
+                except aiosmtplib.SMTPException:
+                    client.close()
+
 
 class EmergencyEmailService:
     """Service for sending emergency alert emails to contacts."""
 
-    def __init__(self):
-        """Initialize email service with SMTP configuration."""
-        self.conf = ConnectionConfig(
-            MAIL_USERNAME=settings.SMTP_USERNAME,
-            MAIL_PASSWORD=settings.SMTP_PASSWORD,
-            MAIL_FROM=settings.SMTP_FROM_EMAIL,
-            MAIL_PORT=settings.SMTP_PORT,
-            MAIL_SERVER=settings.SMTP_SERVER,
-            MAIL_STARTTLS=settings.SMTP_STARTTLS,
-            MAIL_SSL_TLS=settings.SMTP_SSL_TLS,
-            USE_CREDENTIALS=True,
-            VALIDATE_CERTS=True,
-            TEMPLATE_FOLDER="src/pathpal_api/features/alerts/templates",
-        )
-        self.fast_mail = FastMail(self.conf)
+    def __init__(self, smtp_pool: SMTPConnectionPool):
+        """Initialize email service with a shared SMTP connection pool."""
+        self.conf = mail_config
+        self.smtp_pool = smtp_pool
+
+    def _build_message(
+        self, subject: str, recipient_emails: list[str], html_body: str
+    ) -> EmailMessage:
+        """Build an HTML email message from the configured sender.
+
+        Contacts are Bcc'd on a single message so the SMTP server fans it out in
+        one transaction and contacts don't see each other's addresses.
+        """
+        message = EmailMessage()
+        message["Subject"] = subject
+        message["From"] = self.conf.MAIL_FROM
+        message["To"] = self.conf.MAIL_FROM
+        message["Bcc"] = ", ".join(recipient_emails)
+        message.set_content(html_body, subtype="html")
+        return message
 
     async def send_emergency_alert(
         self,
-        recipient_emails: List[str],
+        recipient_emails: list[str],
         user_name: str,
         location_lat: float,
         location_lon: float,
@@ -40,7 +138,7 @@ class EmergencyEmailService:
         timestamp: str,
     ) -> bool:
         """Send emergency alert emails to all emergency contacts.
-        
+
         Args:
             recipient_emails: List of emergency contact email addresses
             user_name: Full name of the user who triggered alert
@@ -48,10 +146,10 @@ class EmergencyEmailService:
             location_lon: User's longitude coordinate
             ai_analysis: AI-generated situation analysis
             timestamp: ISO timestamp when alert was created
-            
+
         Returns:
             True if email was sent successfully
-            
+
         Raises:
             EmailNotificationError: If email sending fails
         """
@@ -67,20 +165,14 @@ class EmergencyEmailService:
             "timestamp": timestamp,
         }
 
-        message = MessageSchema(
-            subject=f"🚨 EMERGENCY ALERT - {user_name}",
-            recipients=recipient_emails,
-            template_body=template_data,
-            subtype="html",
-        )
-
         try:
-            await self.fast_mail.send_message(
-                message, template_name="emergency_alert.html"
-            )
-            logger.info(
-                f"Emergency alert sent to {len(recipient_emails)} contacts for {user_name}"
+            message = self._build_message(
+                subject=f"🚨 EMERGENCY ALERT - {user_name}",
+                recipient_emails=recipient_emails,
+                html_body=emergency_alert_template.render(**template_data),
             )
+            await self.smtp_pool.send_message(message)
+            logger.info(f"Emergency alert sent to {len(recipient_emails)} contacts for {user_name}")
             return True
         except Exception as e:
             logger.error(f"Failed to send emergency alert: {e}")
@@ -88,24 +180,24 @@ class EmergencyEmailService:
 
     async def send_fallback_alert(
         self,
-        recipient_emails: List[str],
+        recipient_emails: list[str],
         user_name: str,
         location_lat: float,
         location_lon: float,
         timestamp: str,
     ) -> bool:
         """Send basic alert when AI processing fails.
-        
+
         Args:
             recipient_emails: List of emergency contact email addresses
             user_name: Full name of the user who triggered alert
             location_lat: User's latitude coordinate
             location_lon: User's longitude coordinate
             timestamp: ISO timestamp when alert was created
-            
+
         Returns:
             True if email was sent successfully
-            
+
         Raises:
             EmailNotificationError: If email sending fails
         """
@@ -120,17 +212,16 @@ class EmergencyEmailService:
         <p><em>Audio analysis was unavailable - please contact immediately.</em></p>
         """
 
-        message = MessageSchema(
+        message = self._build_message(
             subject=f"🚨 EMERGENCY ALERT - {user_name}",
-            recipients=recipient_emails,
-            body=html_body,
-            subtype="html",
+            recipient_emails=recipient_emails,
+            html_body=html_body,
         )
 
         try:
-            await self.fast_mail.send_message(message)
+            await self.smtp_pool.send_message(message)
             logger.info(f"Fallback alert sent to {len(recipient_emails)} contacts")
             return True
         except Exception as e:
             logger.error(f"Failed to send fallback alert: {e}")
-            raise EmailNotificationError(f"Fallback email failed: {str(e)}")
\ No newline at end of file
+            raise EmailNotificationError(f"Fallback email failed: {str(e)}")
@@ -8,9 +8,11 @@ from fastapi import (
     File,
     Form,
     HTTPException,
+    Request,
     UploadFile,
     status,
 )
+from pydantic import TypeAdapter
 from sqlmodel.ext.asyncio.session import AsyncSession
 
 from ...auth.security import get_current_user
@@ -23,16 +25,35 @@ from .services import get_user_alert_history, process_emergency_alert
 
 router = APIRouter(prefix="/alerts", tags=["Emergency Alerts"])
 
+MAX_AUDIO_FILE_BYTES = 25 * 1024 * 1024  # 25MB OpenAI limit
+AUDIO_READ_CHUNK_BYTES = 1024 * 1024
+VALID_AUDIO_TYPES = frozenset(
+    {
+        "audio/wav",
+        "audio/wave",
+        "audio/x-wav",
+        "audio/mpeg",
+        "audio/mp3",
+        "audio/x-mp3",
+        "audio/mp4",
+        "audio/x-mp4a",
+        "audio/webm",
+    }
+)
+
+# Validate history rows in one call into the compiled validator
+alert_history_adapter = TypeAdapter(list[AlertHistoryResponse])
+
 
 # Dependency injection following existing patterns
-def get_openai_client() -> OpenAIAlertClient:
+async def get_openai_client(request: Request) -> OpenAIAlertClient:
     """Get OpenAI client dependency."""
-    return OpenAIAlertClient()
+    return request.app.state.openai_alert_client
 
 
-def get_email_service() -> EmergencyEmailService:
+async def get_email_service(request: Request) -> EmergencyEmailService:
     """Get email service dependency."""
-    return EmergencyEmailService()
+    return request.app.state.email_service
 
 
 @router.post("/emergency", response_model=AlertResponse, status_code=status.HTTP_202_ACCEPTED)
@@ -81,14 +102,9 @@ async def create_emergency_alert(
         )
 
     # Read audio data into memory (privacy: no temp files)
-    try:
-        audio_data = await audio_file.read()
-        if len(audio_data) == 0:
-            raise HTTPException(status_code=400, detail="Empty audio file")
-        if len(audio_data) > 25 * 1024 * 1024:  # 25MB OpenAI limit
-            raise HTTPException(status_code=413, detail="Audio file too large (max 25MB)")
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Audio file processing error: {str(e)}")
+    audio_data = await _read_audio_file(audio_file)
+    if len(audio_data) == 0:
+        raise HTTPException(status_code=400, detail="Empty audio file")
 
     # Add background task for processing (immediate response to user)
     background_tasks.add_task(
@@ -112,6 +128,35 @@ async def create_emergency_alert(
     )
 
 
+async def _read_audio_file(file: UploadFile) -> bytearray:
+    """Read an uploaded audio file in chunks, stopping as soon as it exceeds the limit.
+
+    Args:
+        file: Uploaded audio file
+
+    Returns:
+        Audio bytes read from the upload
+
+    Raises:
+        HTTPException: If the file is too large or cannot be read
+    """
+    if file.size is not None and file.size > MAX_AUDIO_FILE_BYTES:
+        raise HTTPException(status_code=413, detail="Audio file too large (max 25MB)")
+
+    audio_data = bytearray()
+    try:
+        while chunk := await file.read(AUDIO_READ_CHUNK_BYTES):
+            audio_data += chunk
+            if len(audio_data) > MAX_AUDIO_FILE_BYTES:
+                raise HTTPException(status_code=413, detail="Audio file too large (max 25MB)")
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Audio file processing error: {str(e)}")
+
+    return audio_data
+
+
 def _is_valid_audio_file(file: UploadFile) -> bool:
     """Validate audio file type and content.
 
@@ -124,19 +169,7 @@ def _is_valid_audio_file(file: UploadFile) -> bool:
     if not file.content_type:
         return False
 
-    valid_types = [
-        "audio/wav",
-        "audio/wave",
-        "audio/x-wav",
-        "audio/mpeg",
-        "audio/mp3",
-        "audio/x-mp3",
-        "audio/mp4",
-        "audio/x-mp4a",
-        "audio/webm",
-    ]
-
-    return file.content_type.lower() in valid_types
+    return file.content_type.lower() in VALID_AUDIO_TYPES
 
 
 @router.get("/history", response_model=list[AlertHistoryResponse])
@@ -156,4 +189,4 @@ async def get_alert_history(
         List of user's alert history, most recent first
     """
     alerts = await get_user_alert_history(db, current_user.id, limit)
-    return [AlertHistoryResponse.model_validate(alert) for alert in alerts]
+    return alert_history_adapter.validate_python(alerts, from_attributes=True)
@@ -9,6 +9,42 @@ from openai import AsyncOpenAI
 from ...settings import settings
 from .exceptions import AnalysisError, TranscriptionError
 
+ANALYSIS_SYSTEM_MESSAGE = {
+    "role": "system",
+    "content": "You are a security expert analyzing emergency audio.",
+}
+
+ANALYSIS_COMPLETION_OPTIONS = {
+    "model": "gpt-4o-mini",  # Optimized for speed and cost
+    "max_tokens": 100,
+    "temperature": 0.1,  # Low temperature for consistent analysis
+}
+
+# The instructions never change; only the transcript is substituted per alert
+ANALYSIS_PROMPT_TEMPLATE = """
+You are a security expert analyzing an audio transcript from a user's emergency alert.
+Your task is to provide a concise, one-sentence summary of the situation for an emergency contact.
+Do not be conversational. Be direct and factual.
+Focus on signs of distress, key words (like "help," "stop," "go away"), and any contextual clues (like "he's following me," "I'm near the library").
+If the audio is unclear or benign (e.g., background noise, pocket dial), state that "The situation is unclear from the audio."
+
+Transcript: "{}"
+
+One-sentence summary:
+"""
+
+
+class NamedBytesIO(BytesIO):
+    """In-memory audio file carrying the filename the OpenAI SDK sends with uploads.
+
+    Rewind with ``seek(0)`` to re-send the same upload instead of rebuilding it.
+    """
+
+    def __init__(self, data: bytes | bytearray, name: str):
+        """Wrap audio bytes under the given filename."""
+        super().__init__(data)
+        self.name = name
+
 
 class OpenAIAlertClient:
     """Async OpenAI client for audio transcription and emergency analysis."""
@@ -20,7 +56,7 @@ class OpenAIAlertClient:
             http_client=http_client,
         )
 
-    async def transcribe_audio(self, audio_data: bytes, filename: str) -> str:
+    async def transcribe_audio(self, audio_data: bytes | bytearray, filename: str) -> str:
         """Transcribe audio using OpenAI Whisper API.
 
         Args:
@@ -34,19 +70,16 @@ class OpenAIAlertClient:
             TranscriptionError: If transcription fails or times out
         """
         try:
-            # Create file-like object from bytes
-            audio_file = BytesIO(audio_data)
-            audio_file.name = filename  # OpenAI requires filename attribute
+            # Create file-like object from bytes; OpenAI requires the filename attribute
+            audio_file = NamedBytesIO(audio_data, filename)
 
-            response = await asyncio.wait_for(
-                self.client.audio.transcriptions.create(
+            async with asyncio.timeout(30.0):  # 30 second timeout
+                response = await self.client.audio.transcriptions.create(
                     model="whisper-1",
                     file=audio_file,
                     language="en",  # Can be made configurable
                     response_format="text",
-                ),
-                timeout=30.0,  # 30 second timeout
-            )
+                )
 
             return response.strip() if response else ""
 
@@ -73,21 +106,11 @@ class OpenAIAlertClient:
         prompt = self._create_analysis_prompt(transcript)
 
         try:
-            response = await asyncio.wait_for(
-                self.client.chat.completions.create(
-                    model="gpt-4o-mini",  # Optimized for speed and cost
-                    messages=[
-                        {
-                            "role": "system",
-                            "content": "You are a security expert analyzing emergency audio.",
-                        },
-                        {"role": "user", "content": prompt},
-                    ],
-                    max_tokens=100,
-                    temperature=0.1,  # Low temperature for consistent analysis
-                ),
-                timeout=10.0,  # 10 second timeout
-            )
+            async with asyncio.timeout(10.0):  # 10 second timeout
+                response = await self.client.chat.completions.create(
+                    messages=[ANALYSIS_SYSTEM_MESSAGE, {"role": "user", "content": prompt}],
+                    **ANALYSIS_COMPLETION_OPTIONS,
+                )
 
             return response.choices[0].message.content.strip()
 
@@ -98,14 +121,4 @@ class OpenAIAlertClient:
 
     def _create_analysis_prompt(self, transcript: str) -> str:
         """Create optimized prompt for emergency analysis."""
-        return f"""
-You are a security expert analyzing an audio transcript from a user's emergency alert.
-Your task is to provide a concise, one-sentence summary of the situation for an emergency contact.
-Do not be conversational. Be direct and factual.
-Focus on signs of distress, key words (like "help," "stop," "go away"), and any contextual clues (like "he's following me," "I'm near the library").
-If the audio is unclear or benign (e.g., background noise, pocket dial), state that "The situation is unclear from the audio."
-
-Transcript: "{transcript}"
-
-One-sentence summary:
-"""
+        return ANALYSIS_PROMPT_TEMPLATE.format(transcript)
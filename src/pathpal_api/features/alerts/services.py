@@ -1,24 +1,31 @@
 """Core alert processing service with fail-safe logic."""
 
+import asyncio
 import logging
+from collections.abc import Sequence
 from datetime import UTC, datetime
+from operator import attrgetter
+from typing import Any
 from uuid import UUID
 
-from sqlalchemy import select
+from sqlalchemy import insert, select, update
+from sqlmodel import col
 from sqlmodel.ext.asyncio.session import AsyncSession
 
-from ...database.models import Alert, EmergencyContact, User
+from ...database.models import Alert, EmergencyContact, User, utcnow
 from .email_service import EmergencyEmailService
 from .exceptions import AlertProcessingError
 from .openai_client import OpenAIAlertClient
 
 logger = logging.getLogger(__name__)
 
+get_contact_email = attrgetter("contact_email")
+
 
 async def process_emergency_alert(
     db: AsyncSession,
     user: User,
-    audio_data: bytes,
+    audio_data: bytes | bytearray,
     filename: str,
     latitude: float,
     longitude: float,
@@ -45,24 +52,43 @@ async def process_emergency_alert(
     """
     timestamp = datetime.now(UTC).isoformat()
 
-    # Get emergency contacts
-    emergency_contacts = await _get_user_emergency_contacts(db, user.id)
-    if not emergency_contacts:
-        raise AlertProcessingError("No emergency contacts configured")
+    # Start the Whisper upload now so it overlaps the contacts lookup
+    transcription = asyncio.create_task(openai_client.transcribe_audio(audio_data, filename))
+
+    try:
+        # Get emergency contacts
+        emergency_contacts = await _get_user_emergency_contacts(db, user.id)
+        if not emergency_contacts:
+            raise AlertProcessingError("No emergency contacts configured")
+
+        contact_emails = list(map(get_contact_email, emergency_contacts))
+        contacts_notified = len(contact_emails)
 
-    contact_emails = [contact.contact_email for contact in emergency_contacts]
+        # Persist the alert up front so it survives a crash mid-processing; a failed
+        # insert must not stop the emails, so later updates are skipped instead
+        alert = Alert(
+            user_id=user.id,
+            latitude=latitude,
+            longitude=longitude,
+            contacts_notified=contacts_notified,
+            processing_status="processing",
+        )
+        alert_stored = await _store_alert(db, alert)
+    except BaseException:
+        transcription.cancel()
+        raise
 
     try:
         # Step 1: Transcribe audio
-        transcript = await openai_client.transcribe_audio(audio_data, filename)
+        transcript = await transcription
         logger.info(f"Transcribed audio for user {user.id}: {len(transcript)} chars")
 
         # Step 2: Analyze transcript
         ai_analysis = await openai_client.analyze_emergency_transcript(transcript)
         logger.info(f"AI analysis completed for user {user.id}")
 
-        # Step 3: Send intelligent alert
-        await email_service.send_emergency_alert(
+        # Step 3: Send intelligent alert while recording the result
+        send_alert = email_service.send_emergency_alert(
             recipient_emails=contact_emails,
             user_name=user.full_name,
             location_lat=latitude,
@@ -70,24 +96,32 @@ async def process_emergency_alert(
             ai_analysis=ai_analysis,
             timestamp=timestamp,
         )
-
-        # Step 4: Store alert record
-        alert = Alert(
-            user_id=user.id,
-            latitude=latitude,
-            longitude=longitude,
-            transcript=transcript,
-            ai_analysis=ai_analysis,
-            contacts_notified=len(contact_emails),
-            processing_status="success",
-        )
-        db.add(alert)
-        await db.commit()
+        if alert_stored:
+            sent, updated = await asyncio.gather(
+                send_alert,
+                _update_alert(
+                    db,
+                    alert.id,
+                    transcript=transcript,
+                    ai_analysis=ai_analysis,
+                    processing_status="success",
+                    processed_at=utcnow(),
+                ),
+                return_exceptions=True,
+            )
+            # Contacts already have the alert, so a failed update must not trigger the fallback
+            if isinstance(updated, BaseException):
+                logger.error(f"Failed to record alert {alert.id} for user {user.id}: {updated}")
+            # Both steps have finished, so the fallback below never races the update
+            if isinstance(sent, BaseException):
+                raise sent
+        else:
+            await send_alert
 
         return {
             "status": "success",
             "message": "Emergency alert processed and sent",
-            "contacts_notified": len(contact_emails),
+            "contacts_notified": contacts_notified,
             "ai_analysis": ai_analysis,
         }
 
@@ -104,24 +138,23 @@ async def process_emergency_alert(
                 timestamp=timestamp,
             )
 
-            # Store fallback alert record
-            alert = Alert(
-                user_id=user.id,
-                latitude=latitude,
-                longitude=longitude,
-                transcript="",  # Empty if transcription failed
-                ai_analysis="AI processing unavailable",
-                contacts_notified=len(contact_emails),
-                processing_status="fallback",
-                error_details=str(e),
-            )
-            db.add(alert)
-            await db.commit()
+            # Record fallback outcome, discarding any half-applied success update
+            if alert_stored:
+                await db.rollback()
+                await _update_alert(
+                    db,
+                    alert.id,
+                    transcript="",  # Empty if transcription failed
+                    ai_analysis="AI processing unavailable",
+                    processing_status="fallback",
+                    error_details=str(e),
+                    processed_at=utcnow(),
+                )
 
             return {
                 "status": "fallback",
                 "message": "Basic emergency alert sent (AI processing failed)",
-                "contacts_notified": len(contact_emails),
+                "contacts_notified": contacts_notified,
                 "error": str(e),
             }
 
@@ -129,10 +162,67 @@ async def process_emergency_alert(
             logger.critical(
                 f"Both AI processing and fallback failed for user {user.id}: {fallback_error}"
             )
+            if alert_stored:
+                await _mark_alert_failed(db, alert.id, str(fallback_error))
             raise AlertProcessingError(f"Complete alert processing failure: {fallback_error}")
 
 
-async def _get_user_emergency_contacts(db: AsyncSession, user_id: UUID) -> list[EmergencyContact]:
+async def _store_alert(db: AsyncSession, alert: Alert) -> bool:
+    """Best-effort insert of an alert record with a single Core INSERT and commit.
+
+    Args:
+        db: Database session
+        alert: Alert record to store
+
+    Returns:
+        True if the alert was stored, False if the insert failed
+    """
+    try:
+        await db.execute(insert(Alert).values(**alert.model_dump()))
+        await db.commit()
+    except Exception as e:
+        logger.error(f"Failed to store alert for user {alert.user_id}: {e}")
+        await db.rollback()
+        return False
+    return True
+
+
+async def _update_alert(db: AsyncSession, alert_id: UUID, **values: Any) -> None:
+    """Update a stored alert record with a single UPDATE and commit it.
+
+    Args:
+        db: Database session
+        alert_id: UUID of the alert
+        **values: Alert columns to set
+    """
+    await db.execute(update(Alert).where(col(Alert.id) == alert_id).values(**values))
+    await db.commit()
+
+
+async def _mark_alert_failed(db: AsyncSession, alert_id: UUID, error_details: str) -> None:
+    """Best-effort update of an alert to the failed status.
+
+    Args:
+        db: Database session
+        alert_id: UUID of the alert
+        error_details: Description of the failure
+    """
+    try:
+        await db.rollback()
+        await _update_alert(
+            db,
+            alert_id,
+            processing_status="failed",
+            error_details=error_details,
+            processed_at=utcnow(),
+        )
+    except Exception as e:
+        logger.error(f"Failed to mark alert {alert_id} as failed: {e}")
+
+
+async def _get_user_emergency_contacts(
+    db: AsyncSession, user_id: UUID
+) -> Sequence[EmergencyContact]:
     """Get all emergency contacts for a user.
 
     Args:
@@ -144,10 +234,12 @@ async def _get_user_emergency_contacts(db: AsyncSession, user_id: UUID) -> list[
     """
     statement = select(EmergencyContact).where(EmergencyContact.user_id == user_id)
     result = await db.execute(statement)
-    return list(result.scalars().all())
+    return result.scalars().all()
 
 
-async def get_user_alert_history(db: AsyncSession, user_id: UUID, limit: int = 10) -> list[Alert]:
+async def get_user_alert_history(
+    db: AsyncSession, user_id: UUID, limit: int = 10
+) -> Sequence[Alert]:
     """Get alert history for a user.
 
     Args:
@@ -162,4 +254,4 @@ async def get_user_alert_history(db: AsyncSession, user_id: UUID, limit: int = 1
         select(Alert).where(Alert.user_id == user_id).order_by(Alert.created_at.desc()).limit(limit)
     )
     result = await db.execute(statement)
-    return list(result.scalars().all())
+    return result.scalars().all()
@@ -35,3 +35,9 @@ class UnauthorizedTripAccess(TripError):
     """Raised when user tries to access trip they don't own."""
 
     pass
+
+
+class InvalidCursorError(TripError):
+    """Raised when a pagination cursor can't be decoded."""
+
+    pass
@@ -1,17 +1,42 @@
 """Geocoding utilities for trip destinations."""
 
+from cachetools import TTLCache
+
 from ..exceptions import GeocodeError
 from .mapbox_client import MapboxClient
 
+# Successful lookups by normalized destination name -> (lat, lon); popular places repeat
+GEOCODE_CACHE_TTL_SECONDS = 24 * 60 * 60
+_geocode_cache: TTLCache[str, tuple[float, float]] = TTLCache(
+    maxsize=2048, ttl=GEOCODE_CACHE_TTL_SECONDS
+)
+
+
+def _geocode_cache_key(destination_name: str) -> str:
+    """Normalize a destination name for cache lookups."""
+    return " ".join(destination_name.lower().split())
+
+
+def clear_geocode_cache() -> None:
+    """Drop all cached geocoding results."""
+    _geocode_cache.clear()
+
 
 async def geocode_destination(
     mapbox_client: MapboxClient, destination_name: str
 ) -> tuple[float, float]:
     """Geocode a destination name to coordinates."""
+    key = _geocode_cache_key(destination_name)
+    cached = _geocode_cache.get(key)
+    if cached is not None:
+        return cached
+
     features = await mapbox_client.geocode_forward(destination_name, limit=1)
 
     if not features:
         raise GeocodeError(f"Could not find location for: {destination_name}")
 
     coordinates = features[0]["geometry"]["coordinates"]  # [lon, lat]
-    return coordinates[1], coordinates[0]  # Return as (lat, lon)
+    location = (coordinates[1], coordinates[0])  # Return as (lat, lon)
+    _geocode_cache[key] = location
+    return location
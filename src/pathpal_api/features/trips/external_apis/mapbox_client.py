@@ -1,12 +1,47 @@
 """Async client for Mapbox APIs."""
 
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Any, TypeVar
+
 import httpx
+import orjson
 
 from ....settings import get_settings
 from ..exceptions import MapboxAPIError, RouteCalculationError
 
 settings = get_settings()
 
+T = TypeVar("T")
+
+# In-flight Mapbox requests shared by concurrent callers asking for the same thing
+_inflight_directions: dict[Hashable, asyncio.Task[Any]] = {}
+_inflight_geocodes: dict[Hashable, asyncio.Task[Any]] = {}
+
+
+async def _coalesce(
+    inflight: dict[Hashable, asyncio.Task[Any]], key: Hashable, request: Callable[[], Awaitable[T]]
+) -> T:
+    """Run ``request`` once per key, letting concurrent callers await the same result."""
+    task = inflight.get(key)
+    if task is None:
+        # Own task, so the request doesn't belong to (or die with) whichever caller started it
+        task = asyncio.ensure_future(request())
+        inflight[key] = task
+        task.add_done_callback(lambda done: _finish_inflight(inflight, key, done))
+
+    # Shield so a cancelled caller doesn't cancel the request for everyone else
+    return await asyncio.shield(task)
+
+
+def _finish_inflight(
+    inflight: dict[Hashable, asyncio.Task[Any]], key: Hashable, task: asyncio.Task[Any]
+) -> None:
+    """Forget a finished request, marking its error retrieved if every caller gave up."""
+    inflight.pop(key, None)
+    if not task.cancelled():
+        task.exception()
+
 
 class MapboxClient:
     """Async client for Mapbox APIs."""
@@ -24,8 +59,16 @@ class MapboxClient:
             raise RouteCalculationError("Need at least 2 coordinates for directions")
 
         # Format coordinates as "lon,lat;lon,lat"
-        coords_str = ";".join(f"{lon},{lat}" for lon, lat in coordinates)
+        coords_str = ";".join([f"{lon},{lat}" for lon, lat in coordinates])
+
+        return await _coalesce(
+            _inflight_directions,
+            (profile, coords_str),
+            lambda: self._fetch_directions(coords_str, profile),
+        )
 
+    async def _fetch_directions(self, coords_str: str, profile: str) -> dict:
+        """Request a route from the Directions API."""
         url = f"{self.base_url}/directions/v5/mapbox/{profile}/{coords_str}"
         params = {
             "access_token": self.api_key,
@@ -37,7 +80,7 @@ class MapboxClient:
         try:
             response = await self.client.get(url, params=params)
             response.raise_for_status()
-            data = response.json()
+            data = orjson.loads(response.content)
 
             if not data.get("routes"):
                 raise RouteCalculationError("No routes found")
@@ -53,6 +96,14 @@ class MapboxClient:
 
     async def geocode_forward(self, query: str, limit: int = 5) -> list[dict]:
         """Forward geocoding: convert place name to coordinates."""
+        return await _coalesce(
+            _inflight_geocodes,
+            (query.lower(), limit),
+            lambda: self._fetch_geocode(query, limit),
+        )
+
+    async def _fetch_geocode(self, query: str, limit: int) -> list[dict]:
+        """Request matching places from the Geocoding API."""
         url = f"{self.base_url}/geocoding/v5/mapbox.places/{query}.json"
         params = {
             "access_token": self.api_key,
@@ -63,7 +114,7 @@ class MapboxClient:
         try:
             response = await self.client.get(url, params=params)
             response.raise_for_status()
-            data = response.json()
+            data = orjson.loads(response.content)
             return data.get("features", [])
 
         except httpx.HTTPStatusError as e:
@@ -2,7 +2,8 @@
 
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, status
+from fastapi.responses import ORJSONResponse, Response
 from sqlmodel.ext.asyncio.session import AsyncSession
 
 from ...auth.schemas import UserPublic
@@ -10,13 +11,25 @@ from ...auth.security import get_current_user
 from ...database.connection import get_db
 from . import models as schemas
 from . import services
-from .exceptions import GeocodeError, MapboxAPIError, RouteCalculationError
+from .exceptions import (
+    GeocodeError,
+    InvalidCursorError,
+    MapboxAPIError,
+    RouteCalculationError,
+)
 from .external_apis.mapbox_client import MapboxClient
 
 router = APIRouter(prefix="/trips", tags=["Trips"])
 
+# Accept type for clients that decode the route polyline themselves
+ENCODED_GEOMETRY_MEDIA_TYPE = "application/vnd.pathpal.polyline+json"
+# Accept type for clients that want packed int32 lat/lon pairs scaled by 10^5
+E5_GEOMETRY_MEDIA_TYPE = "application/vnd.pathpal.route-e5"
+# Accept ranges that cover the default decoded-coordinates JSON
+JSON_MEDIA_RANGES = ("application/json", "application/*", "*/*")
 
-def get_mapbox_client(request: Request) -> MapboxClient:
+
+async def get_mapbox_client(request: Request) -> MapboxClient:
     """Dependency to get Mapbox client."""
     return MapboxClient(request.app.state.http_client)
 
@@ -49,11 +62,22 @@ async def list_trips(
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
     active_only: bool = Query(False),
+    cursor: str | None = Query(
+        None, description="next_cursor of the previous page, to page by keyset instead of offset"
+    ),
 ) -> schemas.TripList:
     """List user's trips with pagination."""
-    trips = await services.get_user_trips(
-        db=db, user_id=current_user.id, page=page, page_size=page_size, active_only=active_only
-    )
+    try:
+        trips = await services.get_user_trips(
+            db=db,
+            user_id=current_user.id,
+            page=page,
+            page_size=page_size,
+            active_only=active_only,
+            cursor=cursor,
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
     return trips
 
 
@@ -99,16 +123,82 @@ async def complete_trip(
     return trip
 
 
-@router.get("/{trip_id}/route/geometry", response_model=schemas.RouteGeometry)
+@router.get(
+    "/{trip_id}/route/geometry",
+    response_model=schemas.RouteGeometry | schemas.RouteGeometryEncoded,
+)
 async def get_route_geometry(
     trip_id: UUID,
     current_user: UserPublic = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
-) -> schemas.RouteGeometry:
-    """Get decoded route geometry for map display."""
+    encoded: bool = Query(False),
+    accept: str | None = Header(None),
+) -> Response:
+    """Get route geometry for map display.
+
+    Clients that pass ``?encoded=1`` or accept the polyline media type get the
+    encoded polyline as stored, which Mapbox GL and Leaflet decode themselves and
+    is several times smaller on the wire. Clients that accept the e5 media type get
+    packed little-endian int32 lat/lon pairs scaled by 10^5, 8 bytes per point.
+    Legacy clients get decoded coordinates; long routes decode to thousands of
+    pairs, so they are serialized straight to JSON with orjson rather than
+    re-validated against the response model.
+    """
+    # The vendor types are only served when asked for by name, never for a wildcard,
+    # and only when the client doesn't rank plain JSON higher
+    qualities = _parse_accept(accept)
+    json_quality = (
+        max(qualities.get(media_range, 0.0) for media_range in JSON_MEDIA_RANGES)
+        if qualities
+        else 1.0
+    )
+    e5_quality = qualities.get(E5_GEOMETRY_MEDIA_TYPE, 0.0)
+    encoded_quality = qualities.get(ENCODED_GEOMETRY_MEDIA_TYPE, 0.0)
+    # The representation depends on Accept, so caches must key on it too
+    headers = {"Vary": "Accept"}
+
+    if e5_quality > 0 and e5_quality >= max(encoded_quality, json_quality):
+        packed = await services.get_trip_route_e5(db=db, trip_id=trip_id, user_id=current_user.id)
+        if packed is None:
+            raise HTTPException(status_code=404, detail="Trip not found")
+        return Response(content=packed, media_type=E5_GEOMETRY_MEDIA_TYPE, headers=headers)
+
+    if encoded or (encoded_quality > 0 and encoded_quality >= json_quality):
+        encoded_geometry = await services.get_trip_route_polyline(
+            db=db, trip_id=trip_id, user_id=current_user.id
+        )
+        if not encoded_geometry:
+            raise HTTPException(status_code=404, detail="Trip not found")
+        return ORJSONResponse(encoded_geometry.model_dump(), headers=headers)
+
     geometry = await services.get_trip_route_geometry(
         db=db, trip_id=trip_id, user_id=current_user.id
     )
     if not geometry:
         raise HTTPException(status_code=404, detail="Trip not found")
-    return geometry
+    return ORJSONResponse({"coordinates": geometry.coordinates}, headers=headers)
+
+
+def _parse_accept(accept: str | None) -> dict[str, float]:
+    """Map each media range in an Accept header to its quality value.
+
+    Ranges without a ``q`` parameter get 1; ranges with a malformed one get 0, so
+    they are never picked.
+    """
+    qualities: dict[str, float] = {}
+    for media_range in (accept or "").split(","):
+        media_type, *params = media_range.split(";")
+        media_type = media_type.strip().lower()
+        if not media_type:
+            continue
+
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = min(max(float(value), 0.0), 1.0)
+                except ValueError:
+                    quality = 0.0
+        qualities[media_type] = max(quality, qualities.get(media_type, 0.0))
+    return qualities
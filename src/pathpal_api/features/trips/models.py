@@ -2,9 +2,13 @@
 
 from datetime import datetime
 from enum import Enum
+from typing import TYPE_CHECKING
 
 from pydantic import UUID4, BaseModel, Field
 
+if TYPE_CHECKING:
+    from ...database.models import Trip
+
 
 class TravelMode(str, Enum):
     DRIVING = "driving"
@@ -55,14 +59,36 @@ class TripPublic(BaseModel):
 
     model_config = {"from_attributes": True}
 
+    @classmethod
+    def from_trip(cls, trip: "Trip", participant_count: int = 0) -> "TripPublic":
+        """Build from a Trip row, skipping validation of already-validated columns."""
+        return cls.model_construct(
+            id=trip.id,
+            owner_id=trip.owner_id,
+            destination_name=trip.destination_name,
+            start_latitude=trip.start_latitude,
+            start_longitude=trip.start_longitude,
+            destination_latitude=trip.destination_latitude,
+            destination_longitude=trip.destination_longitude,
+            route_geometry=trip.route_geometry,
+            distance_meters=trip.distance_meters,
+            duration_seconds=trip.duration_seconds,
+            travel_mode=TravelMode(trip.travel_mode),
+            is_active=trip.is_active,
+            created_at=trip.created_at,
+            completed_at=trip.completed_at,
+            participant_count=participant_count,
+        )
+
 
 class TripList(BaseModel):
     """Paginated list of trips."""
 
     trips: list[TripPublic]
-    total: int
+    total: int | None  # None on cursor pages, which skip counting
     page: int
     page_size: int
+    next_cursor: str | None = None  # pass as ``cursor`` to fetch the following page
 
 
 class RouteGeometry(BaseModel):
@@ -71,6 +97,13 @@ class RouteGeometry(BaseModel):
     coordinates: list[list[float]]  # [[lat, lon], [lat, lon], ...]
 
 
+class RouteGeometryEncoded(BaseModel):
+    """Encoded route geometry for clients that decode polylines themselves."""
+
+    polyline: str  # Polyline-encoded, as returned by Mapbox
+    precision: int = 5
+
+
 class TripParticipantRequest(BaseModel):
     """Request to join/leave trip."""
 
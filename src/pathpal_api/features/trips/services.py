@@ -1,21 +1,34 @@
 """Core business logic for trip management."""
 
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+from typing import Any
 from uuid import UUID
 
-import polyline
-from sqlmodel import func, select
+from sqlalchemy import Row, tuple_, update
+from sqlalchemy.orm import defer, raiseload
+from sqlmodel import col, func, select
 from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlmodel.sql.expression import Select
 
 from ...database.models import Trip, TripParticipant, utcnow
 from . import models as schemas
+from .exceptions import InvalidCursorError
 from .external_apis.geocoding import geocode_destination
 from .external_apis.mapbox_client import MapboxClient
+from .route_polyline import POLYLINE_PRECISION, decode_polyline, decode_polyline_e5
 
 
 async def create_trip_with_route(
     db: AsyncSession, trip_create: schemas.TripCreate, user_id: UUID, mapbox_client: MapboxClient
 ) -> schemas.TripPublic:
-    """Create trip and calculate route using Mapbox."""
+    """Create trip and calculate route using Mapbox.
+
+    The Mapbox calls run back to back because directions need the geocoded
+    destination, and nothing touches the database until the route is known. A
+    pending row inserted up front would only add an UPDATE and leave orphans when
+    Mapbox fails.
+    """
 
     # Geocode destination if coordinates not provided
     if trip_create.destination_location:
@@ -33,7 +46,7 @@ async def create_trip_with_route(
         coordinates=[start_coords, dest_coords], profile=trip_create.travel_mode.value
     )
 
-    # Create trip record
+    # Create trip record; the route stays encoded until its geometry is first requested
     trip = Trip(
         owner_id=user_id,
         destination_name=trip_create.destination_name,
@@ -51,83 +64,187 @@ async def create_trip_with_route(
     await db.commit()
     await db.refresh(trip)
 
-    # Convert to public schema with participant count
-    trip_dict = trip.__dict__.copy()
-    trip_dict["participant_count"] = 0
-    return schemas.TripPublic(**trip_dict)
+    return schemas.TripPublic.from_trip(trip)
+
+
+def _select_trips_with_participant_count() -> Select[tuple[Trip, int]]:
+    """Select trips alongside their participant count in a single grouped query.
+
+    Relationships are set to raise on access: the count already comes from the
+    join, and lazily loading participants per trip would reintroduce N+1 queries.
+    The stored route coordinates are deferred, since only the geometry endpoint
+    reads them.
+    """
+    return (
+        select(Trip, func.count(col(TripParticipant.id)).label("participant_count"))
+        .outerjoin(TripParticipant, col(TripParticipant.trip_id) == Trip.id)
+        .group_by(col(Trip.id))
+        .options(
+            raiseload(Trip.participants),
+            raiseload(Trip.owner),
+            defer(Trip.route_coordinates, raiseload=True),
+        )
+    )
+
+
+def encode_trip_cursor(created_at: datetime, trip_id: UUID) -> str:
+    """Encode the position after a trip as an opaque cursor for the next page."""
+    return urlsafe_b64encode(f"{created_at.isoformat()}|{trip_id}".encode()).decode()
+
+
+def decode_trip_cursor(cursor: str) -> tuple[datetime, UUID]:
+    """Decode a cursor from ``encode_trip_cursor`` into its creation time and trip ID.
+
+    Raises:
+        InvalidCursorError: If the cursor wasn't produced by ``encode_trip_cursor``
+    """
+    try:
+        created_at, trip_id = urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), UUID(trip_id)
+    except ValueError as e:
+        raise InvalidCursorError("Invalid pagination cursor") from e
 
 
 async def get_user_trips(
-    db: AsyncSession, user_id: UUID, page: int, page_size: int, active_only: bool = False
+    db: AsyncSession,
+    user_id: UUID,
+    page: int,
+    page_size: int,
+    active_only: bool = False,
+    cursor: str | None = None,
 ) -> schemas.TripList:
-    """Get paginated list of user's trips."""
-    query = select(Trip).where(Trip.owner_id == user_id)
+    """Get paginated list of user's trips, newest first.
 
-    if active_only:
-        query = query.where(Trip.is_active)
+    With ``cursor`` (a previous page's ``next_cursor``), the page seeks past the
+    last trip seen on ``(created_at, id)`` instead of skipping ``(page - 1) *
+    page_size`` rows, so deep pages cost the same as the first. Cursor pages skip
+    counting, leaving ``total`` unset.
 
-    query = query.order_by(Trip.created_at.desc())
+    Raises:
+        InvalidCursorError: If ``cursor`` is malformed
+    """
+    query = _select_trips_with_participant_count().where(Trip.owner_id == user_id)
 
-    # Get total count
-    count_query = select(func.count(Trip.id)).where(Trip.owner_id == user_id)
     if active_only:
-        count_query = count_query.where(Trip.is_active)
-
-    total = await db.scalar(count_query)
-
-    # Get paginated results
-    offset = (page - 1) * page_size
-    query = query.offset(offset).limit(page_size)
-    result = await db.execute(query)
-    trips = result.scalars().all()
+        query = query.where(Trip.is_active)
 
-    # Convert to public schema with participant counts
-    trip_publics = []
-    for trip in trips:
-        participant_count = await db.scalar(
-            select(func.count(TripParticipant.id)).where(TripParticipant.trip_id == trip.id)
+    # Ties on created_at are broken by id, so cursors never skip or repeat a trip
+    query = query.order_by(col(Trip.created_at).desc(), col(Trip.id).desc()).limit(page_size)
+    if cursor is not None:
+        query = query.where(tuple_(col(Trip.created_at), col(Trip.id)) < decode_trip_cursor(cursor))
+        result = await db.execute(query)
+    else:
+        # Window count over the grouped rows gives the total trips before LIMIT/OFFSET
+        result = await db.execute(
+            query.add_columns(func.count().over().label("total")).offset((page - 1) * page_size)
         )
-        trip_dict = trip.__dict__.copy()
-        trip_dict["participant_count"] = participant_count or 0
-        trip_publics.append(schemas.TripPublic(**trip_dict))
+    rows = result.all()
+
+    total = None
+    if cursor is None:
+        if rows:
+            total = rows[0].total
+        elif page > 1:
+            # Past the last page there is no row to carry the total; count separately
+            count_query = select(func.count(col(Trip.id))).where(Trip.owner_id == user_id)
+            if active_only:
+                count_query = count_query.where(Trip.is_active)
+            total = await db.scalar(count_query)
+        else:
+            total = 0
+
+    # A full page may have more after it; hand out a cursor that resumes there
+    next_cursor = None
+    if len(rows) == page_size:
+        last_trip = rows[-1][0]
+        next_cursor = encode_trip_cursor(last_trip.created_at, last_trip.id)
 
-    return schemas.TripList(trips=trip_publics, total=total, page=page, page_size=page_size)
+    # Convert to public schema with participant counts
+    trip_publics = [schemas.TripPublic.from_trip(row[0], row[1]) for row in rows]
+
+    return schemas.TripList(
+        trips=trip_publics,
+        total=total,
+        page=page,
+        page_size=page_size,
+        next_cursor=next_cursor,
+    )
 
 
 async def get_trip_by_id(
     db: AsyncSession, trip_id: UUID, user_id: UUID
 ) -> schemas.TripPublic | None:
     """Get trip by ID if user has access."""
-    query = select(Trip).where(
+    query = _select_trips_with_participant_count().where(
         Trip.id == trip_id,
         Trip.owner_id == user_id,  # Only owner can view for now
     )
     result = await db.execute(query)
-    trip = result.scalar_one_or_none()
+    row = result.one_or_none()
 
-    if not trip:
+    if not row:
         return None
 
-    participant_count = await db.scalar(
-        select(func.count(TripParticipant.id)).where(TripParticipant.trip_id == trip.id)
-    )
+    trip, participant_count = row
+    return schemas.TripPublic.from_trip(trip, participant_count)
+
 
-    trip_dict = trip.__dict__.copy()
-    trip_dict["participant_count"] = participant_count or 0
-    return schemas.TripPublic(**trip_dict)
+async def _load_trip_route(
+    db: AsyncSession, trip_id: UUID, user_id: UUID, *columns: Any
+) -> Row[Any] | None:
+    """Load only the given route columns of a trip the user can view.
+
+    The route endpoints never need the participant count, so they skip the grouped
+    query in ``get_trip_by_id`` and the rest of the row.
+    """
+    query = select(*columns).where(
+        Trip.id == trip_id,
+        Trip.owner_id == user_id,  # Only owner can view for now
+    )
+    result = await db.execute(query)
+    return result.one_or_none()
 
 
 async def get_trip_route_geometry(
     db: AsyncSession, trip_id: UUID, user_id: UUID
 ) -> schemas.RouteGeometry | None:
-    """Get decoded route geometry for map display."""
-    trip = await get_trip_by_id(db, trip_id, user_id)
-    if not trip:
+    """Get decoded route geometry for map display.
+
+    The polyline is decoded the first time a trip's geometry is requested and the
+    coordinates are stored, so later requests (and trip creation) skip decoding.
+    """
+    row = await _load_trip_route(db, trip_id, user_id, Trip.route_coordinates, Trip.route_geometry)
+    if not row:
+        return None
+
+    coordinates, route_geometry = row
+    if coordinates is None:
+        coordinates = [list(pair) for pair in decode_polyline(route_geometry)]
+        await db.execute(
+            update(Trip).where(col(Trip.id) == trip_id).values(route_coordinates=coordinates)
+        )
+        await db.commit()
+    return schemas.RouteGeometry.model_construct(coordinates=coordinates)
+
+
+async def get_trip_route_polyline(
+    db: AsyncSession, trip_id: UUID, user_id: UUID
+) -> schemas.RouteGeometryEncoded | None:
+    """Get encoded route geometry for clients that decode it themselves."""
+    row = await _load_trip_route(db, trip_id, user_id, Trip.route_geometry)
+    if not row:
+        return None
+
+    return schemas.RouteGeometryEncoded(polyline=row.route_geometry, precision=POLYLINE_PRECISION)
+
+
+async def get_trip_route_e5(db: AsyncSession, trip_id: UUID, user_id: UUID) -> bytes | None:
+    """Get route coordinates as little-endian int32 lat/lon pairs scaled by 10^5."""
+    encoded_geometry = await get_trip_route_polyline(db, trip_id, user_id)
+    if not encoded_geometry:
         return None
 
-    # Decode polyline to coordinates
-    coordinates = polyline.decode(trip.route_geometry)
-    return schemas.RouteGeometry(coordinates=coordinates)
+    return decode_polyline_e5(encoded_geometry.polyline)
 
 
 async def complete_trip(
@@ -146,23 +263,23 @@ async def complete_trip(
     await db.commit()
     await db.refresh(trip)
 
-    trip_dict = trip.__dict__.copy()
-    trip_dict["participant_count"] = 0
-    return schemas.TripPublic(**trip_dict)
+    return schemas.TripPublic.from_trip(trip)
 
 
 async def manage_trip_participation(
     db: AsyncSession, trip_id: UUID, user_id: UUID, action: str
 ) -> schemas.TripPublic | None:
     """Join or leave a trip (buddy system)."""
-    # First check if trip exists
-    trip_query = select(Trip).where(Trip.id == trip_id)
+    # First check if trip exists, counting participants in the same query
+    trip_query = _select_trips_with_participant_count().where(Trip.id == trip_id)
     result = await db.execute(trip_query)
-    trip = result.scalar_one_or_none()
+    row = result.one_or_none()
 
-    if not trip:
+    if not row:
         return None
 
+    trip, participant_count = row
+
     # Check existing participation
     participant_query = select(TripParticipant).where(
         TripParticipant.trip_id == trip_id, TripParticipant.user_id == user_id
@@ -175,16 +292,12 @@ async def manage_trip_participation(
             participant = TripParticipant(trip_id=trip_id, user_id=user_id)
             db.add(participant)
             await db.commit()
+            participant_count += 1
     elif action == "leave":
         if existing_participant:
             await db.delete(existing_participant)
             await db.commit()
+            participant_count -= 1
 
     # Return updated trip with participant count
-    participant_count = await db.scalar(
-        select(func.count(TripParticipant.id)).where(TripParticipant.trip_id == trip_id)
-    )
-
-    trip_dict = trip.__dict__.copy()
-    trip_dict["participant_count"] = participant_count or 0
-    return schemas.TripPublic(**trip_dict)
+    return schemas.TripPublic.from_trip(trip, participant_count)
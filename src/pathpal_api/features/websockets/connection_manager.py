@@ -1,54 +1,121 @@
 """WebSocket connection management for real-time location sharing."""
 
+import asyncio
 import logging
+import struct
 
+import orjson
 from fastapi import WebSocket
+from redis.asyncio import Redis
+
+from ...settings import settings
+from .models import PARTICIPANT_LOCATION_BATCH_JSON
 
 logger = logging.getLogger(__name__)
 
+# Pub/Sub payload: header length, JSON header (text message, excluded user), binary message
+_ENVELOPE_HEADER = struct.Struct("<I")
+
+
+def _trip_channel(trip_id: str) -> str:
+    """Redis channel carrying broadcasts for a trip."""
+    return f"trip:{trip_id}"
+
+
+def _pack_envelope(message: str, exclude_user: str | None, binary_message: bytes | None) -> bytes:
+    """Pack a broadcast for publishing to other workers."""
+    header = orjson.dumps({"message": message, "exclude_user": exclude_user})
+    return _ENVELOPE_HEADER.pack(len(header)) + header + (binary_message or b"")
+
+
+def _unpack_envelope(data: bytes) -> tuple[str, str | None, bytes | None]:
+    """Unpack a published broadcast into its message, excluded user and binary message."""
+    (header_size,) = _ENVELOPE_HEADER.unpack_from(data)
+    header_end = _ENVELOPE_HEADER.size + header_size
+    header = orjson.loads(data[_ENVELOPE_HEADER.size : header_end])
+    return header["message"], header["exclude_user"], data[header_end:] or None
+
 
 class ConnectionManager:
-    """Manages WebSocket connections grouped by trip ID."""
+    """Manages WebSocket connections grouped by trip ID.
+
+    Each process only holds its own sockets. When ``redis`` is set, broadcasts are
+    published to a per-trip channel and every worker relays them to its local
+    sockets, so participants connected to different workers still hear each other.
+    """
 
-    def __init__(self):
-        # trip_id -> {user_id: websocket}
-        self.trip_connections: dict[str, dict[str, WebSocket]] = {}
+    def __init__(self, location_interval: float = 0.2, relay_retry_interval: float = 1.0):
+        # Flat maps: trip membership as sets, one socket lookup per user
+        self.trip_users: dict[str, set[str]] = {}  # trip_id -> {user_id}
+        self.user_connections: dict[str, WebSocket] = {}  # user_id -> websocket
         self.user_trip_mapping: dict[str, str] = {}  # user_id -> trip_id
+        self.binary_users: set[str] = set()  # users that negotiated binary frames
 
-    async def connect(self, websocket: WebSocket, trip_id: str, user_id: str):
-        """Accept WebSocket connection and add to trip group."""
-        await websocket.accept()
+        # trip_id -> {user_id: (JSON message, binary frame)}, latest update per user wins
+        self.pending_locations: dict[str, dict[str, tuple[str, bytes]]] = {}
+        self.location_tasks: dict[str, asyncio.Task[None]] = {}  # trip_id -> flush task
+        self.location_interval = location_interval
 
-        if trip_id not in self.trip_connections:
-            self.trip_connections[trip_id] = {}
+        self.redis: Redis | None = None
+        self.trip_relays: dict[str, asyncio.Task[None]] = {}  # trip_id -> Pub/Sub relay task
+        self.relay_retry_interval = relay_retry_interval  # delay before resubscribing
 
-        self.trip_connections[trip_id][user_id] = websocket
+    async def connect(
+        self, websocket: WebSocket, trip_id: str, user_id: str, subprotocol: str | None = None
+    ) -> None:
+        """Accept WebSocket connection and add to trip group.
+
+        Users accepted with ``subprotocol`` receive binary frames from broadcasts
+        that provide them.
+        """
+        await websocket.accept(subprotocol=subprotocol)
+        if subprotocol:
+            self.binary_users.add(user_id)
+        else:
+            self.binary_users.discard(user_id)
+
+        # A user follows one trip at a time; leave the previous one when switching
+        previous_trip_id = self.user_trip_mapping.get(user_id)
+        if previous_trip_id is not None and previous_trip_id != trip_id:
+            self._leave_trip(user_id, previous_trip_id)
+
+        self.trip_users.setdefault(trip_id, set()).add(user_id)
+        self.user_connections[user_id] = websocket
         self.user_trip_mapping[user_id] = trip_id
 
+        if self.redis is not None and trip_id not in self.trip_relays:
+            self.trip_relays[trip_id] = asyncio.create_task(self._relay_trip(trip_id))
+
         logger.info(f"User {user_id} connected to trip {trip_id}")
 
-    def disconnect(self, user_id: str):
+    def disconnect(self, user_id: str) -> None:
         """Remove user connection and clean up."""
         trip_id = self.user_trip_mapping.pop(user_id, None)
+        self.user_connections.pop(user_id, None)
+        self.binary_users.discard(user_id)
         if not trip_id:
             return
 
-        if trip_id in self.trip_connections:
-            self.trip_connections[trip_id].pop(user_id, None)
+        self._leave_trip(user_id, trip_id)
+        logger.info(f"User {user_id} disconnected from trip {trip_id}")
 
-            # Clean up empty trip rooms
-            if not self.trip_connections[trip_id]:
-                del self.trip_connections[trip_id]
+    def _leave_trip(self, user_id: str, trip_id: str) -> None:
+        """Remove a user from a trip's membership, cleaning up the trip once it's empty."""
+        self.pending_locations.get(trip_id, {}).pop(user_id, None)
 
-        logger.info(f"User {user_id} disconnected from trip {trip_id}")
+        if trip_id in self.trip_users:
+            self.trip_users[trip_id].discard(user_id)
 
-    async def send_personal_message(self, message: str, user_id: str):
-        """Send message to specific user."""
-        trip_id = self.user_trip_mapping.get(user_id)
-        if not trip_id:
-            return False
+            # Clean up empty trip rooms
+            if not self.trip_users[trip_id]:
+                del self.trip_users[trip_id]
+                relay = self.trip_relays.pop(trip_id, None)
+                if relay:
+                    relay.cancel()
 
-        websocket = self.trip_connections.get(trip_id, {}).get(user_id)
+    async def send_personal_message(self, message: str, user_id: str) -> bool:
+        """Send message to specific user."""
+        websocket = self.user_connections.get(user_id)
         if websocket:
             try:
                 await websocket.send_text(message)
@@ -58,32 +125,132 @@ class ConnectionManager:
                 self.disconnect(user_id)
         return False
 
-    async def broadcast_to_trip(self, message: str, trip_id: str, exclude_user: str = None):
-        """Broadcast message to all users in a trip except excluded user."""
-        if trip_id not in self.trip_connections:
+    async def broadcast_to_trip(
+        self,
+        message: str,
+        trip_id: str,
+        exclude_user: str | None = None,
+        binary_message: bytes | None = None,
+    ) -> None:
+        """Broadcast message to all users in a trip except excluded user.
+
+        When ``binary_message`` is given, users that negotiated binary frames get it
+        via ``send_bytes`` instead of the JSON text.
+        """
+        if self.redis is not None:
+            envelope = _pack_envelope(message, exclude_user, binary_message)
+            try:
+                await self.redis.publish(_trip_channel(trip_id), envelope)
+                return
+            except Exception as e:
+                # Redis is down: at least reach the participants on this worker
+                logger.error(f"Failed to publish broadcast for trip {trip_id}: {e}")
+
+        await self._send_to_local(message, trip_id, exclude_user, binary_message)
+
+    async def _send_to_local(
+        self,
+        message: str,
+        trip_id: str,
+        exclude_user: str | None,
+        binary_message: bytes | None,
+    ) -> None:
+        """Send a broadcast to this process's sockets in a trip."""
+        # Snapshot recipients; failed sends below disconnect users mid-broadcast
+        recipients = [
+            (user_id, websocket)
+            for user_id in self.trip_users.get(trip_id, ())
+            if user_id != exclude_user
+            and (websocket := self.user_connections.get(user_id)) is not None
+        ]
+        if not recipients:
             return
 
-        disconnected_users = []
-        connections = self.trip_connections[trip_id].copy()
+        # Send concurrently so one slow socket doesn't hold up the rest of the trip
+        results = await asyncio.gather(
+            *(
+                websocket.send_bytes(binary_message)
+                if binary_message is not None and user_id in self.binary_users
+                else websocket.send_text(message)
+                for user_id, websocket in recipients
+            ),
+            return_exceptions=True,
+        )
 
-        for user_id, websocket in connections.items():
-            if user_id == exclude_user:
-                continue
+        # Clean up failed connections
+        for (user_id, _), result in zip(recipients, results, strict=True):
+            if isinstance(result, Exception):
+                logger.error(f"Failed to send to {user_id}: {result}")
+                self.disconnect(user_id)
 
+    async def _relay_trip(self, trip_id: str) -> None:
+        """Forward broadcasts published for a trip to this process's sockets.
+
+        Runs until cancelled when the trip empties, resubscribing after Redis errors.
+        """
+        while (redis := self.redis) is not None:
+            pubsub = redis.pubsub()
             try:
-                await websocket.send_text(message)
+                await pubsub.subscribe(_trip_channel(trip_id))
+                async for item in pubsub.listen():
+                    if item["type"] != "message":
+                        continue
+                    message, exclude_user, binary_message = _unpack_envelope(item["data"])
+                    await self._send_to_local(message, trip_id, exclude_user, binary_message)
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
-                logger.error(f"Failed to send to {user_id}: {e}")
-                disconnected_users.append(user_id)
+                logger.error(f"Pub/Sub relay for trip {trip_id} failed, resubscribing: {e}")
+            finally:
+                await pubsub.aclose()
 
-        # Clean up failed connections
-        for user_id in disconnected_users:
-            self.disconnect(user_id)
+            await asyncio.sleep(self.relay_retry_interval)
+
+    async def close(self) -> None:
+        """Stop all Pub/Sub relays."""
+        for relay in self.trip_relays.values():
+            relay.cancel()
+        await asyncio.gather(*self.trip_relays.values(), return_exceptions=True)
+        self.trip_relays.clear()
+
+    def queue_location(self, trip_id: str, user_id: str, message: str, frame: bytes) -> None:
+        """Queue a participant location for the trip's next batched broadcast.
+
+        Updates arriving faster than ``location_interval`` overwrite each other, so
+        each participant is broadcast at most once per interval.
+        """
+        self.pending_locations.setdefault(trip_id, {})[user_id] = (message, frame)
+        if trip_id not in self.location_tasks:
+            self.location_tasks[trip_id] = asyncio.create_task(self._flush_locations(trip_id))
+
+    async def _flush_locations(self, trip_id: str) -> None:
+        """Broadcast queued locations every interval until the trip goes quiet."""
+        try:
+            while True:
+                await asyncio.sleep(self.location_interval)
+                pending = self.pending_locations.pop(trip_id, None)
+                if not pending:
+                    break
+
+                batch = PARTICIPANT_LOCATION_BATCH_JSON % ",".join(
+                    message for message, _ in pending.values()
+                )
+                await self.broadcast_to_trip(
+                    batch,
+                    trip_id,
+                    binary_message=b"".join(frame for _, frame in pending.values()),
+                )
+        except Exception as e:
+            logger.error(f"Failed to broadcast locations for trip {trip_id}: {e}")
+        finally:
+            self.location_tasks.pop(trip_id, None)
 
     def get_trip_participants(self, trip_id: str) -> list[str]:
         """Get list of connected user IDs for a trip."""
-        return list(self.trip_connections.get(trip_id, {}).keys())
+        return list(self.trip_users.get(trip_id, ()))
 
 
 # Singleton instance
-connection_manager = ConnectionManager()
+connection_manager = ConnectionManager(
+    location_interval=settings.LOCATION_BROADCAST_INTERVAL_SECONDS
+)
@@ -1,8 +1,8 @@
 """WebSocket handlers for real-time location sharing."""
 
-import json
 import logging
 
+import orjson
 from fastapi import APIRouter, Query, WebSocket, WebSocketDisconnect
 
 from ...auth.security import authenticate_websocket_token
@@ -10,7 +10,7 @@ from ...database.connection import async_session
 from ...features.trips.services import get_trip_by_id
 from .connection_manager import connection_manager
 from .exceptions import TripAccessError, WebSocketAuthError
-from .models import LocationUpdateMessage, MessageType
+from .models import BINARY_SUBPROTOCOL, LocationUpdateMessage, MessageType
 from .services import handle_location_update
 
 router = APIRouter(prefix="/ws", tags=["WebSockets"])
@@ -30,19 +30,21 @@ async def websocket_endpoint(
         user = await authenticate_websocket_token(token)
         user_id = str(user.id)
 
-        # Verify user has access to this trip
+        # Verify user has access to this trip; the session is only needed for the lookup
         async with async_session() as db:
             trip = await get_trip_by_id(db, trip_id, user.id)
-            if not trip:
-                await websocket.close(code=4003, reason="Trip not found or access denied")
-                return
+        if not trip:
+            await websocket.close(code=4003, reason="Trip not found or access denied")
+            return
 
-            if not trip.is_active:
-                await websocket.close(code=4004, reason="Trip is not active")
-                return
+        if not trip.is_active:
+            await websocket.close(code=4004, reason="Trip is not active")
+            return
 
-        # Connect to WebSocket
-        await connection_manager.connect(websocket, trip_id, user_id)
+        # Connect to WebSocket, opting into binary location frames if offered
+        offered = websocket.scope.get("subprotocols", ())
+        subprotocol = BINARY_SUBPROTOCOL if BINARY_SUBPROTOCOL in offered else None
+        await connection_manager.connect(websocket, trip_id, user_id, subprotocol=subprotocol)
 
         # Send connection acknowledgment
         participant_count = len(connection_manager.get_trip_participants(trip_id))
@@ -52,7 +54,7 @@ async def websocket_endpoint(
             "participant_count": participant_count,
             "message": f"Connected to trip: {trip.destination_name}",
         }
-        await websocket.send_text(json.dumps(ack_message))
+        await websocket.send_text(orjson.dumps(ack_message).decode())
 
         # Notify other participants
         join_message = {
@@ -62,14 +64,14 @@ async def websocket_endpoint(
             "participant_count": participant_count,
         }
         await connection_manager.broadcast_to_trip(
-            json.dumps(join_message), trip_id, exclude_user=user_id
+            orjson.dumps(join_message).decode(), trip_id, exclude_user=user_id
         )
 
         # Message handling loop
         while True:
             try:
                 data = await websocket.receive_text()
-                message_data = json.loads(data)
+                message_data = orjson.loads(data)
 
                 # Validate message type
                 if message_data.get("type") == MessageType.LOCATION_UPDATE:
@@ -90,11 +92,11 @@ async def websocket_endpoint(
                         "error": "Unknown message type",
                         "detail": f"Received: {message_data.get('type')}",
                     }
-                    await websocket.send_text(json.dumps(error_msg))
+                    await websocket.send_text(orjson.dumps(error_msg).decode())
 
-            except json.JSONDecodeError:
+            except orjson.JSONDecodeError:
                 error_msg = {"type": MessageType.ERROR, "error": "Invalid JSON format"}
-                await websocket.send_text(json.dumps(error_msg))
+                await websocket.send_text(orjson.dumps(error_msg).decode())
             except Exception as e:
                 logger.error(f"Error processing message: {e}")
                 error_msg = {
@@ -102,7 +104,7 @@ async def websocket_endpoint(
                     "error": "Message processing failed",
                     "detail": str(e),
                 }
-                await websocket.send_text(json.dumps(error_msg))
+                await websocket.send_text(orjson.dumps(error_msg).decode())
 
     except WebSocketAuthError as e:
         await websocket.close(code=4001, reason=f"Authentication failed: {str(e)}")
@@ -128,6 +130,8 @@ async def websocket_endpoint(
                         "full_name": user.full_name,
                         "participant_count": remaining_count,
                     }
-                    await connection_manager.broadcast_to_trip(json.dumps(leave_message), trip_id)
+                    await connection_manager.broadcast_to_trip(
+                        orjson.dumps(leave_message).decode(), trip_id
+                    )
             except Exception as e:
                 logger.error(f"Error notifying participant leave: {e}")
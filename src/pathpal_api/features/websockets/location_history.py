@@ -0,0 +1,103 @@
+"""Batched persistence of shared participant locations."""
+
+import asyncio
+import logging
+from typing import Any
+
+from sqlalchemy import insert
+
+from ...database.connection import async_session
+from ...database.models import LocationHistory
+from ...settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class LocationHistoryWriter:
+    """Buffers location rows in memory and inserts them in multi-row batches.
+
+    Participants can send several updates a second, so one INSERT per update would
+    swamp the database. Rows are queued without blocking and a background task
+    writes them once ``batch_size`` rows are waiting or ``flush_interval`` seconds
+    have passed since the first one. When the queue is full, new rows are dropped
+    rather than slowing down location sharing.
+    """
+
+    def __init__(self, batch_size: int, flush_interval: float, max_pending: int = 10_000):
+        """Initialize an idle writer; call ``start`` to begin flushing."""
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        # None is queued by ``stop`` to tell the flush task to write its batch and exit
+        self._queue: asyncio.Queue[dict[str, Any] | None] = asyncio.Queue(maxsize=max_pending)
+        self._task: asyncio.Task[None] | None = None
+
+    def put(self, row: dict[str, Any]) -> bool:
+        """Queue a row for the next batch, returning False if it was dropped."""
+        try:
+            self._queue.put_nowait(row)
+            return True
+        except asyncio.QueueFull:
+            logger.warning("Location history queue full, dropping location point")
+            return False
+
+    def start(self) -> None:
+        """Start the background flush task."""
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the flush task once it has written every row queued before the call."""
+        if self._task is not None:
+            # Let the task finish its batch rather than cancelling it mid-write
+            if not self._task.done():
+                await self._queue.put(None)
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+        # Rows queued while the task was stopping
+        rows = []
+        while not self._queue.empty():
+            if (row := self._queue.get_nowait()) is not None:
+                rows.append(row)
+        if rows:
+            await self._write(rows)
+
+    async def _run(self) -> None:
+        """Collect rows into batches and write each batch with one statement."""
+        loop = asyncio.get_running_loop()
+        while (row := await self._queue.get()) is not None:
+            batch = [row]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                if not self._queue.empty():
+                    row = self._queue.get_nowait()
+                else:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        row = await asyncio.wait_for(self._queue.get(), timeout)
+                    except TimeoutError:
+                        break
+
+                if row is None:
+                    await self._write(batch)
+                    return
+                batch.append(row)
+
+            await self._write(batch)
+
+    async def _write(self, rows: list[dict[str, Any]]) -> None:
+        """Insert a batch of rows, logging rather than raising on failure."""
+        try:
+            async with async_session() as db:
+                await db.execute(insert(LocationHistory), rows)
+                await db.commit()
+        except Exception as e:
+            logger.error(f"Failed to store {len(rows)} location history rows: {e}")
+
+
+# Singleton instance
+location_history_writer = LocationHistoryWriter(
+    batch_size=settings.LOCATION_HISTORY_BATCH_SIZE,
+    flush_interval=settings.LOCATION_HISTORY_FLUSH_SECONDS,
+)
@@ -1,5 +1,6 @@
 """Pydantic models for WebSocket message schemas."""
 
+import struct
 from enum import Enum
 from typing import Literal
 
@@ -11,12 +12,21 @@ class MessageType(str, Enum):
 
     LOCATION_UPDATE = "location_update"
     PARTICIPANT_LOCATION = "participant_location"
+    PARTICIPANT_LOCATION_BATCH = "participant_location_batch"
     PARTICIPANT_JOINED = "participant_joined"
     PARTICIPANT_LEFT = "participant_left"
     CONNECTION_ACK = "connection_ack"
     ERROR = "error"
 
 
+# Subprotocol for clients that take participant locations as binary frames
+BINARY_SUBPROTOCOL = "pathpal.binary"
+
+# Binary participant location frame: type code, user UUID, lat/lon as int32 x 10^5
+LOCATION_FRAME = struct.Struct("<B16sii")
+LOCATION_FRAME_TYPE = 1
+
+
 class Location(BaseModel):
     """Geographic coordinates."""
 
@@ -41,6 +51,24 @@ class ParticipantLocationMessage(BaseModel):
     location: Location
 
 
+class ParticipantLocationBatchMessage(BaseModel):
+    """Latest location of each participant that moved since the last broadcast."""
+
+    type: Literal[MessageType.PARTICIPANT_LOCATION_BATCH]
+    locations: list[ParticipantLocationMessage]
+
+
+# Fixed-shape JSON for the location hot path; renders exactly what model_dump_json()
+# would for ParticipantLocationMessage (user_id, JSON-quoted name, lat, lon) and the batch
+PARTICIPANT_LOCATION_JSON = (
+    f'{{"type":"{MessageType.PARTICIPANT_LOCATION.value}","user_id":"%s","full_name":%s,'
+    '"location":{"latitude":%r,"longitude":%r}}'
+)
+PARTICIPANT_LOCATION_BATCH_JSON = (
+    f'{{"type":"{MessageType.PARTICIPANT_LOCATION_BATCH.value}","locations":[%s]}}'
+)
+
+
 class ParticipantJoinedMessage(BaseModel):
     """Notification when participant joins trip."""
 
@@ -79,6 +107,7 @@ class ErrorMessage(BaseModel):
 # Union type for all possible outgoing messages
 OutgoingMessage = (
     ParticipantLocationMessage
+    | ParticipantLocationBatchMessage
     | ParticipantJoinedMessage
     | ParticipantLeftMessage
     | ConnectionAckMessage
@@ -2,10 +2,15 @@
 
 import logging
 from datetime import datetime
-from uuid import UUID
+from uuid import UUID, uuid4
 
+import orjson
+
+from ...database.models import utcnow
+from ...settings import settings
 from .connection_manager import ConnectionManager
-from .models import Location, MessageType, ParticipantLocationMessage
+from .location_history import location_history_writer
+from .models import LOCATION_FRAME, LOCATION_FRAME_TYPE, PARTICIPANT_LOCATION_JSON
 
 logger = logging.getLogger(__name__)
 
@@ -18,23 +23,21 @@ async def handle_location_update(
     longitude: float,
     connection_manager: ConnectionManager,
 ) -> bool:
-    """Process location update and broadcast to trip participants."""
+    """Process location update and queue it for the trip's next batched broadcast."""
 
     try:
-        # Create participant location message
-        location_message = ParticipantLocationMessage(
-            type=MessageType.PARTICIPANT_LOCATION,
-            user_id=user_id,
-            full_name=user_name,
-            location=Location(latitude=latitude, longitude=longitude),
+        # Coalesced with other updates and broadcast to the whole trip
+        connection_manager.queue_location(
+            trip_id,
+            user_id,
+            render_participant_location(user_id, user_name, latitude, longitude),
+            pack_participant_location(user_id, latitude, longitude),
         )
 
-        # Broadcast to all participants except sender
-        await connection_manager.broadcast_to_trip(
-            location_message.model_dump_json(), trip_id, exclude_user=user_id
-        )
+        if settings.LOCATION_HISTORY_ENABLED:
+            await store_location_history(UUID(trip_id), UUID(user_id), latitude, longitude)
 
-        logger.debug(f"Location update broadcasted for user {user_id} in trip {trip_id}")
+        logger.debug(f"Location update queued for user {user_id} in trip {trip_id}")
         return True
 
     except Exception as e:
@@ -42,6 +45,36 @@ async def handle_location_update(
         return False
 
 
+def render_participant_location(
+    user_id: str, full_name: str, latitude: float, longitude: float
+) -> str:
+    """Render a participant location as JSON from the fixed message template.
+
+    Coordinates were validated with the incoming LocationUpdateMessage, so this
+    skips building and serializing a ParticipantLocationMessage on every update.
+    """
+    return PARTICIPANT_LOCATION_JSON % (
+        user_id,
+        orjson.dumps(full_name).decode(),
+        latitude,
+        longitude,
+    )
+
+
+def pack_participant_location(user_id: str, latitude: float, longitude: float) -> bytes:
+    """Pack a participant location into a 25-byte binary frame.
+
+    Binary clients already know each participant's name from the join message,
+    so the frame carries only the user UUID and coordinates scaled by 10^5.
+    """
+    return LOCATION_FRAME.pack(
+        LOCATION_FRAME_TYPE,
+        UUID(user_id).bytes,
+        round(latitude * 1e5),
+        round(longitude * 1e5),
+    )
+
+
 async def get_active_trip_participants(trip_id: str) -> int:
     """Get count of currently connected participants for a trip."""
     from .connection_manager import connection_manager
@@ -49,7 +82,7 @@ async def get_active_trip_participants(trip_id: str) -> int:
     return len(connection_manager.get_trip_participants(trip_id))
 
 
-# Optional: Location history storage for future analytics
+# Optional: Location history storage for route analysis
 async def store_location_history(
     trip_id: UUID,
     user_id: UUID,
@@ -57,8 +90,14 @@ async def store_location_history(
     longitude: float,
     timestamp: datetime | None = None,
 ) -> bool:
-    """Store location point for trip analysis (future feature)."""
-    # Implementation placeholder for location history
-    # Could store in database for route analysis, safety insights, etc.
-    logger.debug(f"Location history storage not implemented (trip: {trip_id})")
-    return True
+    """Queue a location point for the next batched history insert."""
+    return location_history_writer.put(
+        {
+            "id": uuid4(),
+            "trip_id": trip_id,
+            "user_id": user_id,
+            "latitude": latitude,
+            "longitude": longitude,
+            "recorded_at": timestamp or utcnow(),
+        }
+    )
@@ -4,12 +4,18 @@ from contextlib import asynccontextmanager
 
 import httpx
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
+from redis.asyncio import Redis
 
 from .auth.handlers import router as auth_router
 from .database.connection import init_db
+from .features.alerts.email_service import EmergencyEmailService, SMTPConnectionPool, mail_config
 from .features.alerts.handlers import router as alerts_router
+from .features.alerts.openai_client import OpenAIAlertClient
 from .features.trips.handlers import router as trips_router
+from .features.websockets.connection_manager import connection_manager
 from .features.websockets.handlers import router as websockets_router
+from .features.websockets.location_history import location_history_writer
 from .settings import settings
 
 
@@ -17,14 +23,32 @@ from .settings import settings
 async def lifespan(app: FastAPI):
     """Application lifespan events."""
     # Startup
-    await init_db()
+    if settings.DB_CREATE_TABLES_ON_STARTUP:
+        await init_db()
     app.state.http_client = httpx.AsyncClient(
+        http2=True,  # multiplex Mapbox/OpenAI calls over one connection per host
         timeout=httpx.Timeout(10.0, read=30.0),  # 10s connect, 30s read
-        limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+        limits=httpx.Limits(
+            max_connections=100, max_keepalive_connections=20, keepalive_expiry=30.0
+        ),
     )
+    app.state.smtp_pool = SMTPConnectionPool(mail_config, max_connections=settings.SMTP_POOL_SIZE)
+    # One OpenAI client (on the shared HTTP pool) and email service for all alerts
+    app.state.openai_alert_client = OpenAIAlertClient(http_client=app.state.http_client)
+    app.state.email_service = EmergencyEmailService(app.state.smtp_pool)
+    # Without Redis, WebSocket broadcasts only reach sockets on this worker
+    app.state.redis = Redis.from_url(settings.REDIS_URL) if settings.REDIS_URL else None
+    connection_manager.redis = app.state.redis
+    if settings.LOCATION_HISTORY_ENABLED:
+        location_history_writer.start()
     yield
     # Shutdown
     await app.state.http_client.aclose()
+    await app.state.smtp_pool.close()
+    await connection_manager.close()
+    await location_history_writer.stop()
+    if app.state.redis is not None:
+        await app.state.redis.aclose()
 
 
 app = FastAPI(
@@ -32,6 +56,7 @@ app = FastAPI(
     version=settings.VERSION,
     description="Social Safety Navigation App",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 # Include routers
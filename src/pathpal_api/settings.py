@@ -13,16 +13,33 @@ class Settings(BaseSettings):
 
     # Database
     DATABASE_URL: str
+    DB_POOL_SIZE: int = 20
+    DB_MAX_OVERFLOW: int = 40
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+    # Disable when the schema is managed by migrations run outside the app
+    DB_CREATE_TABLES_ON_STARTUP: bool = True
 
     # Security
     JWT_SECRET_KEY: str
     JWT_ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    # Argon2id cost; existing hashes are upgraded on login when these change
+    PASSWORD_HASH_TIME_COST: int = 3
+    PASSWORD_HASH_MEMORY_COST_KIB: int = 4096
 
     # External APIs
     OPENAI_API_KEY: str
     MAPBOX_API_KEY: str
 
+    # Real-time location sharing: latest-wins window per trip before broadcasting
+    LOCATION_BROADCAST_INTERVAL_SECONDS: float = 0.2
+    # Set when running several workers so WebSocket broadcasts reach all of them
+    REDIS_URL: str | None = None
+    # Persist shared locations; rows are buffered and inserted in batches
+    LOCATION_HISTORY_ENABLED: bool = False
+    LOCATION_HISTORY_BATCH_SIZE: int = 1000
+    LOCATION_HISTORY_FLUSH_SECONDS: float = 0.5
+
     # Email/SMTP Configuration for Emergency Alerts
     SMTP_USERNAME: str = "test@example.com"
     SMTP_PASSWORD: str = "test-password"
@@ -31,6 +48,7 @@ class Settings(BaseSettings):
     SMTP_PORT: int = 587
     SMTP_STARTTLS: bool = True
     SMTP_SSL_TLS: bool = False
+    SMTP_POOL_SIZE: int = 4  # concurrent alert emails, one SMTP session each
 
     model_config = SettingsConfigDict(
         env_file=".env",
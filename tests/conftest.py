@@ -1,40 +1,80 @@
 """Shared pytest fixtures for PathPal API tests."""
 
 import pytest
+import pytest_asyncio
+from argon2 import PasswordHasher
 from fastapi.testclient import TestClient
 from httpx import ASGITransport, AsyncClient
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
 from sqlmodel import SQLModel
 
-from pathpal_api.auth.security import get_current_user
+from pathpal_api.auth import security
+from pathpal_api.auth.security import (
+    clear_token_cache,
+    create_access_token,
+    get_current_user,
+    user_token_claims,
+)
 from pathpal_api.database.connection import get_db
 from pathpal_api.database.models import User
 from pathpal_api.main import app
+from pathpal_api.settings import settings
 
 # Test database configuration
 TEST_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
 
-# Create test engine
-test_engine = create_async_engine(TEST_DATABASE_URL, echo=False, future=True)
+# Create test engine; StaticPool keeps the one in-memory database alive for the whole run
+test_engine = create_async_engine(TEST_DATABASE_URL, echo=False, future=True, poolclass=StaticPool)
 
 # Create test session factory
-TestSessionLocal = sessionmaker(test_engine, class_=AsyncSession, expire_on_commit=False)
+TestSessionLocal = async_sessionmaker(test_engine, expire_on_commit=False)
 
 
-@pytest.fixture(scope="function")
-async def db_session():
-    """Create test database session."""
+@pytest.fixture(scope="session", autouse=True)
+def fast_password_hasher():
+    """Hash with minimum-cost Argon2id so register and login tests aren't dominated by the KDF.
+
+    Hashes are still real Argon2id PHC strings, so verification and rehash checks behave
+    as in production.
+    """
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(
+            security, "password_hasher", PasswordHasher(time_cost=1, memory_cost=8, parallelism=1)
+        )
+        yield
+
+
+@pytest.fixture(autouse=True)
+def reset_token_cache():
+    """Clear cached JWT lookups between tests."""
+    clear_token_cache()
+    yield
+    clear_token_cache()
+
+
+@pytest_asyncio.fixture(scope="session")
+async def test_schema():
+    """Create all tables once for the test run."""
     async with test_engine.begin() as conn:
-        # Create all tables
         await conn.run_sync(SQLModel.metadata.create_all)
 
+    yield
+
+    async with test_engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.drop_all)
+
+
+@pytest_asyncio.fixture(scope="function")
+async def db_session(test_schema):
+    """Create test database session."""
     async with TestSessionLocal() as session:
         yield session
 
-    # Clean up database after each test
+    # Empty every table after each test; the schema is kept for the next one
     async with test_engine.begin() as conn:
-        await conn.run_sync(SQLModel.metadata.drop_all)
+        for table in reversed(SQLModel.metadata.sorted_tables):
+            await conn.execute(table.delete())
 
 
 @pytest.fixture(scope="function")
@@ -58,8 +98,25 @@ def client(override_get_db):
     app.dependency_overrides.clear()
 
 
-@pytest.fixture(scope="function")
-async def async_client(override_get_db):
+@pytest_asyncio.fixture(scope="session", loop_scope="session")
+async def app_lifespan():
+    """Run application startup and shutdown once for every ``async_client`` test.
+
+    ``ASGITransport`` never sends lifespan events, so without this ``app.state`` (HTTP
+    client, SMTP pool, ...) would be unset. Tables come from ``db_session`` on
+    the test engine rather than from startup.
+
+    Startup state such as the HTTP client is bound to the loop that created it, so
+    the fixture pins the session loop, which the tests using it must share.
+    """
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(settings, "DB_CREATE_TABLES_ON_STARTUP", False)
+        async with app.router.lifespan_context(app):
+            yield
+
+
+@pytest_asyncio.fixture(scope="function")
+async def async_client(app_lifespan, override_get_db):
     """Create async HTTP client for testing."""
     app.dependency_overrides[get_db] = override_get_db
 
@@ -69,6 +126,22 @@ async def async_client(override_get_db):
     app.dependency_overrides.clear()
 
 
+@pytest.fixture(scope="function")
+def concurrent_client(async_client):
+    """Async client whose requests each open their own session, as ``get_db`` does.
+
+    ``async_client`` shares one session across requests, which is unsafe for requests
+    issued concurrently with ``asyncio.gather``.
+    """
+
+    async def _session_per_request():
+        async with TestSessionLocal() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = _session_per_request
+    return async_client
+
+
 @pytest.fixture
 def mock_user():
     """Create mock user for testing."""
@@ -96,7 +169,27 @@ def authenticated_client(mock_user):
     app.dependency_overrides.clear()
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def sample_user_data():
-    """Sample user data for testing."""
+    """Sample user data for testing; shared, so tests must not mutate it."""
     return {"email": "test@example.com", "password": "testpassword123", "full_name": "Test User"}
+
+
+@pytest_asyncio.fixture
+async def authed_headers(db_session: AsyncSession, sample_user_data):
+    """Authorization headers for the sample user, skipping the register and login requests.
+
+    The user is inserted directly with a placeholder hash, so no password hashing runs;
+    tests of registration and login themselves still go through the endpoints.
+    """
+    user = User(
+        email=sample_user_data["email"],
+        full_name=sample_user_data["full_name"],
+        hashed_password="fake_hash",
+        is_active=True,
+    )
+    db_session.add(user)
+    await db_session.commit()
+
+    token = create_access_token(user_token_claims(user))
+    return {"Authorization": f"Bearer {token}"}
@@ -0,0 +1,151 @@
+"""Unit tests for emergency email service."""
+
+import asyncio
+from email.message import EmailMessage
+from unittest.mock import AsyncMock, Mock, patch
+
+import aiosmtplib
+import pytest
+
+from pathpal_api.features.alerts.email_service import (
+    EmergencyEmailService,
+    SMTPConnectionPool,
+    mail_config,
+)
+
+
+def _mock_smtp_client():
+    """Create a connected mock aiosmtplib client."""
+    client = Mock()
+    client.is_connected = True
+    client.connect = AsyncMock()
+    client.login = AsyncMock()
+    client.send_message = AsyncMock()
+    client.quit = AsyncMock()
+    return client
+
+
+@pytest.mark.asyncio
+async def test_smtp_pool_reuses_connection_across_messages():
+    """Test that consecutive sends share one SMTP session."""
+    client = _mock_smtp_client()
+
+    with patch(
+        "pathpal_api.features.alerts.email_service.aiosmtplib.SMTP", return_value=client
+    ) as mock_smtp:
+        pool = SMTPConnectionPool(mail_config)
+        await pool.send_message(EmailMessage())
+        await pool.send_message(EmailMessage())
+
+    mock_smtp.assert_called_once()
+    client.connect.assert_awaited_once()
+    assert client.send_message.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_smtp_pool_reconnects_after_disconnect():
+    """Test that a dropped connection is reopened and the message retried."""
+    stale_client = _mock_smtp_client()
+    stale_client.send_message.side_effect = aiosmtplib.SMTPServerDisconnected("closed")
+    fresh_client = _mock_smtp_client()
+
+    with patch(
+        "pathpal_api.features.alerts.email_service.aiosmtplib.SMTP",
+        side_effect=[stale_client, fresh_client],
+    ):
+        pool = SMTPConnectionPool(mail_config)
+        await pool.send_message(EmailMessage())
+
+    fresh_client.send_message.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_smtp_pool_closes_connection_after_send_error():
+    """Test that a connection failing with a non-disconnect error is closed, not pooled."""
+    failing_client = _mock_smtp_client()
+    failing_client.send_message.side_effect = aiosmtplib.SMTPRecipientsRefused([])
+    fresh_client = _mock_smtp_client()
+
+    with patch(
+        "pathpal_api.features.alerts.email_service.aiosmtplib.SMTP",
+        side_effect=[failing_client, fresh_client],
+    ):
+        pool = SMTPConnectionPool(mail_config)
+        with pytest.raises(aiosmtplib.SMTPRecipientsRefused):
+            await pool.send_message(EmailMessage())
+        await pool.send_message(EmailMessage())
+
+    failing_client.close.assert_called_once()
+    fresh_client.send_message.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_smtp_pool_sends_concurrent_messages_in_parallel():
+    """Test that concurrent sends each get their own connection, up to the pool size."""
+    in_flight = 0
+    peak = 0
+
+    async def send_message(message):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0)
+        in_flight -= 1
+
+    clients = [_mock_smtp_client() for _ in range(3)]
+    for client in clients:
+        client.send_message.side_effect = send_message
+
+    with patch(
+        "pathpal_api.features.alerts.email_service.aiosmtplib.SMTP", side_effect=clients
+    ) as mock_smtp:
+        pool = SMTPConnectionPool(mail_config, max_connections=2)
+        await asyncio.gather(*(pool.send_message(EmailMessage()) for _ in range(3)))
+
+    # Two sessions opened for the first two sends; the third reused one of them
+    assert mock_smtp.call_count == 2
+    assert peak == 2
+
+
+@pytest.mark.asyncio
+async def test_send_fallback_alert_builds_html_message():
+    """Test fallback alert message headers and body."""
+    smtp_pool = Mock(send_message=AsyncMock())
+    service = EmergencyEmailService(smtp_pool)
+
+    result = await service.send_fallback_alert(
+        recipient_emails=["a@example.com", "b@example.com"],
+        user_name="Test User",
+        location_lat=40.7580,
+        location_lon=-73.9855,
+        timestamp="2024-01-01T12:00:00+00:00",
+    )
+
+    assert result is True
+    message = smtp_pool.send_message.await_args.args[0]
+    assert message["Bcc"] == "a@example.com, b@example.com"
+    assert message["To"] == mail_config.MAIL_FROM
+    assert "Test User" in message["Subject"]
+    assert "https://maps.google.com/?q=40.758,-73.9855" in message.get_content()
+
+
+@pytest.mark.asyncio
+async def test_send_emergency_alert_renders_template():
+    """Test emergency alert renders the compiled template with alert details."""
+    smtp_pool = Mock(send_message=AsyncMock())
+    service = EmergencyEmailService(smtp_pool)
+
+    result = await service.send_emergency_alert(
+        recipient_emails=["a@example.com"],
+        user_name="Test User",
+        location_lat=40.7580,
+        location_lon=-73.9855,
+        ai_analysis="User reports being followed near the library.",
+        timestamp="2024-01-01T12:00:00+00:00",
+    )
+
+    assert result is True
+    body = smtp_pool.send_message.await_args.args[0].get_content()
+    assert "Test User" in body
+    assert "User reports being followed near the library." in body
+    assert "https://maps.google.com/?q=40.758,-73.9855" in body
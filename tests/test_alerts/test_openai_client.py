@@ -1,6 +1,7 @@
 """Tests for OpenAI client with comprehensive mocking."""
 
-from unittest.mock import AsyncMock, patch
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
 
 import pytest
 
@@ -14,174 +15,138 @@ def audio_data():
     return b"fake_audio_data_for_testing"
 
 
-@pytest.mark.asyncio
-class TestOpenAIAlertClient:
-    """Test suite for OpenAI integration."""
-
-    async def test_transcribe_audio_success(self, audio_data):
-        """Test successful audio transcription."""
-        client = OpenAIAlertClient()
-
-        with patch.object(
-            client.client.audio.transcriptions, "create", new_callable=AsyncMock
-        ) as mock_create:
-            mock_create.return_value = "Help, someone is following me near the library!"
-
-            result = await client.transcribe_audio(audio_data, "test.wav")
+@pytest.fixture(scope="module")
+def openai_client():
+    """One client shared by the module; ``mock_openai`` swaps its SDK calls per test."""
+    return OpenAIAlertClient()
 
-            assert result == "Help, someone is following me near the library!"
-            mock_create.assert_called_once()
 
-    async def test_transcribe_audio_timeout(self, audio_data):
-        """Test transcription timeout handling."""
-        client = OpenAIAlertClient()
+@pytest.fixture(autouse=True)
+def mock_openai(openai_client, monkeypatch):
+    """Replace the SDK calls with fresh AsyncMocks; tests set their results directly."""
+    mocks = SimpleNamespace(transcribe=AsyncMock(), analyze=AsyncMock())
+    monkeypatch.setattr(openai_client.client.audio.transcriptions, "create", mocks.transcribe)
+    monkeypatch.setattr(openai_client.client.chat.completions, "create", mocks.analyze)
+    return mocks
 
-        with patch.object(
-            client.client.audio.transcriptions, "create", new_callable=AsyncMock
-        ) as mock_create:
-            mock_create.side_effect = TimeoutError()
 
-            with pytest.raises(TranscriptionError, match="timed out"):
-                await client.transcribe_audio(audio_data, "test.wav")
+def _completion(content: str) -> MagicMock:
+    """Build a chat completion response carrying ``content``.
 
-    async def test_transcribe_audio_api_error(self, audio_data):
-        """Test transcription API error handling."""
-        client = OpenAIAlertClient()
+    Only ``create`` is awaited; the response itself is read synchronously, as in the SDK.
+    """
+    return MagicMock(choices=[MagicMock(message=MagicMock(content=content))])
 
-        with patch.object(
-            client.client.audio.transcriptions, "create", new_callable=AsyncMock
-        ) as mock_create:
-            mock_create.side_effect = Exception("API Error")
 
-            with pytest.raises(TranscriptionError, match="Transcription failed"):
-                await client.transcribe_audio(audio_data, "test.wav")
-
-    async def test_transcribe_audio_empty_response(self, audio_data):
-        """Test transcription with empty response."""
-        client = OpenAIAlertClient()
-
-        with patch.object(
-            client.client.audio.transcriptions, "create", new_callable=AsyncMock
-        ) as mock_create:
-            mock_create.return_value = ""
-
-            result = await client.transcribe_audio(audio_data, "test.wav")
-
-            assert result == ""
+@pytest.mark.asyncio
+class TestOpenAIAlertClient:
+    """Test suite for OpenAI integration."""
 
-    async def test_analyze_emergency_transcript_success(self):
+    @pytest.mark.parametrize(
+        "filename, mock_return, mock_side_effect, expected_exc, expected",
+        [
+            (
+                "test.wav",
+                "Help, someone is following me near the library!",
+                None,
+                None,
+                "Help, someone is following me near the library!",
+            ),
+            ("audio.wav", "Test transcription", None, None, "Test transcription"),
+            ("emergency.mp3", "Test transcription", None, None, "Test transcription"),
+            ("alert.webm", "Test transcription", None, None, "Test transcription"),
+            ("test.wav", "", None, None, ""),
+            ("test.wav", None, TimeoutError(), TranscriptionError, "timed out"),
+            ("test.wav", None, Exception("API Error"), TranscriptionError, "Transcription failed"),
+        ],
+        ids=["success", "wav", "mp3", "webm", "empty_response", "timeout", "api_error"],
+    )
+    async def test_transcribe_audio(
+        self,
+        openai_client,
+        mock_openai,
+        audio_data,
+        filename,
+        mock_return,
+        mock_side_effect,
+        expected_exc,
+        expected,
+    ):
+        """Test transcription results and error handling."""
+        mock_openai.transcribe.return_value = mock_return
+        mock_openai.transcribe.side_effect = mock_side_effect
+
+        if expected_exc is None:
+            result = await openai_client.transcribe_audio(audio_data, filename)
+
+            assert result == expected
+            mock_openai.transcribe.assert_called_once()
+        else:
+            with pytest.raises(expected_exc, match=expected):
+                await openai_client.transcribe_audio(audio_data, filename)
+
+    async def test_analyze_emergency_transcript_success(self, openai_client, mock_openai):
         """Test successful emergency analysis."""
-        client = OpenAIAlertClient()
         transcript = "Help, someone is following me!"
+        mock_openai.analyze.return_value = _completion(
+            "User reports being followed - immediate assistance needed."
+        )
 
-        with patch.object(
-            client.client.chat.completions, "create", new_callable=AsyncMock
-        ) as mock_create:
-            mock_response = AsyncMock()
-            mock_response.choices = [AsyncMock()]
-            mock_response.choices[
-                0
-            ].message.content = "User reports being followed - immediate assistance needed."
-            mock_create.return_value = mock_response
-
-            result = await client.analyze_emergency_transcript(transcript)
+        result = await openai_client.analyze_emergency_transcript(transcript)
 
-            assert "being followed" in result
-            mock_create.assert_called_once()
+        assert "being followed" in result
+        mock_openai.analyze.assert_called_once()
 
-    async def test_analyze_empty_transcript(self):
+    async def test_analyze_empty_transcript(self, openai_client, mock_openai):
         """Test analysis with empty transcript."""
-        client = OpenAIAlertClient()
-
-        result = await client.analyze_emergency_transcript("")
+        result = await openai_client.analyze_emergency_transcript("")
 
         assert result == "The situation is unclear from the audio."
+        mock_openai.analyze.assert_not_called()
 
-    async def test_analyze_whitespace_only_transcript(self):
+    async def test_analyze_whitespace_only_transcript(self, openai_client, mock_openai):
         """Test analysis with whitespace-only transcript."""
-        client = OpenAIAlertClient()
-
-        result = await client.analyze_emergency_transcript("   \n\t  ")
+        result = await openai_client.analyze_emergency_transcript("   \n\t  ")
 
         assert result == "The situation is unclear from the audio."
+        mock_openai.analyze.assert_not_called()
 
-    async def test_analyze_emergency_transcript_timeout(self):
+    async def test_analyze_emergency_transcript_timeout(self, openai_client, mock_openai):
         """Test analysis timeout handling."""
-        client = OpenAIAlertClient()
-        transcript = "Help me!"
+        mock_openai.analyze.side_effect = TimeoutError()
 
-        with patch.object(
-            client.client.chat.completions, "create", new_callable=AsyncMock
-        ) as mock_create:
-            mock_create.side_effect = TimeoutError()
+        with pytest.raises(AnalysisError, match="timed out"):
+            await openai_client.analyze_emergency_transcript("Help me!")
 
-            with pytest.raises(AnalysisError, match="timed out"):
-                await client.analyze_emergency_transcript(transcript)
-
-    async def test_analyze_emergency_transcript_api_error(self):
+    async def test_analyze_emergency_transcript_api_error(self, openai_client, mock_openai):
         """Test analysis API error handling."""
-        client = OpenAIAlertClient()
-        transcript = "Help me!"
-
-        with patch.object(
-            client.client.chat.completions, "create", new_callable=AsyncMock
-        ) as mock_create:
-            mock_create.side_effect = Exception("API Error")
+        mock_openai.analyze.side_effect = Exception("API Error")
 
-            with pytest.raises(AnalysisError, match="Analysis failed"):
-                await client.analyze_emergency_transcript(transcript)
+        with pytest.raises(AnalysisError, match="Analysis failed"):
+            await openai_client.analyze_emergency_transcript("Help me!")
 
-    async def test_create_analysis_prompt(self):
+    async def test_create_analysis_prompt(self, openai_client):
         """Test analysis prompt creation."""
-        client = OpenAIAlertClient()
         transcript = "Help, I'm being followed!"
 
-        prompt = client._create_analysis_prompt(transcript)
+        prompt = openai_client._create_analysis_prompt(transcript)
 
         assert transcript in prompt
         assert "security expert" in prompt.lower()
         assert "one-sentence summary" in prompt.lower()
         assert "emergency alert" in prompt.lower()
 
-    async def test_transcribe_audio_with_different_filenames(self, audio_data):
-        """Test transcription with different filename formats."""
-        client = OpenAIAlertClient()
-        test_filenames = ["audio.wav", "emergency.mp3", "alert.webm"]
-
-        with patch.object(
-            client.client.audio.transcriptions, "create", new_callable=AsyncMock
-        ) as mock_create:
-            mock_create.return_value = "Test transcription"
-
-            for filename in test_filenames:
-                result = await client.transcribe_audio(audio_data, filename)
-                assert result == "Test transcription"
-
-    async def test_full_workflow_success(self, audio_data):
+    async def test_full_workflow_success(self, openai_client, mock_openai, audio_data):
         """Test complete workflow from transcription to analysis."""
-        client = OpenAIAlertClient()
-
-        # Mock transcription
-        with patch.object(
-            client.client.audio.transcriptions, "create", new_callable=AsyncMock
-        ) as mock_transcribe:
-            mock_transcribe.return_value = "Someone is following me, I need help!"
-
-            # Mock analysis
-            with patch.object(
-                client.client.chat.completions, "create", new_callable=AsyncMock
-            ) as mock_analyze:
-                mock_response = AsyncMock()
-                mock_response.choices = [AsyncMock()]
-                mock_response.choices[
-                    0
-                ].message.content = "User is being followed and needs immediate help."
-                mock_analyze.return_value = mock_response
-
-                # Execute full workflow
-                transcript = await client.transcribe_audio(audio_data, "test.wav")
-                analysis = await client.analyze_emergency_transcript(transcript)
-
-                assert transcript == "Someone is following me, I need help!"
-                assert "being followed" in analysis
-                assert "immediate help" in analysis
+        mock_openai.transcribe.return_value = "Someone is following me, I need help!"
+        mock_openai.analyze.return_value = _completion(
+            "User is being followed and needs immediate help."
+        )
+
+        # Execute full workflow
+        transcript = await openai_client.transcribe_audio(audio_data, "test.wav")
+        analysis = await openai_client.analyze_emergency_transcript(transcript)
+
+        assert transcript == "Someone is following me, I need help!"
+        assert "being followed" in analysis
+        assert "immediate help" in analysis
@@ -0,0 +1,193 @@
+"""Unit tests for alert processing services."""
+
+import asyncio
+from unittest.mock import AsyncMock, Mock, patch
+from uuid import uuid4
+
+import pytest
+
+from pathpal_api.database.models import EmergencyContact, User
+from pathpal_api.features.alerts import services
+from pathpal_api.features.alerts.exceptions import AlertProcessingError, TranscriptionError
+
+
+@pytest.fixture
+def alert_user():
+    """User triggering the alert."""
+    return User(
+        id=uuid4(),
+        email="user@example.com",
+        full_name="Test User",
+        hashed_password="fake_hash",
+        is_active=True,
+    )
+
+
+@pytest.mark.asyncio
+async def test_process_emergency_alert_overlaps_transcription_with_contacts(alert_user):
+    """Test that transcription starts before the contacts lookup completes."""
+    transcription_started = asyncio.Event()
+
+    async def transcribe_audio(audio_data, filename):
+        transcription_started.set()
+        return "Help, someone is following me!"
+
+    async def get_contacts(db, user_id):
+        await asyncio.wait_for(transcription_started.wait(), timeout=1)
+        return [EmergencyContact(user_id=user_id, contact_email="contact@example.com")]
+
+    openai_client = Mock(
+        transcribe_audio=transcribe_audio,
+        analyze_emergency_transcript=AsyncMock(return_value="User is being followed."),
+    )
+    email_service = Mock(send_emergency_alert=AsyncMock(return_value=True))
+    db = Mock(execute=AsyncMock(), commit=AsyncMock())
+
+    with patch.object(services, "_get_user_emergency_contacts", side_effect=get_contacts):
+        result = await services.process_emergency_alert(
+            db=db,
+            user=alert_user,
+            audio_data=b"audio",
+            filename="emergency.wav",
+            latitude=40.7580,
+            longitude=-73.9855,
+            openai_client=openai_client,
+            email_service=email_service,
+        )
+
+    assert result["status"] == "success"
+    assert result["contacts_notified"] == 1
+    email_service.send_emergency_alert.assert_awaited_once()
+    # Alert inserted as processing, then updated with the result
+    assert db.execute.await_count == 2
+    assert db.commit.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_process_emergency_alert_no_contacts_cancels_transcription(alert_user):
+    """Test that a missing contact list cancels the in-flight transcription."""
+    transcription_cancelled = asyncio.Event()
+
+    async def transcribe_audio(audio_data, filename):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            transcription_cancelled.set()
+            raise
+
+    async def get_contacts(db, user_id):
+        await asyncio.sleep(0)  # let the transcription start
+        return []
+
+    openai_client = Mock(transcribe_audio=transcribe_audio)
+
+    with patch.object(services, "_get_user_emergency_contacts", side_effect=get_contacts):
+        with pytest.raises(AlertProcessingError):
+            await services.process_emergency_alert(
+                db=Mock(),
+                user=alert_user,
+                audio_data=b"audio",
+                filename="emergency.wav",
+                latitude=40.7580,
+                longitude=-73.9855,
+                openai_client=openai_client,
+                email_service=Mock(),
+            )
+
+    await asyncio.wait_for(transcription_cancelled.wait(), timeout=1)
+
+
+@pytest.mark.asyncio
+async def test_process_emergency_alert_falls_back_when_transcription_fails(alert_user):
+    """Test that a transcription failure sends the fallback alert and records it."""
+    openai_client = Mock(transcribe_audio=AsyncMock(side_effect=TranscriptionError("down")))
+    email_service = Mock(send_fallback_alert=AsyncMock(return_value=True))
+    db = Mock(execute=AsyncMock(), commit=AsyncMock(), rollback=AsyncMock())
+    contacts = [EmergencyContact(user_id=alert_user.id, contact_email="contact@example.com")]
+
+    with patch.object(services, "_get_user_emergency_contacts", AsyncMock(return_value=contacts)):
+        result = await services.process_emergency_alert(
+            db=db,
+            user=alert_user,
+            audio_data=b"audio",
+            filename="emergency.wav",
+            latitude=40.7580,
+            longitude=-73.9855,
+            openai_client=openai_client,
+            email_service=email_service,
+        )
+
+    assert result["status"] == "fallback"
+    email_service.send_fallback_alert.assert_awaited_once()
+    fallback_update = db.execute.await_args_list[-1].args[0]
+    assert fallback_update.compile().params["processing_status"] == "fallback"
+
+
+@pytest.mark.asyncio
+async def test_process_emergency_alert_sends_when_alert_insert_fails(alert_user):
+    """Test that a failed alert insert is logged and the emergency email still goes out."""
+    openai_client = Mock(
+        transcribe_audio=AsyncMock(return_value="Help, someone is following me!"),
+        analyze_emergency_transcript=AsyncMock(return_value="User is being followed."),
+    )
+    email_service = Mock(send_emergency_alert=AsyncMock(return_value=True))
+    db = Mock(
+        execute=AsyncMock(side_effect=ConnectionError("database down")),
+        commit=AsyncMock(),
+        rollback=AsyncMock(),
+    )
+    contacts = [EmergencyContact(user_id=alert_user.id, contact_email="contact@example.com")]
+
+    with patch.object(services, "_get_user_emergency_contacts", AsyncMock(return_value=contacts)):
+        result = await services.process_emergency_alert(
+            db=db,
+            user=alert_user,
+            audio_data=b"audio",
+            filename="emergency.wav",
+            latitude=40.7580,
+            longitude=-73.9855,
+            openai_client=openai_client,
+            email_service=email_service,
+        )
+
+    assert result["status"] == "success"
+    email_service.send_emergency_alert.assert_awaited_once()
+    # Only the failed insert ran; no updates were attempted for the missing row
+    db.execute.assert_awaited_once()
+    db.rollback.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_process_emergency_alert_update_failure_sends_no_fallback(alert_user):
+    """Test that a failed update after the email goes out does not send the fallback too."""
+    openai_client = Mock(
+        transcribe_audio=AsyncMock(return_value="Help, someone is following me!"),
+        analyze_emergency_transcript=AsyncMock(return_value="User is being followed."),
+    )
+    email_service = Mock(
+        send_emergency_alert=AsyncMock(return_value=True),
+        send_fallback_alert=AsyncMock(return_value=True),
+    )
+    db = Mock(
+        # The insert succeeds; the success update fails
+        execute=AsyncMock(side_effect=[None, ConnectionError("database down")]),
+        commit=AsyncMock(),
+        rollback=AsyncMock(),
+    )
+    contacts = [EmergencyContact(user_id=alert_user.id, contact_email="contact@example.com")]
+
+    with patch.object(services, "_get_user_emergency_contacts", AsyncMock(return_value=contacts)):
+        result = await services.process_emergency_alert(
+            db=db,
+            user=alert_user,
+            audio_data=b"audio",
+            filename="emergency.wav",
+            latitude=40.7580,
+            longitude=-73.9855,
+            openai_client=openai_client,
+            email_service=email_service,
+        )
+
+    assert result["status"] == "success"
+    email_service.send_emergency_alert.assert_awaited_once()
+    email_service.send_fallback_alert.assert_not_awaited()
@@ -0,0 +1,14 @@
+"""Test fixtures for authentication functionality."""
+
+import pytest
+
+from pathpal_api.auth.security import get_password_hash
+
+# Passwords whose hashes the security tests verify against
+SAMPLE_PASSWORDS = ["", "a" * 1000, "test_password123", "!@#$%^&*()_+-=[]{}|;:,.<>?"]
+
+
+@pytest.fixture(scope="session")
+def password_hashes(fast_password_hasher):
+    """Hashes of the sample passwords, computed once for the test run."""
+    return {password: get_password_hash(password) for password in SAMPLE_PASSWORDS}
@@ -1,7 +1,33 @@
 """Integration tests for authentication API endpoints."""
 
+import asyncio
+import json
+from urllib.parse import urlencode
+from uuid import uuid4
+
+import bcrypt
 import pytest
 from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from pathpal_api.auth.security import create_access_token, user_token_claims
+from pathpal_api.database.models import User
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+FORM_HEADERS = {"Content-Type": "application/x-www-form-urlencoded"}
+
+
+@pytest.fixture(scope="module")
+def register_body(sample_user_data) -> bytes:
+    """Registration request body for the sample user, encoded once per module."""
+    return json.dumps(sample_user_data).encode()
+
+
+@pytest.fixture(scope="module")
+def login_body(sample_user_data) -> bytes:
+    """Login form body for the sample user, encoded once per module."""
+    login_data = {"username": sample_user_data["email"], "password": sample_user_data["password"]}
+    return urlencode(login_data).encode()
 
 
 @pytest.mark.asyncio
@@ -28,9 +54,11 @@ async def test_health_endpoint(async_client: AsyncClient):
 
 
 @pytest.mark.asyncio
-async def test_register_user_success(async_client: AsyncClient, sample_user_data):
+async def test_register_user_success(async_client: AsyncClient, sample_user_data, register_body):
     """Test successful user registration."""
-    response = await async_client.post("/auth/register", json=sample_user_data)
+    response = await async_client.post(
+        "/auth/register", content=register_body, headers=JSON_HEADERS
+    )
 
     assert response.status_code == 201
     data = response.json()
@@ -46,19 +74,36 @@ async def test_register_user_success(async_client: AsyncClient, sample_user_data
 
 
 @pytest.mark.asyncio
-async def test_register_user_duplicate_email(async_client: AsyncClient, sample_user_data):
+async def test_register_user_duplicate_email(async_client: AsyncClient, register_body):
     """Test registration with duplicate email."""
     # Register first user
-    response1 = await async_client.post("/auth/register", json=sample_user_data)
+    response1 = await async_client.post(
+        "/auth/register", content=register_body, headers=JSON_HEADERS
+    )
     assert response1.status_code == 201
 
     # Try to register with same email
-    response2 = await async_client.post("/auth/register", json=sample_user_data)
+    response2 = await async_client.post(
+        "/auth/register", content=register_body, headers=JSON_HEADERS
+    )
     assert response2.status_code == 400
     data = response2.json()
     assert "already registered" in data["detail"]
 
 
+@pytest.mark.asyncio
+async def test_register_user_duplicate_email_concurrent(
+    concurrent_client: AsyncClient, register_body
+):
+    """Test that of two simultaneous registrations with one email, exactly one succeeds."""
+    responses = await asyncio.gather(
+        concurrent_client.post("/auth/register", content=register_body, headers=JSON_HEADERS),
+        concurrent_client.post("/auth/register", content=register_body, headers=JSON_HEADERS),
+    )
+
+    assert sorted(response.status_code for response in responses) == [201, 400]
+
+
 @pytest.mark.asyncio
 async def test_register_user_invalid_email(async_client: AsyncClient):
     """Test registration with invalid email."""
@@ -86,14 +131,13 @@ async def test_register_user_short_password(async_client: AsyncClient):
 
 
 @pytest.mark.asyncio
-async def test_login_success(async_client: AsyncClient, sample_user_data):
+async def test_login_success(async_client: AsyncClient, register_body, login_body):
     """Test successful user login."""
     # Register user first
-    await async_client.post("/auth/register", json=sample_user_data)
+    await async_client.post("/auth/register", content=register_body, headers=JSON_HEADERS)
 
     # Login
-    login_data = {"username": sample_user_data["email"], "password": sample_user_data["password"]}
-    response = await async_client.post("/auth/token", data=login_data)
+    response = await async_client.post("/auth/token", content=login_body, headers=FORM_HEADERS)
 
     assert response.status_code == 200
     data = response.json()
@@ -103,10 +147,32 @@ async def test_login_success(async_client: AsyncClient, sample_user_data):
 
 
 @pytest.mark.asyncio
-async def test_login_wrong_password(async_client: AsyncClient, sample_user_data):
+async def test_login_legacy_bcrypt_user_upgrades_hash(
+    async_client: AsyncClient, db_session: AsyncSession, sample_user_data, login_body
+):
+    """Test that a user with a legacy passlib bcrypt hash can log in and is rehashed."""
+    password = sample_user_data["password"].encode()
+    user = User(
+        email=sample_user_data["email"],
+        full_name=sample_user_data["full_name"],
+        hashed_password=bcrypt.hashpw(password, bcrypt.gensalt(rounds=4)).decode(),
+        is_active=True,
+    )
+    db_session.add(user)
+    await db_session.commit()
+
+    response = await async_client.post("/auth/token", content=login_body, headers=FORM_HEADERS)
+
+    assert response.status_code == 200
+    await db_session.refresh(user)
+    assert user.hashed_password.startswith("$argon2id$")
+
+
+@pytest.mark.asyncio
+async def test_login_wrong_password(async_client: AsyncClient, sample_user_data, register_body):
     """Test login with wrong password."""
     # Register user first
-    await async_client.post("/auth/register", json=sample_user_data)
+    await async_client.post("/auth/register", content=register_body, headers=JSON_HEADERS)
 
     # Try login with wrong password
     login_data = {"username": sample_user_data["email"], "password": "wrong_password"}
@@ -129,18 +195,11 @@ async def test_login_nonexistent_user(async_client: AsyncClient):
 
 
 @pytest.mark.asyncio
-async def test_get_current_user_authenticated(async_client: AsyncClient, sample_user_data):
+async def test_get_current_user_authenticated(
+    async_client: AsyncClient, authed_headers, sample_user_data
+):
     """Test getting current user profile when authenticated."""
-    # Register and login
-    await async_client.post("/auth/register", json=sample_user_data)
-
-    login_data = {"username": sample_user_data["email"], "password": sample_user_data["password"]}
-    login_response = await async_client.post("/auth/token", data=login_data)
-    token = login_response.json()["access_token"]
-
-    # Get current user
-    headers = {"Authorization": f"Bearer {token}"}
-    response = await async_client.get("/auth/me", headers=headers)
+    response = await async_client.get("/auth/me", headers=authed_headers)
 
     assert response.status_code == 200
     data = response.json()
@@ -172,25 +231,48 @@ async def test_get_current_user_invalid_token(async_client: AsyncClient):
 
 
 @pytest.mark.asyncio
-async def test_add_emergency_contact(async_client: AsyncClient, sample_user_data):
+async def test_add_emergency_contact(async_client: AsyncClient, authed_headers):
     """Test adding emergency contact."""
-    # Register and login
-    await async_client.post("/auth/register", json=sample_user_data)
+    contact_data = {"contact_email": "emergency@example.com"}
+    response = await async_client.post(
+        "/auth/me/emergency-contacts", json=contact_data, headers=authed_headers
+    )
+
+    assert response.status_code == 200
+    data = response.json()
+    assert "emergency@example.com" in data["emergency_contacts"]
 
-    login_data = {"username": sample_user_data["email"], "password": sample_user_data["password"]}
-    login_response = await async_client.post("/auth/token", data=login_data)
-    token = login_response.json()["access_token"]
 
-    # Add emergency contact
+@pytest.mark.asyncio
+async def test_add_emergency_contact_duplicate(async_client: AsyncClient, authed_headers):
+    """Test adding the same emergency contact twice keeps a single entry."""
+    # Add the same emergency contact twice
     contact_data = {"contact_email": "emergency@example.com"}
-    headers = {"Authorization": f"Bearer {token}"}
+    await async_client.post(
+        "/auth/me/emergency-contacts", json=contact_data, headers=authed_headers
+    )
     response = await async_client.post(
-        "/auth/me/emergency-contacts", json=contact_data, headers=headers
+        "/auth/me/emergency-contacts", json=contact_data, headers=authed_headers
     )
 
     assert response.status_code == 200
     data = response.json()
-    assert "emergency@example.com" in data["emergency_contacts"]
+    assert data["emergency_contacts"] == ["emergency@example.com"]
+
+
+@pytest.mark.asyncio
+async def test_add_emergency_contact_deleted_user(async_client: AsyncClient):
+    """Test that a valid token for a deleted user gets a 404 rather than a server error."""
+    deleted_user = User(id=uuid4(), email="gone@example.com", full_name="Gone", is_active=True)
+    token = create_access_token(user_token_claims(deleted_user))
+
+    response = await async_client.post(
+        "/auth/me/emergency-contacts",
+        json={"contact_email": "emergency@example.com"},
+        headers={"Authorization": f"Bearer {token}"},
+    )
+
+    assert response.status_code == 404
 
 
 @pytest.mark.asyncio
@@ -203,23 +285,17 @@ async def test_add_emergency_contact_unauthorized(async_client: AsyncClient):
 
 
 @pytest.mark.asyncio
-async def test_remove_emergency_contact(async_client: AsyncClient, sample_user_data):
+async def test_remove_emergency_contact(async_client: AsyncClient, authed_headers):
     """Test removing emergency contact."""
-    # Register and login
-    await async_client.post("/auth/register", json=sample_user_data)
-
-    login_data = {"username": sample_user_data["email"], "password": sample_user_data["password"]}
-    login_response = await async_client.post("/auth/token", data=login_data)
-    token = login_response.json()["access_token"]
-    headers = {"Authorization": f"Bearer {token}"}
-
     # Add emergency contact first
     contact_data = {"contact_email": "emergency@example.com"}
-    await async_client.post("/auth/me/emergency-contacts", json=contact_data, headers=headers)
+    await async_client.post(
+        "/auth/me/emergency-contacts", json=contact_data, headers=authed_headers
+    )
 
     # Remove emergency contact
     response = await async_client.delete(
-        "/auth/me/emergency-contacts/emergency@example.com", headers=headers
+        "/auth/me/emergency-contacts/emergency@example.com", headers=authed_headers
     )
 
     assert response.status_code == 200
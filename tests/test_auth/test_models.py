@@ -1,15 +1,50 @@
 """Tests for database models."""
 
 from datetime import UTC, datetime
-from uuid import uuid4
+from uuid import UUID, uuid4
 
+import pytest
+
+from pathpal_api.database import models
 from pathpal_api.database.models import EmergencyContact, User
 
+CONTACT_USER_ID = uuid4()
+FROZEN_NOW = datetime(2024, 1, 1, 12, tzinfo=UTC)
+
+
+class _FrozenDatetime(datetime):
+    """datetime whose ``now`` always returns ``FROZEN_NOW``."""
+
+    @classmethod
+    def now(cls, tz=None):
+        return FROZEN_NOW if tz is None else FROZEN_NOW.astimezone(tz)
+
+
+@pytest.fixture(scope="module", autouse=True)
+def frozen_clock():
+    """Pin the timestamp default factories to ``FROZEN_NOW`` for this module."""
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(models, "datetime", _FrozenDatetime)
+        yield FROZEN_NOW
+
+
+@pytest.fixture(scope="module")
+def sample_user(frozen_clock):
+    """User built with default values, shared by read-only tests."""
+    return User(
+        email="test@example.com", hashed_password="hashed_password_here", full_name="Test User"
+    )
+
+
+@pytest.fixture(scope="module")
+def sample_contact(frozen_clock):
+    """EmergencyContact built with default values, shared by read-only tests."""
+    return EmergencyContact(user_id=CONTACT_USER_ID, contact_email="emergency@example.com")
+
 
 def test_user_model_creation():
     """Test User model creation."""
     user_id = uuid4()
-    now = datetime.now(UTC)
 
     user = User(
         id=user_id,
@@ -17,7 +52,7 @@ def test_user_model_creation():
         hashed_password="hashed_password_here",
         full_name="Test User",
         is_active=True,
-        created_at=now,
+        created_at=FROZEN_NOW,
     )
 
     assert user.id == user_id
@@ -25,118 +60,78 @@ def test_user_model_creation():
     assert user.hashed_password == "hashed_password_here"
     assert user.full_name == "Test User"
     assert user.is_active is True
-    assert user.created_at == now
+    assert user.created_at == FROZEN_NOW
     assert user.updated_at is None
 
 
-def test_user_model_defaults():
+def test_user_model_defaults(sample_user):
     """Test User model with default values."""
-    user = User(
-        email="test@example.com", hashed_password="hashed_password_here", full_name="Test User"
-    )
-
     # Should have UUID generated
-    assert user.id is not None
-    assert isinstance(user.id, type(uuid4()))
+    assert sample_user.id is not None
+    assert isinstance(sample_user.id, UUID)
 
     # Should have default values
-    assert user.is_active is True
-    assert isinstance(user.created_at, datetime)
-    assert user.updated_at is None
+    assert sample_user.is_active is True
+    assert sample_user.created_at == FROZEN_NOW
+    assert sample_user.updated_at is None
 
 
 def test_emergency_contact_model_creation():
     """Test EmergencyContact model creation."""
     user_id = uuid4()
     contact_id = uuid4()
-    now = datetime.now(UTC)
 
     contact = EmergencyContact(
-        id=contact_id, user_id=user_id, contact_email="emergency@example.com", created_at=now
+        id=contact_id, user_id=user_id, contact_email="emergency@example.com", created_at=FROZEN_NOW
     )
 
     assert contact.id == contact_id
     assert contact.user_id == user_id
     assert contact.contact_email == "emergency@example.com"
-    assert contact.created_at == now
+    assert contact.created_at == FROZEN_NOW
 
 
-def test_emergency_contact_model_defaults():
+def test_emergency_contact_model_defaults(sample_contact):
     """Test EmergencyContact model with default values."""
-    user_id = uuid4()
-
-    contact = EmergencyContact(user_id=user_id, contact_email="emergency@example.com")
-
     # Should have UUID generated
-    assert contact.id is not None
-    assert isinstance(contact.id, type(uuid4()))
+    assert sample_contact.id is not None
+    assert isinstance(sample_contact.id, UUID)
 
     # Should have default created_at
-    assert isinstance(contact.created_at, datetime)
+    assert sample_contact.created_at == FROZEN_NOW
 
     # Should maintain foreign key
-    assert contact.user_id == user_id
-
-
-def test_user_model_table_name():
-    """Test User model table configuration."""
-    assert User.__tablename__ == "users"
-
-
-def test_emergency_contact_model_table_name():
-    """Test EmergencyContact model table configuration."""
-    assert EmergencyContact.__tablename__ == "emergency_contacts"
-
+    assert sample_contact.user_id == CONTACT_USER_ID
 
-def test_user_email_constraints():
-    """Test User email field constraints."""
-    # Get email field info
-    email_field = User.model_fields["email"]
 
-    # Field should exist and be configured
-    assert email_field is not None
-    assert email_field.metadata is not None
-
-
-def test_user_full_name_constraints():
-    """Test User full_name field constraints."""
-    # Get full_name field info
-    full_name_field = User.model_fields["full_name"]
-
-    # Field should exist and be configured
-    assert full_name_field is not None
-    assert full_name_field.metadata is not None
+@pytest.mark.parametrize(
+    "model, table_name", [(User, "users"), (EmergencyContact, "emergency_contacts")]
+)
+def test_model_table_name(model, table_name):
+    """Test model table configuration."""
+    assert model.__tablename__ == table_name
 
 
-def test_emergency_contact_email_constraints():
-    """Test EmergencyContact contact_email field constraints."""
-    # Get contact_email field info
-    email_field = EmergencyContact.model_fields["contact_email"]
+@pytest.mark.parametrize(
+    "model, field_name",
+    [(User, "email"), (User, "full_name"), (EmergencyContact, "contact_email")],
+)
+def test_model_field_constraints(model, field_name):
+    """Test that constrained string fields are configured."""
+    field = model.model_fields[field_name]
 
     # Field should exist and be configured
-    assert email_field is not None
-    assert email_field.metadata is not None
+    assert field is not None
+    assert field.metadata is not None
 
 
-def test_user_string_representation():
-    """Test User model string representation."""
-    user = User(
-        email="test@example.com", hashed_password="hashed_password_here", full_name="Test User"
-    )
-
-    # Should be able to convert to string without error
-    str_repr = str(user)
-    assert isinstance(str_repr, str)
-    assert len(str_repr) > 0
-
-
-def test_emergency_contact_string_representation():
-    """Test EmergencyContact model string representation."""
-    user_id = uuid4()
-    contact = EmergencyContact(user_id=user_id, contact_email="emergency@example.com")
+@pytest.mark.parametrize("fixture_name", ["sample_user", "sample_contact"])
+def test_model_string_representation(fixture_name, request):
+    """Test model string representation."""
+    instance = request.getfixturevalue(fixture_name)
 
     # Should be able to convert to string without error
-    str_repr = str(contact)
+    str_repr = str(instance)
     assert isinstance(str_repr, str)
     assert len(str_repr) > 0
 
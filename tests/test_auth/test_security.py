@@ -1,20 +1,36 @@
 """Unit tests for authentication security functions."""
 
+from functools import partial
+from unittest.mock import AsyncMock, patch
+from uuid import uuid4
+
+import bcrypt
+import jwt
 import pytest
-from jose import jwt
+from hypothesis import given
+from hypothesis import settings as hypothesis_settings
+from hypothesis import strategies as st
 
 from pathpal_api.auth.security import (
+    authenticate_websocket_token,
     create_access_token,
+    get_current_user,
     get_password_hash,
+    password_needs_rehash,
+    user_token_claims,
     verify_password,
 )
+from pathpal_api.database.models import User
 from pathpal_api.settings import settings
 
+# Decode with the configured algorithm, bound once for the module
+_decode = partial(jwt.decode, algorithms=[settings.JWT_ALGORITHM])
+
 
-def test_password_hashing():
+def test_password_hashing(password_hashes):
     """Test password hashing and verification."""
     password = "test_password123"
-    hashed = get_password_hash(password)
+    hashed = password_hashes[password]
 
     # Hash should be different from original password
     assert hashed != password
@@ -25,9 +41,33 @@ def test_password_hashing():
     assert verify_password("wrong_password", hashed) is False
 
 
-def test_password_hashing_same_password():
+def test_password_hash_uses_argon2id(password_hashes):
+    """Test that hashes are Argon2id PHC strings with current parameters."""
+    hashed = password_hashes["test_password123"]
+
+    assert hashed.startswith("$argon2id$")
+    assert password_needs_rehash(hashed) is False
+
+
+def test_verify_password_invalid_hash():
+    """Test that malformed hashes fail verification instead of raising."""
+    assert verify_password("test_password123", "not-a-valid-hash") is False
+    assert password_needs_rehash("not-a-valid-hash") is True
+
+
+def test_verify_password_legacy_bcrypt_hash():
+    """Test that passlib bcrypt hashes still verify and are flagged for rehashing."""
+    hashed = bcrypt.hashpw(b"test_password123", bcrypt.gensalt(rounds=4)).decode()
+
+    assert verify_password("test_password123", hashed) is True
+    assert verify_password("wrong_password", hashed) is False
+    assert password_needs_rehash(hashed) is True
+
+
+@given(password=st.text(min_size=1, max_size=32))
+@hypothesis_settings(max_examples=15, deadline=None)
+def test_password_hashing_same_password(password):
     """Test that same password produces different hashes (due to salt)."""
-    password = "test_password123"
     hash1 = get_password_hash(password)
     hash2 = get_password_hash(password)
 
@@ -39,17 +79,20 @@ def test_password_hashing_same_password():
     assert verify_password(password, hash2) is True
 
 
-def test_jwt_token_creation():
-    """Test JWT token creation and validation."""
-    test_data = {"sub": "test_user_id"}
-    token = create_access_token(data=test_data)
+@pytest.fixture(scope="module")
+def jwt_token():
+    """Access token for a test subject, signed once for the module's read-only checks."""
+    return create_access_token(data={"sub": "test_user_id"})
 
-    assert token is not None
-    assert isinstance(token, str)
-    assert len(token) > 0
+
+def test_jwt_token_creation(jwt_token):
+    """Test JWT token creation and validation."""
+    assert jwt_token is not None
+    assert isinstance(jwt_token, str)
+    assert len(jwt_token) > 0
 
     # Decode token to verify contents
-    decoded = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
+    decoded = _decode(jwt_token, settings.JWT_SECRET_KEY)
     assert decoded["sub"] == "test_user_id"
     assert "exp" in decoded
 
@@ -66,35 +109,94 @@ def test_jwt_token_with_custom_expiry():
     assert isinstance(token, str)
 
     # Decode and check expiry
-    decoded = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
+    decoded = _decode(token, settings.JWT_SECRET_KEY)
     assert decoded["sub"] == "test_user_id"
     assert "exp" in decoded
 
 
-def test_jwt_token_invalid_secret():
+def test_jwt_token_invalid_secret(jwt_token):
     """Test JWT token validation with wrong secret."""
-    test_data = {"sub": "test_user_id"}
-    token = create_access_token(data=test_data)
-
     # Should fail with wrong secret
-    with pytest.raises(jwt.JWTError):
-        jwt.decode(token, "wrong_secret", algorithms=[settings.JWT_ALGORITHM])
+    with pytest.raises(jwt.InvalidTokenError):
+        _decode(jwt_token, "wrong_secret")
 
 
-def test_password_edge_cases():
+def test_password_edge_cases(password_hashes):
     """Test password hashing edge cases."""
     # Empty password
-    empty_hash = get_password_hash("")
+    empty_hash = password_hashes[""]
     assert verify_password("", empty_hash) is True
     assert verify_password("not_empty", empty_hash) is False
 
     # Very long password
     long_password = "a" * 1000
-    long_hash = get_password_hash(long_password)
+    long_hash = password_hashes[long_password]
     assert verify_password(long_password, long_hash) is True
     assert verify_password("different", long_hash) is False
 
     # Special characters
     special_password = "!@#$%^&*()_+-=[]{}|;:,.<>?"
-    special_hash = get_password_hash(special_password)
+    special_hash = password_hashes[special_password]
     assert verify_password(special_password, special_hash) is True
+
+
+def test_long_password_not_truncated(password_hashes):
+    """Test that Argon2id uses the whole password, unlike bcrypt's 72-byte limit."""
+    long_hash = password_hashes["a" * 1000]
+
+    assert verify_password("a" * 72, long_hash) is False
+    assert verify_password("a" * 999, long_hash) is False
+
+
+@pytest.mark.asyncio
+async def test_get_current_user_caches_decoded_token():
+    """Test that a repeated token is served from cache without a database lookup."""
+    user = User(
+        id=uuid4(), email="test@example.com", hashed_password="fake_hash", full_name="Test User"
+    )
+    token = create_access_token(data={"sub": str(user.id)})
+
+    with patch(
+        "pathpal_api.auth.security.get_user_by_id", new=AsyncMock(return_value=user)
+    ) as mock_get_user:
+        first = await get_current_user(token=token)
+        second = await get_current_user(token=token)
+
+    assert first is user
+    assert second.id == user.id
+    assert second.email == user.email
+    mock_get_user.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_get_current_user_from_token_claims():
+    """Test that tokens carrying user claims are resolved without a database lookup."""
+    user = User(
+        id=uuid4(), email="test@example.com", hashed_password="fake_hash", full_name="Test User"
+    )
+    token = create_access_token(data=user_token_claims(user))
+
+    with patch("pathpal_api.auth.security.get_user_by_id", new=AsyncMock()) as mock_get_user:
+        current_user = await get_current_user(token=token)
+
+    mock_get_user.assert_not_awaited()
+    assert current_user.id == user.id
+    assert current_user.email == user.email
+    assert current_user.full_name == user.full_name
+    assert current_user.is_active is True
+
+
+@pytest.mark.asyncio
+async def test_authenticate_websocket_token_caches_reconnects():
+    """Test that a reconnecting WebSocket client skips JWT verification."""
+    user = User(
+        id=uuid4(), email="test@example.com", hashed_password="fake_hash", full_name="Test User"
+    )
+    token = create_access_token(data=user_token_claims(user))
+
+    first = await authenticate_websocket_token(token)
+    with patch("pathpal_api.auth.security.decode_access_token") as mock_decode:
+        second = await authenticate_websocket_token(token)
+
+    mock_decode.assert_not_called()
+    assert second.id == first.id == user.id
@@ -0,0 +1,92 @@
+"""Unit tests for database schema upgrades."""
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import inspect, text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import StaticPool
+from sqlmodel import SQLModel
+
+from pathpal_api.database import models  # noqa: F401
+from pathpal_api.database.connection import upgrade_schema
+
+# Tables as created by releases before the upgrade steps existed
+OLD_SCHEMA = [
+    "CREATE TABLE users (id CHAR(32) PRIMARY KEY, email VARCHAR(254))",
+    "CREATE TABLE emergency_contacts ("
+    "id CHAR(32) PRIMARY KEY, user_id CHAR(32), contact_email VARCHAR(254), created_at DATETIME)",
+    "CREATE TABLE trips (id CHAR(32) PRIMARY KEY, owner_id CHAR(32), created_at DATETIME)",
+]
+
+
+def _schema(connection):
+    """Summarize the parts of the schema the upgrade steps manage."""
+    inspector = inspect(connection)
+    return {
+        "trip_columns": {column["name"] for column in inspector.get_columns("trips")},
+        "trip_indexes": {index["name"] for index in inspector.get_indexes("trips")},
+        "contact_uniques": {
+            index["name"]
+            for index in inspector.get_indexes("emergency_contacts")
+            if index["unique"]
+        },
+    }
+
+
+@pytest_asyncio.fixture
+async def old_database():
+    """In-memory database holding tables from before the upgrade steps existed."""
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        for statement in OLD_SCHEMA:
+            await conn.execute(text(statement))
+        # Duplicate contacts could be stored before the unique constraint
+        for contact_id in ("a", "b"):
+            await conn.execute(
+                text(
+                    "INSERT INTO emergency_contacts (id, user_id, contact_email) "
+                    "VALUES (:id, 'user', 'contact@example.com')"
+                ),
+                {"id": contact_id},
+            )
+        await conn.run_sync(SQLModel.metadata.create_all)
+    yield engine
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_upgrade_schema_brings_old_tables_up_to_date(old_database):
+    """Test that existing tables gain the new column, unique index and trip index."""
+    async with old_database.begin() as conn:
+        await conn.run_sync(upgrade_schema)
+        schema = await conn.run_sync(_schema)
+        contact_count = await conn.scalar(text("SELECT COUNT(*) FROM emergency_contacts"))
+
+    assert "route_coordinates" in schema["trip_columns"]
+    assert "ix_trips_owner_created_at_id" in schema["trip_indexes"]
+    assert "uq_user_contact" in schema["contact_uniques"]
+    assert contact_count == 1
+
+
+@pytest.mark.asyncio
+async def test_upgrade_schema_is_idempotent(old_database):
+    """Test that running the upgrade again changes nothing."""
+    async with old_database.begin() as conn:
+        await conn.run_sync(upgrade_schema)
+        upgraded = await conn.run_sync(_schema)
+        await conn.run_sync(upgrade_schema)
+
+        assert await conn.run_sync(_schema) == upgraded
+
+
+@pytest.mark.asyncio
+async def test_upgrade_schema_leaves_new_database_unchanged():
+    """Test that a database created from the current models needs no upgrade."""
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+        created = await conn.run_sync(_schema)
+        await conn.run_sync(upgrade_schema)
+
+        assert await conn.run_sync(_schema) == created
+    await engine.dispose()
@@ -1,17 +1,123 @@
 """Test fixtures for trip functionality."""
 
-from unittest.mock import AsyncMock
+import inspect
 
 import httpx
 import pytest
+import pytest_asyncio
 
+from pathpal_api.features.trips.external_apis.geocoding import clear_geocode_cache
 from pathpal_api.features.trips.external_apis.mapbox_client import MapboxClient
 
 
+@pytest.fixture(autouse=True)
+def reset_geocode_cache():
+    """Clear cached geocoding results between tests."""
+    clear_geocode_cache()
+    yield
+    clear_geocode_cache()
+
+
+class MockMapboxAPI:
+    """Mapbox API stand-in served to a real httpx client through ``httpx.MockTransport``.
+
+    Directions requests get ``route`` and geocoding requests get ``places``. Tests
+    replace ``handler`` to return other responses (it may be async) or to raise
+    transport errors, and read ``requests`` to see what reached the API.
+    """
+
+    def __init__(self, route: dict, places: list[dict]):
+        self.route = route
+        self.places = places
+        self.requests: list[httpx.Request] = []
+        self.handler = self.default_handler
+
+    def default_handler(self, request: httpx.Request) -> httpx.Response:
+        """Answer with the sample route or places depending on the API called."""
+        if request.url.path.startswith("/directions/"):
+            return httpx.Response(200, json={"routes": [self.route]})
+        return httpx.Response(200, json={"features": self.places})
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        response = self.handler(request)
+        if inspect.isawaitable(response):
+            response = await response
+        return response
+
+
+class FakeResult:
+    """Query result over canned rows, supporting the accessors the trip services use."""
+
+    def __init__(self, rows: list):
+        self.rows = rows
+
+    def all(self) -> list:
+        return self.rows
+
+    def one_or_none(self):
+        return self.rows[0] if self.rows else None
+
+    def scalar_one_or_none(self):
+        return self.rows[0][0] if self.rows else None
+
+
+class FakeAsyncSession:
+    """AsyncSession stand-in answering queries from queues of canned results.
+
+    Each ``execute`` takes the next result queued with ``queue_result`` and each
+    ``scalar`` the next value from ``queue_scalar``; statements are kept in
+    ``executed`` so tests can check how many round-trips a service made.
+    """
+
+    def __init__(self):
+        self.added: list = []
+        self.executed: list = []
+        self.commits = 0
+        self._results: list[FakeResult] = []
+        self._scalars: list = []
+
+    def queue_result(self, rows: list) -> None:
+        self._results.append(FakeResult(rows))
+
+    def queue_scalar(self, value) -> None:
+        self._scalars.append(value)
+
+    def add(self, instance) -> None:
+        self.added.append(instance)
+
+    async def execute(self, statement) -> FakeResult:
+        self.executed.append(statement)
+        return self._results.pop(0)
+
+    async def scalar(self, statement):
+        self.executed.append(statement)
+        return self._scalars.pop(0)
+
+    async def commit(self) -> None:
+        self.commits += 1
+
+    async def refresh(self, instance) -> None:
+        pass
+
+
+@pytest.fixture
+def fake_db():
+    """Fake database session with no queued results."""
+    return FakeAsyncSession()
+
+
 @pytest.fixture
-def mock_http_client():
-    """Mock httpx.AsyncClient for testing."""
-    return AsyncMock(spec=httpx.AsyncClient)
+def mapbox_api(sample_mapbox_route, sample_geocoding_response):
+    """Mocked Mapbox API answering with the sample route and geocoding results."""
+    return MockMapboxAPI(sample_mapbox_route, sample_geocoding_response)
+
+
+@pytest_asyncio.fixture
+async def mock_http_client(mapbox_api):
+    """httpx.AsyncClient whose requests are served by ``mapbox_api``."""
+    async with httpx.AsyncClient(transport=httpx.MockTransport(mapbox_api)) as client:
+        yield client
 
 
 @pytest.fixture
@@ -20,9 +126,9 @@ def mapbox_client(mock_http_client):
     return MapboxClient(mock_http_client)
 
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def sample_mapbox_route():
-    """Sample Mapbox API route response."""
+    """Sample Mapbox API route response; shared, so tests must not mutate it."""
     return {
         "geometry": "sample_polyline_string",
         "distance": 1200.5,
@@ -32,9 +138,9 @@ def sample_mapbox_route():
     }
 
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def sample_geocoding_response():
-    """Sample Mapbox geocoding API response."""
+    """Sample Mapbox geocoding API response; shared, so tests must not mutate it."""
     return [
         {
             "geometry": {
@@ -0,0 +1,38 @@
+"""Unit tests for destination geocoding."""
+
+from unittest.mock import AsyncMock
+
+import pytest
+
+from pathpal_api.features.trips.exceptions import GeocodeError, MapboxAPIError
+from pathpal_api.features.trips.external_apis.geocoding import geocode_destination
+
+
+@pytest.mark.asyncio
+async def test_geocode_destination_caches_result(mapbox_client, sample_geocoding_response):
+    """Test that repeated destinations are served from the cache."""
+    mapbox_client.geocode_forward = AsyncMock(return_value=sample_geocoding_response)
+
+    first = await geocode_destination(mapbox_client, "Central Park")
+    second = await geocode_destination(mapbox_client, "  central   PARK ")
+
+    assert first == second == (40.733, -73.989)
+    mapbox_client.geocode_forward.assert_awaited_once_with("Central Park", limit=1)
+
+
+@pytest.mark.asyncio
+async def test_geocode_destination_does_not_cache_failures(
+    mapbox_client, sample_geocoding_response
+):
+    """Test that API errors and empty results are retried on the next call."""
+    mapbox_client.geocode_forward = AsyncMock(
+        side_effect=[MapboxAPIError("down"), [], sample_geocoding_response]
+    )
+
+    with pytest.raises(MapboxAPIError):
+        await geocode_destination(mapbox_client, "Central Park")
+    with pytest.raises(GeocodeError):
+        await geocode_destination(mapbox_client, "Central Park")
+
+    assert await geocode_destination(mapbox_client, "Central Park") == (40.733, -73.989)
+    assert mapbox_client.geocode_forward.await_count == 3
@@ -1,6 +1,8 @@
 """Integration tests for trip API handlers."""
 
-from unittest.mock import patch
+import struct
+from datetime import datetime
+from unittest.mock import AsyncMock, Mock, patch
 from uuid import uuid4
 
 import pytest
@@ -9,44 +11,68 @@ from httpx import AsyncClient
 from pathpal_api.auth.schemas import UserPublic
 from pathpal_api.auth.security import get_current_user
 from pathpal_api.features.trips import models as schemas
-from pathpal_api.features.trips.exceptions import GeocodeError, RouteCalculationError
+from pathpal_api.features.trips.exceptions import (
+    GeocodeError,
+    InvalidCursorError,
+    RouteCalculationError,
+)
+from pathpal_api.features.trips.handlers import get_mapbox_client
 from pathpal_api.main import app
 
 
-@pytest.fixture(autouse=True)
-def setup_http_client():
-    """Setup HTTP client for all tests."""
-    from unittest.mock import AsyncMock
+def _make_trip(**overrides) -> schemas.TripPublic:
+    """Build a trusted TripPublic for mocked service results, skipping validation."""
+    fields = {
+        "id": uuid4(),
+        "owner_id": uuid4(),
+        "destination_name": "Central Park",
+        "start_latitude": 40.733,
+        "start_longitude": -73.989,
+        "destination_latitude": 40.748,
+        "destination_longitude": -73.985,
+        "route_geometry": "encoded_polyline",
+        "distance_meters": 1200,
+        "duration_seconds": 900,
+        "travel_mode": schemas.TravelMode.WALKING,
+        "is_active": True,
+        "created_at": datetime(2024, 1, 1, 12, 0),
+        "completed_at": None,
+        "participant_count": 0,
+    }
+    return schemas.TripPublic.model_construct(**{**fields, **overrides})
+
 
-    mock_http_client = AsyncMock()
-    app.state.http_client = mock_http_client
-    yield
-    if hasattr(app.state, "http_client"):
-        delattr(app.state, "http_client")
+@pytest.fixture
+def http_client_mock(monkeypatch):
+    """Give the app a mock HTTP client for trip creation, restoring the real one afterwards."""
+    client = AsyncMock()
+    monkeypatch.setattr(app.state, "http_client", client, raising=False)
+    return client
 
 
 @pytest.fixture
-def mock_authentication():
+def mock_authentication(monkeypatch):
     """Mock authentication for trip handler tests."""
 
-    mock_user = UserPublic(
+    # Trusted values, so skip email validation and datetime parsing
+    mock_user = UserPublic.model_construct(
         id=uuid4(),
         email="test@example.com",
         full_name="Test User",
         is_active=True,
-        created_at="2024-01-01T12:00:00",
+        created_at=datetime(2024, 1, 1, 12, 0),
     )
 
     def mock_get_current_user_func():
         return mock_user
 
-    app.dependency_overrides[get_current_user] = mock_get_current_user_func
-    yield
-    app.dependency_overrides.clear()
+    monkeypatch.setitem(app.dependency_overrides, get_current_user, mock_get_current_user_func)
 
 
 @pytest.mark.asyncio
-async def test_create_trip_success(async_client: AsyncClient, mock_authentication):
+async def test_create_trip_success(
+    async_client: AsyncClient, mock_authentication, http_client_mock
+):
     """Test successful trip creation."""
     trip_data = {
         "destination_name": "Central Park",
@@ -56,22 +82,7 @@ async def test_create_trip_success(async_client: AsyncClient, mock_authenticatio
 
     # Mock the service call
     with patch("pathpal_api.features.trips.services.create_trip_with_route") as mock_create:
-        mock_trip = schemas.TripPublic(
-            id=uuid4(),
-            owner_id=uuid4(),
-            destination_name="Central Park",
-            start_latitude=40.733,
-            start_longitude=-73.989,
-            destination_latitude=40.748,
-            destination_longitude=-73.985,
-            route_geometry="encoded_polyline",
-            distance_meters=1200,
-            duration_seconds=900,
-            travel_mode=schemas.TravelMode.WALKING,
-            is_active=True,
-            created_at="2024-01-01T12:00:00",
-            participant_count=0,
-        )
+        mock_trip = _make_trip()
         mock_create.return_value = mock_trip
 
         response = await async_client.post("/trips/", json=trip_data)
@@ -84,7 +95,9 @@ async def test_create_trip_success(async_client: AsyncClient, mock_authenticatio
 
 
 @pytest.mark.asyncio
-async def test_create_trip_geocoding_error(async_client: AsyncClient):
+async def test_create_trip_geocoding_error(
+    async_client: AsyncClient, mock_authentication, http_client_mock
+):
     """Test trip creation with geocoding failure."""
     trip_data = {
         "destination_name": "NonexistentPlace12345",
@@ -102,7 +115,9 @@ async def test_create_trip_geocoding_error(async_client: AsyncClient):
 
 
 @pytest.mark.asyncio
-async def test_create_trip_route_calculation_error(async_client: AsyncClient):
+async def test_create_trip_route_calculation_error(
+    async_client: AsyncClient, mock_authentication, http_client_mock
+):
     """Test trip creation with route calculation failure."""
     trip_data = {
         "destination_name": "Unreachable Location",
@@ -133,28 +148,11 @@ async def test_create_trip_unauthorized(async_client: AsyncClient):
 
 
 @pytest.mark.asyncio
-async def test_list_trips_success(async_client: AsyncClient):
+async def test_list_trips_success(async_client: AsyncClient, mock_authentication):
     """Test successful trip listing."""
     with patch("pathpal_api.features.trips.services.get_user_trips") as mock_get_trips:
         mock_trip_list = schemas.TripList(
-            trips=[
-                schemas.TripPublic(
-                    id=uuid4(),
-                    owner_id=uuid4(),
-                    destination_name="Trip 1",
-                    start_latitude=40.733,
-                    start_longitude=-73.989,
-                    destination_latitude=40.748,
-                    destination_longitude=-73.985,
-                    route_geometry="encoded_polyline",
-                    distance_meters=1200,
-                    duration_seconds=900,
-                    travel_mode=schemas.TravelMode.WALKING,
-                    is_active=True,
-                    created_at="2024-01-01T12:00:00",
-                    participant_count=2,
-                )
-            ],
+            trips=[_make_trip(destination_name="Trip 1", participant_count=2)],
             total=1,
             page=1,
             page_size=20,
@@ -172,7 +170,7 @@ async def test_list_trips_success(async_client: AsyncClient):
 
 
 @pytest.mark.asyncio
-async def test_list_trips_with_pagination(async_client: AsyncClient):
+async def test_list_trips_with_pagination(async_client: AsyncClient, mock_authentication):
     """Test trip listing with pagination parameters."""
     with patch("pathpal_api.features.trips.services.get_user_trips") as mock_get_trips:
         mock_trip_list = schemas.TripList(trips=[], total=0, page=2, page_size=10)
@@ -192,27 +190,24 @@ async def test_list_trips_with_pagination(async_client: AsyncClient):
 
 
 @pytest.mark.asyncio
-async def test_get_trip_success(async_client: AsyncClient):
+async def test_list_trips_invalid_cursor(async_client: AsyncClient, mock_authentication):
+    """Test trip listing with a malformed pagination cursor."""
+    with patch("pathpal_api.features.trips.services.get_user_trips") as mock_get_trips:
+        mock_get_trips.side_effect = InvalidCursorError("Invalid pagination cursor")
+
+        response = await async_client.get("/trips/", params={"cursor": "not-a-cursor"})
+
+        assert response.status_code == 400
+        assert mock_get_trips.call_args[1]["cursor"] == "not-a-cursor"
+
+
+@pytest.mark.asyncio
+async def test_get_trip_success(async_client: AsyncClient, mock_authentication):
     """Test successful single trip retrieval."""
     trip_id = uuid4()
 
     with patch("pathpal_api.features.trips.services.get_trip_by_id") as mock_get_trip:
-        mock_trip = schemas.TripPublic(
-            id=trip_id,
-            owner_id=uuid4(),
-            destination_name="Test Trip",
-            start_latitude=40.733,
-            start_longitude=-73.989,
-            destination_latitude=40.748,
-            destination_longitude=-73.985,
-            route_geometry="encoded_polyline",
-            distance_meters=1200,
-            duration_seconds=900,
-            travel_mode=schemas.TravelMode.WALKING,
-            is_active=True,
-            created_at="2024-01-01T12:00:00",
-            participant_count=0,
-        )
+        mock_trip = _make_trip(id=trip_id, destination_name="Test Trip")
         mock_get_trip.return_value = mock_trip
 
         response = await async_client.get(f"/trips/{trip_id}")
@@ -224,7 +219,7 @@ async def test_get_trip_success(async_client: AsyncClient):
 
 
 @pytest.mark.asyncio
-async def test_get_trip_not_found(async_client: AsyncClient):
+async def test_get_trip_not_found(async_client: AsyncClient, mock_authentication):
     """Test single trip retrieval when trip not found."""
     trip_id = uuid4()
 
@@ -238,27 +233,16 @@ async def test_get_trip_not_found(async_client: AsyncClient):
 
 
 @pytest.mark.asyncio
-async def test_complete_trip_success(async_client: AsyncClient):
+async def test_complete_trip_success(async_client: AsyncClient, mock_authentication):
     """Test successful trip completion."""
     trip_id = uuid4()
 
     with patch("pathpal_api.features.trips.services.complete_trip") as mock_complete:
-        mock_trip = schemas.TripPublic(
+        mock_trip = _make_trip(
             id=trip_id,
-            owner_id=uuid4(),
             destination_name="Completed Trip",
-            start_latitude=40.733,
-            start_longitude=-73.989,
-            destination_latitude=40.748,
-            destination_longitude=-73.985,
-            route_geometry="encoded_polyline",
-            distance_meters=1200,
-            duration_seconds=900,
-            travel_mode=schemas.TravelMode.WALKING,
             is_active=False,  # Should be marked inactive
-            created_at="2024-01-01T12:00:00",
-            completed_at="2024-01-01T13:00:00",
-            participant_count=0,
+            completed_at=datetime(2024, 1, 1, 13, 0),
         )
         mock_complete.return_value = mock_trip
 
@@ -272,7 +256,7 @@ async def test_complete_trip_success(async_client: AsyncClient):
 
 
 @pytest.mark.asyncio
-async def test_get_route_geometry_success(async_client: AsyncClient):
+async def test_get_route_geometry_success(async_client: AsyncClient, mock_authentication):
     """Test successful route geometry retrieval."""
     trip_id = uuid4()
 
@@ -284,7 +268,104 @@ async def test_get_route_geometry_success(async_client: AsyncClient):
         response = await async_client.get(f"/trips/{trip_id}/route/geometry")
 
         assert response.status_code == 200
+        assert response.headers["vary"] == "Accept"
         data = response.json()
         assert "coordinates" in data
         assert len(data["coordinates"]) == 2
         assert data["coordinates"][0] == [40.733, -73.989]
+
+
+@pytest.mark.asyncio
+async def test_get_route_geometry_encoded(async_client: AsyncClient, mock_authentication):
+    """Test that encoded=1 returns the stored polyline without decoding it."""
+    trip_id = uuid4()
+
+    with (
+        patch("pathpal_api.features.trips.services.get_trip_route_polyline") as mock_polyline,
+        patch("pathpal_api.features.trips.services.get_trip_route_geometry") as mock_geometry,
+    ):
+        mock_polyline.return_value = schemas.RouteGeometryEncoded(
+            polyline="_p~iF~ps|U_ulLnnqC_mqNvxq`@"
+        )
+
+        response = await async_client.get(f"/trips/{trip_id}/route/geometry", params={"encoded": 1})
+
+        assert response.status_code == 200
+        assert response.headers["vary"] == "Accept"
+        assert response.json() == {"polyline": "_p~iF~ps|U_ulLnnqC_mqNvxq`@", "precision": 5}
+        mock_geometry.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_get_route_geometry_e5(async_client: AsyncClient, mock_authentication):
+    """Test that the e5 media type returns packed integer coordinates."""
+    trip_id = uuid4()
+
+    with patch("pathpal_api.features.trips.services.get_trip_route_e5") as mock_e5:
+        packed = struct.pack("<2i", 4073300, -7398900)
+        mock_e5.return_value = packed
+
+        response = await async_client.get(
+            f"/trips/{trip_id}/route/geometry",
+            headers={"Accept": "application/vnd.pathpal.route-e5"},
+        )
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/vnd.pathpal.route-e5"
+        assert response.headers["vary"] == "Accept"
+        assert response.content == packed
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    ("accept", "expected"),
+    [
+        ("application/vnd.pathpal.route-e5;q=0.5, application/json", "coordinates"),
+        ("application/vnd.pathpal.route-e5;q=0, */*", "coordinates"),
+        ("application/vnd.pathpal.route-e5x", "coordinates"),
+        ("*/*", "coordinates"),
+        ("text/html, application/vnd.pathpal.route-e5", "e5"),
+        (
+            "application/vnd.pathpal.polyline+json;q=0.9, application/vnd.pathpal.route-e5;q=0.8",
+            "polyline",
+        ),
+        ("application/vnd.pathpal.polyline+json, application/json;q=0.5", "polyline"),
+    ],
+)
+async def test_get_route_geometry_negotiates_accept(
+    async_client: AsyncClient, mock_authentication, accept, expected
+):
+    """Test that the geometry format follows Accept media ranges and their q-values."""
+    trip_id = uuid4()
+
+    with (
+        patch("pathpal_api.features.trips.services.get_trip_route_e5") as mock_e5,
+        patch("pathpal_api.features.trips.services.get_trip_route_polyline") as mock_polyline,
+        patch("pathpal_api.features.trips.services.get_trip_route_geometry") as mock_geometry,
+    ):
+        mock_e5.return_value = struct.pack("<2i", 4073300, -7398900)
+        mock_polyline.return_value = schemas.RouteGeometryEncoded(polyline="_p~iF~ps|U")
+        mock_geometry.return_value = schemas.RouteGeometry(coordinates=[[40.733, -73.989]])
+
+        response = await async_client.get(
+            f"/trips/{trip_id}/route/geometry", headers={"Accept": accept}
+        )
+
+    assert response.status_code == 200
+    called = {
+        "e5": mock_e5.called,
+        "polyline": mock_polyline.called,
+        "coordinates": mock_geometry.called,
+    }
+    assert called == {name: name == expected for name in called}
+
+
+@pytest.mark.asyncio
+async def test_get_mapbox_client_reuses_app_http_client():
+    """Test that Mapbox calls share the app-wide pooled HTTP client."""
+    request = Mock()
+    request.app.state.http_client = app.state.http_client
+
+    mapbox_client = await get_mapbox_client(request)
+
+    assert mapbox_client.client is app.state.http_client
@@ -1,98 +1,157 @@
 """Unit tests for Mapbox API client."""
 
-from unittest.mock import AsyncMock, Mock
+import asyncio
 
 import httpx
 import pytest
 
 from pathpal_api.features.trips.exceptions import MapboxAPIError, RouteCalculationError
 
+COORDINATES = [(-73.989, 40.733), (-73.985, 40.748)]
 
-@pytest.mark.asyncio
-async def test_get_directions_success(mapbox_client, sample_mapbox_route):
-    """Test successful route calculation."""
-    # Mock HTTP response - json() and raise_for_status() are synchronous in httpx
-    mock_response = Mock()
-    mock_response.json.return_value = {"routes": [sample_mapbox_route]}
-    mock_response.raise_for_status.return_value = None
-    mapbox_client.client.get = AsyncMock(return_value=mock_response)
 
-    coordinates = [(-73.989, 40.733), (-73.985, 40.748)]
-    result = await mapbox_client.get_directions(coordinates)
+def _mapbox_handler(behavior: str):
+    """Mapbox API handler producing the outcome named by ``behavior``."""
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if behavior == "api_error":
+            return httpx.Response(422, json={"message": "Invalid coordinates"})
+        if behavior == "network_error":
+            raise httpx.ConnectError("Network error", request=request)
+        return httpx.Response(200, json={"routes": []})
 
-    assert result == sample_mapbox_route
-    assert result["distance"] == 1200.5
-    assert result["geometry"] == "sample_polyline_string"
+    return handler
 
 
 @pytest.mark.asyncio
-async def test_get_directions_no_routes(mapbox_client):
-    """Test handling of no routes found."""
-    mock_response = Mock()
-    mock_response.json.return_value = {"routes": []}
-    mock_response.raise_for_status.return_value = None
-    mapbox_client.client.get = AsyncMock(return_value=mock_response)
+@pytest.mark.parametrize(
+    "behavior, coordinates, expected_exc, match",
+    [
+        ("success", COORDINATES, None, None),
+        ("no_routes", COORDINATES, RouteCalculationError, "No routes found"),
+        ("success", COORDINATES[:1], RouteCalculationError, "Need at least 2 coordinates"),
+        ("api_error", COORDINATES, RouteCalculationError, "Invalid coordinates"),
+        ("network_error", COORDINATES, MapboxAPIError, "Network error calling Mapbox"),
+    ],
+    ids=["success", "no_routes", "insufficient_coordinates", "api_error", "network_error"],
+)
+async def test_get_directions(
+    mapbox_client, mapbox_api, sample_mapbox_route, behavior, coordinates, expected_exc, match
+):
+    """Test route calculation results and error handling."""
+    if behavior != "success":
+        mapbox_api.handler = _mapbox_handler(behavior)
+
+    if expected_exc is None:
+        result = await mapbox_client.get_directions(coordinates)
+
+        assert result == sample_mapbox_route
+        assert result["distance"] == 1200.5
+        assert result["geometry"] == "sample_polyline_string"
+
+        (request,) = mapbox_api.requests
+        assert request.url.path == "/directions/v5/mapbox/walking/-73.989,40.733;-73.985,40.748"
+        assert request.url.params["geometries"] == "polyline"
+    else:
+        with pytest.raises(expected_exc, match=match):
+            await mapbox_client.get_directions(coordinates)
+
+
+@pytest.mark.asyncio
+async def test_geocode_forward_success(mapbox_client, mapbox_api, sample_geocoding_response):
+    """Test successful geocoding."""
+    result = await mapbox_client.geocode_forward("Central Park")
 
-    coordinates = [(-73.989, 40.733), (-73.985, 40.748)]
+    assert result == sample_geocoding_response
+    assert len(result) == 1
+    assert result[0]["place_name"] == "Central Park, New York, NY"
 
-    with pytest.raises(RouteCalculationError, match="No routes found"):
-        await mapbox_client.get_directions(coordinates)
+    (request,) = mapbox_api.requests
+    assert request.url.path == "/geocoding/v5/mapbox.places/Central Park.json"
+    assert request.url.params["limit"] == "5"
 
 
 @pytest.mark.asyncio
-async def test_get_directions_insufficient_coordinates(mapbox_client):
-    """Test error with insufficient coordinates."""
-    coordinates = [(-73.989, 40.733)]  # Only one coordinate
+async def test_geocode_forward_network_error(mapbox_client, mapbox_api):
+    """Test geocoding network error handling."""
+    mapbox_api.handler = _mapbox_handler("network_error")
 
-    with pytest.raises(RouteCalculationError, match="Need at least 2 coordinates"):
-        await mapbox_client.get_directions(coordinates)
+    with pytest.raises(MapboxAPIError, match="Network error calling geocoding"):
+        await mapbox_client.geocode_forward("Central Park")
 
 
 @pytest.mark.asyncio
-async def test_get_directions_api_error(mapbox_client):
-    """Test handling of Mapbox API errors."""
-    mock_response = AsyncMock()
-    mock_response.status_code = 422
-    mapbox_client.client.get.side_effect = httpx.HTTPStatusError(
-        "Invalid coordinates", request=None, response=mock_response
+async def test_concurrent_identical_requests_share_one_call(
+    mapbox_client, mapbox_api, sample_mapbox_route, sample_geocoding_response
+):
+    """Test that concurrent duplicate requests hit Mapbox once per distinct request."""
+    release = asyncio.Event()
+
+    async def slow_handler(request):
+        await release.wait()
+        return mapbox_api.default_handler(request)
+
+    mapbox_api.handler = slow_handler
+
+    pending = asyncio.gather(
+        mapbox_client.get_directions(COORDINATES),
+        mapbox_client.get_directions(COORDINATES),
+        mapbox_client.geocode_forward("Central Park"),
+        mapbox_client.geocode_forward("central park"),
     )
+    await asyncio.sleep(0)
+    release.set()
+    route_a, route_b, places_a, places_b = await pending
 
-    coordinates = [(-73.989, 40.733), (-73.985, 40.748)]
-
-    with pytest.raises(RouteCalculationError, match="Invalid coordinates"):
-        await mapbox_client.get_directions(coordinates)
+    assert route_a == route_b == sample_mapbox_route
+    assert places_a == places_b == sample_geocoding_response
+    assert len(mapbox_api.requests) == 2
 
 
 @pytest.mark.asyncio
-async def test_get_directions_network_error(mapbox_client):
-    """Test handling of network errors."""
-    mapbox_client.client.get.side_effect = httpx.RequestError("Network error")
+async def test_concurrent_requests_share_errors(mapbox_client, mapbox_api):
+    """Test that an in-flight failure is raised to every waiting caller."""
+    release = asyncio.Event()
 
-    coordinates = [(-73.989, 40.733), (-73.985, 40.748)]
+    async def failing_handler(request):
+        await release.wait()
+        raise httpx.ConnectError("Network error", request=request)
 
-    with pytest.raises(MapboxAPIError, match="Network error calling Mapbox"):
-        await mapbox_client.get_directions(coordinates)
+    mapbox_api.handler = failing_handler
 
+    pending = asyncio.gather(
+        mapbox_client.geocode_forward("Central Park"),
+        mapbox_client.geocode_forward("Central Park"),
+        return_exceptions=True,
+    )
+    await asyncio.sleep(0)
+    release.set()
+    results = await pending
 
-@pytest.mark.asyncio
-async def test_geocode_forward_success(mapbox_client, sample_geocoding_response):
-    """Test successful geocoding."""
-    mock_response = Mock()
-    mock_response.json.return_value = {"features": sample_geocoding_response}
-    mock_response.raise_for_status.return_value = None
-    mapbox_client.client.get = AsyncMock(return_value=mock_response)
-
-    result = await mapbox_client.geocode_forward("Central Park")
-
-    assert result == sample_geocoding_response
-    assert len(result) == 1
-    assert result[0]["place_name"] == "Central Park, New York, NY"
+    assert all(isinstance(result, MapboxAPIError) for result in results)
+    assert len(mapbox_api.requests) == 1
 
 
 @pytest.mark.asyncio
-async def test_geocode_forward_network_error(mapbox_client):
-    """Test geocoding network error handling."""
-    mapbox_client.client.get.side_effect = httpx.RequestError("Network error")
-
-    with pytest.raises(MapboxAPIError, match="Network error calling geocoding"):
-        await mapbox_client.geocode_forward("Central Park")
+async def test_cancelled_first_caller_keeps_shared_request(
+    mapbox_client, mapbox_api, sample_geocoding_response
+):
+    """Test that cancelling the caller who started a request doesn't fail the others."""
+    release = asyncio.Event()
+
+    async def slow_handler(request):
+        await release.wait()
+        return mapbox_api.default_handler(request)
+
+    mapbox_api.handler = slow_handler
+
+    first = asyncio.create_task(mapbox_client.geocode_forward("Central Park"))
+    second = asyncio.create_task(mapbox_client.geocode_forward("Central Park"))
+    await asyncio.sleep(0)
+    first.cancel()
+    release.set()
+
+    assert await second == sample_geocoding_response
+    with pytest.raises(asyncio.CancelledError):
+        await first
+    assert len(mapbox_api.requests) == 1
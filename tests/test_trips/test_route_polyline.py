@@ -0,0 +1,58 @@
+"""Unit tests for route polyline decoding."""
+
+import struct
+from unittest.mock import patch
+
+import polyline
+import pytest
+
+from pathpal_api.features.trips import route_polyline
+from pathpal_api.features.trips.route_polyline import decode_polyline, decode_polyline_e5
+
+
+@pytest.fixture(params=["native", "python"], autouse=True)
+def decoder_backend(request):
+    """Run each test against the Rust decoder and the pure-Python fallback."""
+    if request.param == "native":
+        if route_polyline._decode_polyline_ffi is None:
+            pytest.skip("pypolyline not installed")
+        yield
+    else:
+        with patch.object(route_polyline, "_decode_polyline_ffi", None):
+            yield
+
+
+def test_decode_polyline_matches_reference_example():
+    """Test decoding the reference example from the polyline algorithm docs."""
+    assert decode_polyline("_p~iF~ps|U_ulLnnqC_mqNvxq`@") == [
+        (38.5, -120.2),
+        (40.7, -120.95),
+        (43.252, -126.453),
+    ]
+
+
+def test_decode_polyline_matches_polyline_library():
+    """Test that decoding agrees with the polyline package on a long route."""
+    coordinates = [(40.7580 + i * 0.00013, -73.9855 - i * 0.00021) for i in range(500)]
+    encoded = polyline.encode(coordinates)
+
+    assert decode_polyline(encoded) == polyline.decode(encoded)
+
+
+def test_decode_polyline_empty():
+    """Test that an empty geometry decodes to no coordinates."""
+    assert decode_polyline("") == []
+
+
+def test_decode_polyline_e5_packs_scaled_integers():
+    """Test that integer decoding packs little-endian int32 lat/lon pairs."""
+    packed = decode_polyline_e5("_p~iF~ps|U_ulLnnqC_mqNvxq`@")
+
+    assert struct.unpack("<6i", packed) == (
+        3850000,
+        -12020000,
+        4070000,
+        -12095000,
+        4325200,
+        -12645300,
+    )
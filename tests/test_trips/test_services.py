@@ -1,14 +1,46 @@
 """Unit tests for trip services."""
 
-from unittest.mock import AsyncMock, patch
+from collections import namedtuple
+from unittest.mock import AsyncMock, Mock, patch
 from uuid import uuid4
 
 import pytest
 
-from pathpal_api.database.models import TravelMode, Trip, utcnow
+from pathpal_api.database.models import TravelMode, Trip, User, utcnow
 from pathpal_api.features.trips import models as schemas
 from pathpal_api.features.trips import services
-from pathpal_api.features.trips.exceptions import GeocodeError
+from pathpal_api.features.trips.exceptions import GeocodeError, InvalidCursorError
+
+# Shape of rows returned by the grouped trip list query
+Row = namedtuple("Row", ["Trip", "participant_count", "total"])
+
+# Start and destination sent for directions, as (lon, lat); compared pair by pair so
+# any sequence of pairs passes
+GEOCODED_ROUTE_COORDINATES = [(-73.989, 40.733), (-73.985, 40.748)]
+PROVIDED_ROUTE_COORDINATES = [(-73.989, 40.733), (-73.980, 40.750)]
+
+# Creation time shared by every trip built below
+CREATED_AT = utcnow()
+
+
+def _make_trip(**overrides) -> Trip:
+    """Build an active walking Trip row with sample route data."""
+    fields = {
+        "id": uuid4(),
+        "owner_id": uuid4(),
+        "destination_name": "Test Trip",
+        "start_latitude": 40.733,
+        "start_longitude": -73.989,
+        "destination_latitude": 40.748,
+        "destination_longitude": -73.985,
+        "route_geometry": "encoded_polyline",
+        "distance_meters": 1200,
+        "duration_seconds": 900,
+        "travel_mode": TravelMode.WALKING,
+        "is_active": True,
+        "created_at": CREATED_AT,
+    }
+    return Trip(**{**fields, **overrides})
 
 
 @pytest.mark.asyncio
@@ -24,13 +56,15 @@ async def test_create_trip_with_route_success():
         mock_geocode.return_value = (40.748, -73.985)  # lat, lon
 
         # Mock route calculation
-        mock_route_data = {"geometry": "sample_encoded_polyline", "distance": 1200, "duration": 900}
+        mock_route_data = {
+            "geometry": "_p~iF~ps|U_ulLnnqC_mqNvxq`@",
+            "distance": 1200,
+            "duration": 900,
+        }
         mock_mapbox_client.get_directions.return_value = mock_route_data
 
-        # Mock database operations
-        mock_db.add = AsyncMock()
-        mock_db.commit = AsyncMock()
-        mock_db.refresh = AsyncMock()
+        # Session.add is synchronous; commit and refresh stay AsyncMock children
+        mock_db.add = Mock()
 
         # Create trip request
         trip_request = schemas.TripCreate(
@@ -58,7 +92,7 @@ async def test_create_trip_with_route_success():
         mock_mapbox_client.get_directions.assert_called_once()
         call_args = mock_mapbox_client.get_directions.call_args
         coordinates = call_args[1]["coordinates"]
-        assert coordinates == [(-73.989, 40.733), (-73.985, 40.748)]  # lon, lat format
+        assert list(map(tuple, coordinates)) == GEOCODED_ROUTE_COORDINATES
 
 
 @pytest.mark.asyncio
@@ -69,13 +103,11 @@ async def test_create_trip_with_provided_coordinates():
     user_id = uuid4()
 
     # Mock route calculation
-    mock_route_data = {"geometry": "sample_encoded_polyline", "distance": 800, "duration": 600}
+    mock_route_data = {"geometry": "_p~iF~ps|U_ulLnnqC_mqNvxq`@", "distance": 800, "duration": 600}
     mock_mapbox_client.get_directions.return_value = mock_route_data
 
-    # Mock database operations
-    mock_db.add = AsyncMock()
-    mock_db.commit = AsyncMock()
-    mock_db.refresh = AsyncMock()
+    # Session.add is synchronous; commit and refresh stay AsyncMock children
+    mock_db.add = Mock()
 
     # Create trip request with explicit coordinates
     trip_request = schemas.TripCreate(
@@ -97,7 +129,68 @@ async def test_create_trip_with_provided_coordinates():
         mock_mapbox_client.get_directions.assert_called_once()
         call_args = mock_mapbox_client.get_directions.call_args
         coordinates = call_args[1]["coordinates"]
-        assert coordinates == [(-73.989, 40.733), (-73.980, 40.750)]
+        assert list(map(tuple, coordinates)) == PROVIDED_ROUTE_COORDINATES
+
+
+@pytest.mark.asyncio
+async def test_create_trip_keeps_route_geometry_encoded():
+    """Test that trip creation stores the polyline without decoding it."""
+    mock_db = AsyncMock()
+    mock_db.add = Mock()
+    mock_mapbox_client = AsyncMock()
+    mock_mapbox_client.get_directions.return_value = {
+        "geometry": "_p~iF~ps|U_ulLnnqC_mqNvxq`@",
+        "distance": 800,
+        "duration": 600,
+    }
+
+    trip_request = schemas.TripCreate(
+        destination_name="Custom Location",
+        destination_location=schemas.Location(latitude=40.750, longitude=-73.980),
+        start_location=schemas.Location(latitude=40.733, longitude=-73.989),
+    )
+
+    with patch("pathpal_api.features.trips.services.decode_polyline") as mock_decode:
+        result = await services.create_trip_with_route(
+            db=mock_db, trip_create=trip_request, user_id=uuid4(), mapbox_client=mock_mapbox_client
+        )
+
+    # Decoding is deferred to the route geometry endpoint
+    mock_decode.assert_not_called()
+    assert mock_db.add.call_args[0][0].route_coordinates is None
+    assert result.route_geometry == "_p~iF~ps|U_ulLnnqC_mqNvxq`@"
+
+
+@pytest.mark.asyncio
+async def test_get_trip_route_geometry_decodes_and_stores_on_first_request(fake_db):
+    """Test that a trip without stored coordinates is decoded once and saved."""
+    fake_db.queue_result([(None, "_p~iF~ps|U_ulLnnqC_mqNvxq`@")])
+    fake_db.queue_result([])  # the UPDATE storing the coordinates
+
+    geometry = await services.get_trip_route_geometry(db=fake_db, trip_id=uuid4(), user_id=uuid4())
+
+    expected = [[38.5, -120.2], [40.7, -120.95], [43.252, -126.453]]
+    assert geometry.coordinates == expected
+    store = fake_db.executed[-1]
+    assert store.compile().params["route_coordinates"] == expected
+    assert fake_db.commits == 1
+
+
+@pytest.mark.asyncio
+async def test_get_trip_route_geometry_reads_stored_coordinates():
+    """Test that stored route coordinates are returned without decoding."""
+    mock_db = AsyncMock()
+    mock_result = Mock()
+    mock_result.one_or_none.return_value = ([[40.733, -73.989], [40.748, -73.985]], "unused")
+    mock_db.execute.return_value = mock_result
+
+    with patch("pathpal_api.features.trips.services.decode_polyline") as mock_decode:
+        geometry = await services.get_trip_route_geometry(
+            db=mock_db, trip_id=uuid4(), user_id=uuid4()
+        )
+
+    mock_decode.assert_not_called()
+    assert geometry.coordinates == [[40.733, -73.989], [40.748, -73.985]]
 
 
 @pytest.mark.asyncio
@@ -127,107 +220,109 @@ async def test_create_trip_geocoding_failure():
 
 
 @pytest.mark.asyncio
-async def test_get_user_trips_pagination():
-    """Test paginated trip listing."""
-    mock_db = AsyncMock()
+async def test_get_user_trips_offset_page_counts_total(fake_db):
+    """Test offset pagination returns the total with the page and a cursor to continue."""
     user_id = uuid4()
 
-    # Mock database query results
-    mock_trips = [
-        Trip(
-            id=uuid4(),
-            owner_id=user_id,
-            destination_name="Trip 1",
-            start_latitude=40.733,
-            start_longitude=-73.989,
-            destination_latitude=40.748,
-            destination_longitude=-73.985,
-            route_geometry="encoded_polyline",
-            distance_meters=1200,
-            duration_seconds=900,
-            travel_mode=TravelMode.WALKING,
-            is_active=True,
-            created_at=utcnow(),
-        )
-    ]
-
-    # Mock database operations
-    from unittest.mock import Mock
-
-    mock_scalars = Mock()  # scalars() result should be synchronous
-    mock_scalars.all.return_value = mock_trips
-    mock_execute_result = Mock()  # Make execute result synchronous too
-    mock_execute_result.scalars.return_value = mock_scalars
-    mock_db.scalar = AsyncMock(side_effect=[10, 0])  # Total count, then participant count
-    mock_db.execute = AsyncMock(return_value=mock_execute_result)
+    # One full page, each row carrying its participant count and the total count
+    trip = _make_trip(owner_id=user_id, destination_name="Trip 1")
+    fake_db.queue_result([Row(trip, 2, 10)])
 
     result = await services.get_user_trips(
-        db=mock_db, user_id=user_id, page=1, page_size=20, active_only=False
+        db=fake_db, user_id=user_id, page=1, page_size=1, active_only=False
     )
 
     assert isinstance(result, schemas.TripList)
     assert result.total == 10
     assert result.page == 1
-    assert result.page_size == 20
+    assert result.page_size == 1
     assert len(result.trips) == 1
     assert result.trips[0].destination_name == "Trip 1"
+    assert result.trips[0].participant_count == 2
+    assert result.next_cursor == services.encode_trip_cursor(trip.created_at, trip.id)
+    assert len(fake_db.executed) == 1  # Counts come back with the page
+    assert "OFFSET" in str(fake_db.executed[0])
 
 
 @pytest.mark.asyncio
-async def test_complete_trip_success():
-    """Test successful trip completion."""
-    mock_db = AsyncMock()
+async def test_get_user_trips_cursor_page_seeks_without_counting(fake_db):
+    """Test cursor pages seek past (created_at, id) and skip the window count."""
     user_id = uuid4()
-    trip_id = uuid4()
+    trip = _make_trip(owner_id=user_id)
+    fake_db.queue_result([(trip, 0)])
 
-    # Mock trip
-    mock_trip = Trip(
-        id=trip_id,
-        owner_id=user_id,
-        destination_name="Test Trip",
-        start_latitude=40.733,
-        start_longitude=-73.989,
-        destination_latitude=40.748,
-        destination_longitude=-73.985,
-        route_geometry="encoded_polyline",
-        distance_meters=1200,
-        duration_seconds=900,
-        travel_mode=TravelMode.WALKING,
-        is_active=True,
-        created_at=utcnow(),
+    result = await services.get_user_trips(
+        db=fake_db,
+        user_id=user_id,
+        page=1,
+        page_size=20,
+        cursor=services.encode_trip_cursor(CREATED_AT, uuid4()),
     )
 
-    # Mock database operations
-    from unittest.mock import Mock
+    assert result.total is None
+    assert result.next_cursor is None  # short page, nothing after it
+    assert [trip_public.id for trip_public in result.trips] == [trip.id]
+
+    sql = str(fake_db.executed[0])
+    assert "(trips.created_at, trips.id) <" in sql
+    assert "OFFSET" not in sql
+    assert "count(*) OVER" not in sql
+
+
+@pytest.mark.asyncio
+async def test_get_user_trips_cursor_walks_every_trip_once(db_session):
+    """Test that following next_cursor visits each trip once, even with tied created_at."""
+    user = User(email="pager@example.com", full_name="Pager", hashed_password="fake_hash")
+    db_session.add(user)
+    trips = [_make_trip(owner_id=user.id) for _ in range(5)]  # all share CREATED_AT
+    db_session.add_all(trips)
+    await db_session.commit()
+
+    seen = []
+    cursor = None
+    while True:
+        page = await services.get_user_trips(
+            db=db_session, user_id=user.id, page=1, page_size=2, cursor=cursor
+        )
+        seen.extend(trip.id for trip in page.trips)
+        if page.next_cursor is None:
+            break
+        cursor = page.next_cursor
+
+    assert sorted(seen) == sorted(trip.id for trip in trips)
+    assert len(seen) == len(set(seen))
 
-    mock_execute_result = Mock()
-    mock_execute_result.scalar_one_or_none.return_value = mock_trip
-    mock_db.execute = AsyncMock(return_value=mock_execute_result)
-    mock_db.commit = AsyncMock()
-    mock_db.refresh = AsyncMock()
 
-    result = await services.complete_trip(db=mock_db, trip_id=trip_id, user_id=user_id)
+def test_decode_trip_cursor_rejects_malformed_cursor():
+    """Test that a cursor not produced by encode_trip_cursor raises InvalidCursorError."""
+    with pytest.raises(InvalidCursorError):
+        services.decode_trip_cursor("not-a-cursor")
+
+
+@pytest.mark.asyncio
+async def test_complete_trip_success(fake_db):
+    """Test successful trip completion."""
+    user_id = uuid4()
+    trip_id = uuid4()
+
+    fake_db.queue_result([(_make_trip(id=trip_id, owner_id=user_id),)])
+
+    result = await services.complete_trip(db=fake_db, trip_id=trip_id, user_id=user_id)
 
     assert isinstance(result, schemas.TripPublic)
     assert result.id == trip_id
     assert not result.is_active  # Should be marked as inactive
     assert result.completed_at is not None
+    assert fake_db.commits == 1
 
 
 @pytest.mark.asyncio
-async def test_complete_trip_not_found():
+async def test_complete_trip_not_found(fake_db):
     """Test trip completion when trip not found."""
-    mock_db = AsyncMock()
-    user_id = uuid4()
-    trip_id = uuid4()
-
-    # Mock no trip found
-    from unittest.mock import Mock
-
-    mock_execute_result = Mock()
-    mock_execute_result.scalar_one_or_none.return_value = None
-    mock_db.execute = AsyncMock(return_value=mock_execute_result)
+    # No trip found
+    fake_db.queue_result([])
 
-    result = await services.complete_trip(db=mock_db, trip_id=trip_id, user_id=user_id)
+    result = await services.complete_trip(db=fake_db, trip_id=uuid4(), user_id=uuid4())
 
     assert result is None
+    assert fake_db.commits == 0
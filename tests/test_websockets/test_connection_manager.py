@@ -1,222 +1,280 @@
 """Unit tests for WebSocket ConnectionManager."""
 
+import asyncio
+import json
 from unittest.mock import AsyncMock, Mock
 
 import pytest
 
-from pathpal_api.features.websockets.connection_manager import ConnectionManager
+from pathpal_api.features.websockets.connection_manager import (
+    ConnectionManager,
+    _pack_envelope,
+    _unpack_envelope,
+)
+from pathpal_api.features.websockets.models import MessageType
+from pathpal_api.features.websockets.services import render_participant_location
+
+TRIP_ID = "trip-123"
+USER_IDS = ("user-456", "user-789")
+
+
+@pytest.fixture
+def websockets():
+    """Two fresh mock websockets, one per entry in ``USER_IDS``."""
+    return AsyncMock(), AsyncMock()
+
+
+@pytest.fixture
+def manager():
+    """Fresh ConnectionManager."""
+    return ConnectionManager()
+
+
+def _join(manager, websockets, user_ids=USER_IDS):
+    """Register users as connected to ``TRIP_ID`` without going through ``connect``."""
+    for user_id, websocket in zip(user_ids, websockets[: len(user_ids)], strict=True):
+        manager.trip_users.setdefault(TRIP_ID, set()).add(user_id)
+        manager.user_connections[user_id] = websocket
+        manager.user_trip_mapping[user_id] = TRIP_ID
 
 
 class TestConnectionManager:
     """Test cases for ConnectionManager."""
 
-    def test_init(self):
+    def test_init(self, manager):
         """Test ConnectionManager initialization."""
-        manager = ConnectionManager()
-        assert manager.trip_connections == {}
+        assert manager.trip_users == {}
+        assert manager.user_connections == {}
         assert manager.user_trip_mapping == {}
 
     @pytest.mark.asyncio
-    async def test_connect_user_to_trip(self):
-        """Test connecting a user to a trip."""
-        manager = ConnectionManager()
-        websocket = AsyncMock()
-        trip_id = "trip-123"
-        user_id = "user-456"
-
-        await manager.connect(websocket, trip_id, user_id)
-
-        # Verify WebSocket was accepted
-        websocket.accept.assert_called_once()
+    @pytest.mark.parametrize("user_count", [1, 2], ids=["single_user", "multiple_users"])
+    async def test_connect_users_to_trip(self, manager, websockets, user_count):
+        """Test connecting one or more users to the same trip."""
+        user_ids = USER_IDS[:user_count]
+
+        # Connect concurrently so the users' trip registrations interleave
+        await asyncio.gather(
+            *(
+                manager.connect(websocket, TRIP_ID, user_id)
+                for user_id, websocket in zip(user_ids, websockets[: len(user_ids)], strict=True)
+            )
+        )
 
         # Verify connections are stored correctly
-        assert trip_id in manager.trip_connections
-        assert user_id in manager.trip_connections[trip_id]
-        assert manager.trip_connections[trip_id][user_id] == websocket
-        assert manager.user_trip_mapping[user_id] == trip_id
+        assert manager.trip_users[TRIP_ID] == set(user_ids)
+        for user_id, websocket in zip(user_ids, websockets[: len(user_ids)], strict=True):
+            websocket.accept.assert_called_once()
+            assert manager.user_connections[user_id] is websocket
+            assert manager.user_trip_mapping[user_id] == TRIP_ID
 
     @pytest.mark.asyncio
-    async def test_connect_multiple_users_to_trip(self):
-        """Test connecting multiple users to same trip."""
-        manager = ConnectionManager()
-        websocket1 = AsyncMock()
-        websocket2 = AsyncMock()
-        trip_id = "trip-123"
-        user1_id = "user-456"
-        user2_id = "user-789"
-
-        await manager.connect(websocket1, trip_id, user1_id)
-        await manager.connect(websocket2, trip_id, user2_id)
-
-        # Verify both users are in the same trip
-        assert len(manager.trip_connections[trip_id]) == 2
-        assert manager.trip_connections[trip_id][user1_id] == websocket1
-        assert manager.trip_connections[trip_id][user2_id] == websocket2
-
-    def test_disconnect_user(self):
-        """Test disconnecting a user from a trip."""
-        manager = ConnectionManager()
-        trip_id = "trip-123"
-        user_id = "user-456"
-        websocket = Mock()
+    async def test_connect_to_new_trip_leaves_previous_trip(self, manager, websockets):
+        """Test that switching trips drops the user from the old trip's broadcasts."""
+        user1_id, user2_id = USER_IDS
+        _join(manager, websockets)
 
-        # Manually set up connection
-        manager.trip_connections[trip_id] = {user_id: websocket}
-        manager.user_trip_mapping[user_id] = trip_id
+        await manager.connect(websockets[0], "trip-other", user1_id)
+        assert manager.trip_users[TRIP_ID] == {user2_id}
 
-        # Disconnect user
-        manager.disconnect(user_id)
+        # Broadcasting to the old trip after the user disconnects must not fail
+        manager.disconnect(user1_id)
+        await manager.broadcast_to_trip("hello", TRIP_ID)
+
+        websockets[1].send_text.assert_awaited_once_with("hello")
+        assert "trip-other" not in manager.trip_users
+
+    def test_disconnect_user(self, manager, websockets):
+        """Test disconnecting a user from a trip."""
+        _join(manager, websockets, USER_IDS[:1])
+
+        manager.disconnect(USER_IDS[0])
 
         # Verify user is removed
-        assert user_id not in manager.user_trip_mapping
-        assert trip_id not in manager.trip_connections  # Empty trip removed
+        assert USER_IDS[0] not in manager.user_trip_mapping
+        assert TRIP_ID not in manager.trip_users  # Empty trip removed
 
-    def test_disconnect_user_cleans_up_empty_trip(self):
+    def test_disconnect_user_cleans_up_empty_trip(self, manager, websockets):
         """Test that empty trips are cleaned up after last user disconnects."""
-        manager = ConnectionManager()
-        trip_id = "trip-123"
-        user1_id = "user-456"
-        user2_id = "user-789"
-        websocket1 = Mock()
-        websocket2 = Mock()
-
-        # Set up two users in same trip
-        manager.trip_connections[trip_id] = {user1_id: websocket1, user2_id: websocket2}
-        manager.user_trip_mapping[user1_id] = trip_id
-        manager.user_trip_mapping[user2_id] = trip_id
+        user1_id, user2_id = USER_IDS
+        _join(manager, websockets)
 
         # Disconnect first user
         manager.disconnect(user1_id)
 
         # Trip should still exist with second user
-        assert trip_id in manager.trip_connections
-        assert len(manager.trip_connections[trip_id]) == 1
+        assert manager.trip_users[TRIP_ID] == {user2_id}
 
         # Disconnect second user
         manager.disconnect(user2_id)
 
         # Trip should be cleaned up
-        assert trip_id not in manager.trip_connections
+        assert TRIP_ID not in manager.trip_users
 
-    def test_disconnect_nonexistent_user(self):
+    def test_disconnect_nonexistent_user(self, manager):
         """Test disconnecting a user that doesn't exist."""
-        manager = ConnectionManager()
         # Should not raise an error
         manager.disconnect("nonexistent-user")
 
     @pytest.mark.asyncio
-    async def test_send_personal_message_success(self):
-        """Test sending personal message to connected user."""
-        manager = ConnectionManager()
-        websocket = AsyncMock()
-        trip_id = "trip-123"
-        user_id = "user-456"
-        message = "test message"
+    @pytest.mark.parametrize(
+        "connected, send_error, delivered",
+        [(True, None, True), (False, None, False), (True, Exception("Connection lost"), False)],
+        ids=["success", "user_not_connected", "websocket_error"],
+    )
+    async def test_send_personal_message(
+        self, manager, websockets, connected, send_error, delivered
+    ):
+        """Test sending a personal message and handling users that can't receive it."""
+        websocket = websockets[0]
+        websocket.send_text.side_effect = send_error
+        if connected:
+            _join(manager, websockets[:1], USER_IDS[:1])
+
+        result = await manager.send_personal_message("test message", USER_IDS[0])
+
+        assert result is delivered
+        if connected:
+            websocket.send_text.assert_called_once_with("test message")
+        # Users whose socket fails are disconnected
+        assert (USER_IDS[0] in manager.user_trip_mapping) is delivered
 
-        # Set up connection
-        manager.trip_connections[trip_id] = {user_id: websocket}
-        manager.user_trip_mapping[user_id] = trip_id
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("exclude_user", [None, USER_IDS[0]], ids=["all_users", "exclude"])
+    async def test_broadcast_to_trip(self, manager, websockets, exclude_user):
+        """Test broadcasting to every user in a trip except the excluded one."""
+        _join(manager, websockets)
 
-        result = await manager.send_personal_message(message, user_id)
+        await manager.broadcast_to_trip("broadcast message", TRIP_ID, exclude_user=exclude_user)
 
-        assert result is True
-        websocket.send_text.assert_called_once_with(message)
+        for user_id, websocket in zip(USER_IDS, websockets, strict=True):
+            if user_id == exclude_user:
+                websocket.send_text.assert_not_called()
+            else:
+                websocket.send_text.assert_called_once_with("broadcast message")
 
     @pytest.mark.asyncio
-    async def test_send_personal_message_user_not_connected(self):
-        """Test sending message to user that's not connected."""
-        manager = ConnectionManager()
-        result = await manager.send_personal_message("test", "nonexistent-user")
-        assert result is False
+    async def test_broadcast_to_trip_disconnects_failed_sockets(self, manager, websockets):
+        """Test that a failed send drops only that user and others still receive."""
+        websocket1, websocket2 = websockets
+        websocket1.send_text.side_effect = Exception("Connection lost")
+        user1_id, user2_id = USER_IDS
+        _join(manager, websockets)
+
+        await manager.broadcast_to_trip("broadcast message", TRIP_ID)
+
+        websocket2.send_text.assert_called_once_with("broadcast message")
+        assert user1_id not in manager.user_trip_mapping
+        assert manager.get_trip_participants(TRIP_ID) == [user2_id]
 
     @pytest.mark.asyncio
-    async def test_send_personal_message_websocket_error(self):
-        """Test handling WebSocket error during personal message send."""
-        manager = ConnectionManager()
-        websocket = AsyncMock()
-        websocket.send_text.side_effect = Exception("Connection lost")
-        trip_id = "trip-123"
-        user_id = "user-456"
+    async def test_broadcast_to_trip_sends_bytes_to_binary_users(self, manager, websockets):
+        """Test that users who negotiated binary frames get the binary message."""
+        json_websocket, binary_websocket = websockets
+
+        await manager.connect(json_websocket, TRIP_ID, "user-456")
+        await manager.connect(binary_websocket, TRIP_ID, "user-789", subprotocol="pathpal.binary")
 
-        # Set up connection
-        manager.trip_connections[trip_id] = {user_id: websocket}
-        manager.user_trip_mapping[user_id] = trip_id
+        await manager.broadcast_to_trip("json message", TRIP_ID, binary_message=b"\x01frame")
 
-        result = await manager.send_personal_message("test", user_id)
+        binary_websocket.accept.assert_called_once_with(subprotocol="pathpal.binary")
+        json_websocket.send_text.assert_called_once_with("json message")
+        binary_websocket.send_bytes.assert_called_once_with(b"\x01frame")
+        binary_websocket.send_text.assert_not_called()
 
-        assert result is False
-        # User should be disconnected due to error
-        assert user_id not in manager.user_trip_mapping
+    @pytest.mark.asyncio
+    async def test_broadcast_to_nonexistent_trip(self, manager):
+        """Test broadcasting to trip that doesn't exist."""
+        # Should not raise error
+        await manager.broadcast_to_trip("message", "nonexistent-trip")
 
     @pytest.mark.asyncio
-    async def test_broadcast_to_trip(self):
-        """Test broadcasting message to all users in trip."""
-        manager = ConnectionManager()
-        websocket1 = AsyncMock()
-        websocket2 = AsyncMock()
-        trip_id = "trip-123"
-        user1_id = "user-456"
-        user2_id = "user-789"
-        message = "broadcast message"
-
-        # Set up connections
-        manager.trip_connections[trip_id] = {user1_id: websocket1, user2_id: websocket2}
-        manager.user_trip_mapping[user1_id] = trip_id
-        manager.user_trip_mapping[user2_id] = trip_id
-
-        await manager.broadcast_to_trip(message, trip_id)
-
-        # Both users should receive message
-        websocket1.send_text.assert_called_once_with(message)
-        websocket2.send_text.assert_called_once_with(message)
+    async def test_queue_location_coalesces_updates(self, websockets):
+        """Test that rapid updates from one user are broadcast once, latest wins."""
+        manager = ConnectionManager(location_interval=0)
+        websocket = websockets[1]
+        user_id = USER_IDS[0]
+        _join(manager, websockets[1:], USER_IDS[1:])
+
+        for latitude in (40.1, 40.2, 40.3):
+            message = render_participant_location(user_id, "Test User", latitude, -73.9)
+            manager.queue_location(TRIP_ID, user_id, message, b"frame")
+
+        await manager.location_tasks[TRIP_ID]
+
+        websocket.send_text.assert_called_once()
+        batch = json.loads(websocket.send_text.call_args[0][0])
+        assert batch["type"] == MessageType.PARTICIPANT_LOCATION_BATCH
+        assert [entry["location"]["latitude"] for entry in batch["locations"]] == [40.3]
+        assert TRIP_ID not in manager.location_tasks
 
     @pytest.mark.asyncio
-    async def test_broadcast_to_trip_exclude_user(self):
-        """Test broadcasting with excluded user."""
-        manager = ConnectionManager()
-        websocket1 = AsyncMock()
-        websocket2 = AsyncMock()
-        trip_id = "trip-123"
-        user1_id = "user-456"
-        user2_id = "user-789"
-        message = "broadcast message"
-
-        # Set up connections
-        manager.trip_connections[trip_id] = {user1_id: websocket1, user2_id: websocket2}
-
-        await manager.broadcast_to_trip(message, trip_id, exclude_user=user1_id)
-
-        # Only user2 should receive message
+    async def test_broadcast_to_trip_publishes_with_redis(self, manager, websockets):
+        """Test that broadcasts go through Redis, and relayed ones reach local sockets."""
+        manager.redis = AsyncMock()
+        websocket1, websocket2 = websockets
+        _join(manager, websockets)
+
+        await manager.broadcast_to_trip("broadcast message", TRIP_ID, exclude_user=USER_IDS[0])
+
+        websocket2.send_text.assert_not_called()
+        channel, envelope = manager.redis.publish.call_args[0]
+        assert channel == "trip:trip-123"
+
+        # What a relay task does with the published payload
+        message, exclude_user, binary_message = _unpack_envelope(envelope)
+        await manager._send_to_local(message, TRIP_ID, exclude_user, binary_message)
+
         websocket1.send_text.assert_not_called()
-        websocket2.send_text.assert_called_once_with(message)
+        websocket2.send_text.assert_called_once_with("broadcast message")
 
     @pytest.mark.asyncio
-    async def test_broadcast_to_nonexistent_trip(self):
-        """Test broadcasting to trip that doesn't exist."""
-        manager = ConnectionManager()
-        # Should not raise error
-        await manager.broadcast_to_trip("message", "nonexistent-trip")
+    async def test_broadcast_to_trip_falls_back_to_local_when_publish_fails(
+        self, manager, websockets
+    ):
+        """Test that a Redis outage still delivers broadcasts to this worker's sockets."""
+        manager.redis = AsyncMock()
+        manager.redis.publish.side_effect = ConnectionError("Redis down")
+        _join(manager, websockets)
+
+        await manager.broadcast_to_trip("broadcast message", TRIP_ID, exclude_user=USER_IDS[0])
 
-    def test_get_trip_participants(self):
+        websockets[0].send_text.assert_not_called()
+        websockets[1].send_text.assert_called_once_with("broadcast message")
+
+    @pytest.mark.asyncio
+    async def test_relay_resubscribes_after_failure(self, manager, websockets):
+        """Test that a relay whose subscription fails resubscribes and keeps relaying."""
+        manager.relay_retry_interval = 0
+        delivered = asyncio.Event()
+        websockets[1].send_text.side_effect = lambda message: delivered.set()
+
+        async def listen():
+            envelope = _pack_envelope("relayed message", None, None)
+            yield {"type": "message", "data": envelope}
+            await asyncio.Event().wait()  # stay subscribed until cancelled
+
+        failed = Mock(subscribe=AsyncMock(side_effect=ConnectionError("Redis down")))
+        failed.aclose = AsyncMock()
+        working = Mock(subscribe=AsyncMock(), listen=listen, aclose=AsyncMock())
+        manager.redis = Mock(pubsub=Mock(side_effect=[failed, working]))
+        _join(manager, websockets)
+
+        relay = asyncio.create_task(manager._relay_trip(TRIP_ID))
+        try:
+            await asyncio.wait_for(delivered.wait(), timeout=1)
+        finally:
+            relay.cancel()
+            await asyncio.gather(relay, return_exceptions=True)
+
+        failed.aclose.assert_awaited_once()
+        working.subscribe.assert_awaited_once_with("trip:trip-123")
+
+    @pytest.mark.parametrize("user_ids", [USER_IDS, ()], ids=["connected_users", "empty_trip"])
+    def test_get_trip_participants(self, manager, websockets, user_ids):
         """Test getting list of trip participants."""
-        manager = ConnectionManager()
-        trip_id = "trip-123"
-        user1_id = "user-456"
-        user2_id = "user-789"
-        websocket1 = Mock()
-        websocket2 = Mock()
-
-        # Set up connections
-        manager.trip_connections[trip_id] = {user1_id: websocket1, user2_id: websocket2}
-
-        participants = manager.get_trip_participants(trip_id)
-
-        assert len(participants) == 2
-        assert user1_id in participants
-        assert user2_id in participants
-
-    def test_get_trip_participants_empty_trip(self):
-        """Test getting participants for empty trip."""
-        manager = ConnectionManager()
-        participants = manager.get_trip_participants("nonexistent-trip")
-        assert participants == []
+        _join(manager, websockets, user_ids)
+
+        participants = manager.get_trip_participants(TRIP_ID)
+
+        assert sorted(participants) == sorted(user_ids)
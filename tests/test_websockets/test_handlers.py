@@ -1,251 +1,256 @@
 """Integration tests for WebSocket handlers."""
 
 import json
-from unittest.mock import patch
 from uuid import uuid4
 
 import pytest
 from fastapi.testclient import TestClient
 
 from pathpal_api.database.models import TravelMode, Trip, User
+from pathpal_api.features.websockets import handlers
+from pathpal_api.features.websockets.connection_manager import connection_manager
+from pathpal_api.features.websockets.exceptions import WebSocketAuthError
 from pathpal_api.features.websockets.models import MessageType
 from pathpal_api.main import app
 
-
-@pytest.fixture
-def sample_user():
-    """Create a sample user for testing."""
-    return User(
-        id=uuid4(),
-        email="test@example.com",
-        full_name="Test User",
-        hashed_password="fake_hash",
-        is_active=True,
-    )
-
-
-@pytest.fixture
-def sample_trip(sample_user):
-    """Create a sample active trip for testing."""
-    return Trip(
-        id=uuid4(),
-        owner_id=sample_user.id,
-        destination_name="Central Park",
-        start_latitude=40.7589,
-        start_longitude=-73.9851,
-        destination_latitude=40.7812,
-        destination_longitude=-73.9665,
-        route_geometry="sample_polyline",
-        distance_meters=1500,
-        duration_seconds=1200,
-        travel_mode=TravelMode.WALKING,
-        is_active=True,
-    )
-
-
-@pytest.fixture
+# Client messages, encoded once for the module
+LOCATION_UPDATE_MESSAGE = json.dumps(
+    {"type": MessageType.LOCATION_UPDATE, "latitude": 40.7580, "longitude": -73.9855}
+)
+INVALID_TYPE_MESSAGE = json.dumps({"type": "invalid_type", "data": "test"})
+INVALID_JSON_MESSAGE = "invalid json"
+# Latitude exceeds the maximum of 90
+INVALID_LATITUDE_MESSAGE = json.dumps(
+    {"type": MessageType.LOCATION_UPDATE, "latitude": 91.0, "longitude": -73.9855}
+)
+
+
+@pytest.fixture(scope="module")
+def user_factory():
+    """Build users with fresh IDs, overriding any default field."""
+
+    def make_user(**overrides) -> User:
+        fields = {
+            "email": "test@example.com",
+            "full_name": "Test User",
+            "hashed_password": "fake_hash",
+            "is_active": True,
+        }
+        return User(id=uuid4(), **{**fields, **overrides})
+
+    return make_user
+
+
+@pytest.fixture(scope="module")
+def trip_factory():
+    """Build active trips with fresh IDs for a given owner."""
+
+    def make_trip(owner: User, **overrides) -> Trip:
+        fields = {
+            "destination_name": "Central Park",
+            "start_latitude": 40.7589,
+            "start_longitude": -73.9851,
+            "destination_latitude": 40.7812,
+            "destination_longitude": -73.9665,
+            "route_geometry": "sample_polyline",
+            "distance_meters": 1500,
+            "duration_seconds": 1200,
+            "travel_mode": TravelMode.WALKING,
+            "is_active": True,
+        }
+        return Trip(id=uuid4(), owner_id=owner.id, **{**fields, **overrides})
+
+    return make_trip
+
+
+@pytest.fixture(scope="module")
+def sample_user(user_factory):
+    """Sample user shared by the module; tests must not mutate it."""
+    return user_factory()
+
+
+@pytest.fixture(scope="module")
+def sample_trip(trip_factory, sample_user):
+    """Sample active trip shared by the module; tests must not mutate it."""
+    return trip_factory(sample_user)
+
+
+@pytest.fixture(scope="module")
 def valid_jwt_token():
     """Return a valid JWT token for testing."""
     return "valid_jwt_token_here"
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def ws_client():
     """WebSocket test client."""
     return TestClient(app)
 
 
-class TestWebSocketEndpoint:
-    """Test cases for WebSocket endpoint."""
-
-    @pytest.mark.asyncio
-    async def test_websocket_connection_success(
-        self, ws_client, valid_jwt_token, sample_trip, sample_user
-    ):
-        """Test successful WebSocket connection with valid authentication."""
+@pytest.fixture(scope="module")
+def ws_state():
+    """Users by token and trips by ID that the WebSocket handler sees.
 
-        with patch("pathpal_api.auth.security.authenticate_websocket_token") as mock_auth:
-            mock_auth.return_value = sample_user
+    Token authentication and trip lookup are patched once for the module; tests
+    register what they need here instead of patching both per test. Unknown tokens
+    fail authentication and unknown trips are not found.
+    """
+    state: dict[str, dict] = {"users": {}, "trips": {}}
 
-            with patch("pathpal_api.features.trips.services.get_trip_by_id") as mock_get_trip:
-                mock_get_trip.return_value = sample_trip
+    async def authenticate_websocket_token(token):
+        user = state["users"].get(token)
+        if user is None:
+            raise WebSocketAuthError("Invalid token")
+        return user
 
-                with ws_client.websocket_connect(
-                    f"/ws/{sample_trip.id}?token={valid_jwt_token}"
-                ) as websocket:
-                    # Should receive connection acknowledgment
-                    data = websocket.receive_text()
-                    message = json.loads(data)
+    async def get_trip_by_id(db, trip_id, user_id):
+        return state["trips"].get(trip_id)
 
-                    assert message["type"] == MessageType.CONNECTION_ACK
-                    assert message["trip_id"] == str(sample_trip.id)
-                    assert message["participant_count"] == 1
-                    assert "Connected to trip: Central Park" in message["message"]
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(handlers, "authenticate_websocket_token", authenticate_websocket_token)
+        mp.setattr(handlers, "get_trip_by_id", get_trip_by_id)
+        yield state
 
-    @pytest.mark.asyncio
-    async def test_websocket_invalid_token(self, ws_client):
-        """Test WebSocket connection with invalid token."""
 
-        with patch("pathpal_api.auth.security.authenticate_websocket_token") as mock_auth:
-            from pathpal_api.features.websockets.exceptions import WebSocketAuthError
+@pytest.fixture(autouse=True)
+def reset_connection_manager():
+    """Drop sockets left registered by the previous test; the app itself is shared."""
+    yield
+    connection_manager.trip_users.clear()
+    connection_manager.user_connections.clear()
+    connection_manager.user_trip_mapping.clear()
+    connection_manager.binary_users.clear()
+    connection_manager.pending_locations.clear()
 
-            mock_auth.side_effect = WebSocketAuthError("Invalid token")
 
-            with pytest.raises(Exception):  # WebSocket connection should fail
-                with ws_client.websocket_connect("/ws/test-trip-id?token=invalid"):
-                    pass
+@pytest.fixture(autouse=True)
+def reset_ws_state(ws_state):
+    """Forget users and trips registered by the previous test."""
+    yield
+    for entries in ws_state.values():
+        entries.clear()
 
-    @pytest.mark.asyncio
-    async def test_websocket_trip_not_found(self, ws_client, valid_jwt_token, sample_user):
-        """Test WebSocket connection to non-existent trip."""
 
-        with patch("pathpal_api.auth.security.authenticate_websocket_token") as mock_auth:
-            mock_auth.return_value = sample_user
+@pytest.fixture
+def trip_url(ws_state, valid_jwt_token, sample_user, sample_trip):
+    """URL for the sample user to join the sample trip, both registered with the handler."""
+    ws_state["users"][valid_jwt_token] = sample_user
+    ws_state["trips"][str(sample_trip.id)] = sample_trip
+    return f"/ws/{sample_trip.id}?token={valid_jwt_token}"
 
-            with patch("pathpal_api.features.trips.services.get_trip_by_id") as mock_get_trip:
-                mock_get_trip.return_value = None  # Trip not found
 
-                with pytest.raises(Exception):  # Should close with error code
-                    with ws_client.websocket_connect(
-                        f"/ws/nonexistent-trip?token={valid_jwt_token}"
-                    ):
-                        pass
+class TestWebSocketEndpoint:
+    """Test cases for WebSocket endpoint."""
 
     @pytest.mark.asyncio
-    async def test_websocket_inactive_trip(
-        self, ws_client, valid_jwt_token, sample_trip, sample_user
-    ):
-        """Test WebSocket connection to inactive trip."""
+    async def test_websocket_connection_success(self, ws_client, trip_url, sample_trip):
+        """Test successful WebSocket connection with valid authentication."""
+        with ws_client.websocket_connect(trip_url) as websocket:
+            # Should receive connection acknowledgment
+            data = websocket.receive_text()
+            message = json.loads(data)
 
-        # Make trip inactive
-        sample_trip.is_active = False
+            assert message["type"] == MessageType.CONNECTION_ACK
+            assert message["trip_id"] == str(sample_trip.id)
+            assert message["participant_count"] == 1
+            assert "Connected to trip: Central Park" in message["message"]
 
-        with patch("pathpal_api.auth.security.authenticate_websocket_token") as mock_auth:
-            mock_auth.return_value = sample_user
+    @pytest.mark.asyncio
+    async def test_websocket_invalid_token(self, ws_client):
+        """Test WebSocket connection with invalid token."""
+        # No user is registered for the token, so authentication fails
+        with pytest.raises(Exception):  # WebSocket connection should fail
+            with ws_client.websocket_connect("/ws/test-trip-id?token=invalid"):
+                pass
 
-            with patch("pathpal_api.features.trips.services.get_trip_by_id") as mock_get_trip:
-                mock_get_trip.return_value = sample_trip
+    @pytest.mark.asyncio
+    async def test_websocket_trip_not_found(
+        self, ws_client, ws_state, valid_jwt_token, sample_user
+    ):
+        """Test WebSocket connection to non-existent trip."""
+        ws_state["users"][valid_jwt_token] = sample_user
 
-                with pytest.raises(Exception):  # Should close with error code
-                    with ws_client.websocket_connect(
-                        f"/ws/{sample_trip.id}?token={valid_jwt_token}"
-                    ):
-                        pass
+        with pytest.raises(Exception):  # Should close with error code
+            with ws_client.websocket_connect(f"/ws/nonexistent-trip?token={valid_jwt_token}"):
+                pass
 
     @pytest.mark.asyncio
-    async def test_location_update_message(
-        self, ws_client, valid_jwt_token, sample_trip, sample_user
+    async def test_websocket_inactive_trip(
+        self, ws_client, ws_state, trip_factory, valid_jwt_token, sample_user
     ):
-        """Test sending location update message."""
-
-        with patch("pathpal_api.auth.security.authenticate_websocket_token") as mock_auth:
-            mock_auth.return_value = sample_user
+        """Test WebSocket connection to inactive trip."""
+        # Its own trip, so the shared sample trip stays active
+        inactive_trip = trip_factory(sample_user, is_active=False)
+        ws_state["users"][valid_jwt_token] = sample_user
+        ws_state["trips"][str(inactive_trip.id)] = inactive_trip
 
-            with patch("pathpal_api.features.trips.services.get_trip_by_id") as mock_get_trip:
-                mock_get_trip.return_value = sample_trip
+        with pytest.raises(Exception):  # Should close with error code
+            with ws_client.websocket_connect(f"/ws/{inactive_trip.id}?token={valid_jwt_token}"):
+                pass
 
-                with ws_client.websocket_connect(
-                    f"/ws/{sample_trip.id}?token={valid_jwt_token}"
-                ) as websocket:
-                    # Receive connection ack
-                    websocket.receive_text()
+    @pytest.mark.asyncio
+    async def test_location_update_message(self, ws_client, trip_url):
+        """Test sending location update message."""
+        with ws_client.websocket_connect(trip_url) as websocket:
+            # Receive connection ack
+            websocket.receive_text()
 
-                    # Send location update
-                    location_update = {
-                        "type": MessageType.LOCATION_UPDATE,
-                        "latitude": 40.7580,
-                        "longitude": -73.9855,
-                    }
-                    websocket.send_text(json.dumps(location_update))
+            # Send location update
+            websocket.send_text(LOCATION_UPDATE_MESSAGE)
 
-                    # No direct response expected for location updates
-                    # The message should be processed successfully
+            # No direct response expected for location updates
+            # The message should be processed successfully
 
     @pytest.mark.asyncio
-    async def test_invalid_message_type(self, ws_client, valid_jwt_token, sample_trip, sample_user):
+    async def test_invalid_message_type(self, ws_client, trip_url):
         """Test sending message with invalid type."""
+        with ws_client.websocket_connect(trip_url) as websocket:
+            # Receive connection ack
+            websocket.receive_text()
 
-        with patch("pathpal_api.auth.security.authenticate_websocket_token") as mock_auth:
-            mock_auth.return_value = sample_user
+            # Send invalid message type
+            websocket.send_text(INVALID_TYPE_MESSAGE)
 
-            with patch("pathpal_api.features.trips.services.get_trip_by_id") as mock_get_trip:
-                mock_get_trip.return_value = sample_trip
+            # Should receive error message
+            response = websocket.receive_text()
+            error_message = json.loads(response)
 
-                with ws_client.websocket_connect(
-                    f"/ws/{sample_trip.id}?token={valid_jwt_token}"
-                ) as websocket:
-                    # Receive connection ack
-                    websocket.receive_text()
-
-                    # Send invalid message type
-                    invalid_message = {"type": "invalid_type", "data": "test"}
-                    websocket.send_text(json.dumps(invalid_message))
-
-                    # Should receive error message
-                    response = websocket.receive_text()
-                    error_message = json.loads(response)
-
-                    assert error_message["type"] == MessageType.ERROR
-                    assert "Unknown message type" in error_message["error"]
+            assert error_message["type"] == MessageType.ERROR
+            assert "Unknown message type" in error_message["error"]
 
     @pytest.mark.asyncio
-    async def test_invalid_json_message(self, ws_client, valid_jwt_token, sample_trip, sample_user):
+    async def test_invalid_json_message(self, ws_client, trip_url):
         """Test sending invalid JSON message."""
+        with ws_client.websocket_connect(trip_url) as websocket:
+            # Receive connection ack
+            websocket.receive_text()
 
-        with patch("pathpal_api.auth.security.authenticate_websocket_token") as mock_auth:
-            mock_auth.return_value = sample_user
-
-            with patch("pathpal_api.features.trips.services.get_trip_by_id") as mock_get_trip:
-                mock_get_trip.return_value = sample_trip
+            # Send invalid JSON
+            websocket.send_text(INVALID_JSON_MESSAGE)
 
-                with ws_client.websocket_connect(
-                    f"/ws/{sample_trip.id}?token={valid_jwt_token}"
-                ) as websocket:
-                    # Receive connection ack
-                    websocket.receive_text()
+            # Should receive error message
+            response = websocket.receive_text()
+            error_message = json.loads(response)
 
-                    # Send invalid JSON
-                    websocket.send_text("invalid json")
-
-                    # Should receive error message
-                    response = websocket.receive_text()
-                    error_message = json.loads(response)
-
-                    assert error_message["type"] == MessageType.ERROR
-                    assert error_message["error"] == "Invalid JSON format"
+            assert error_message["type"] == MessageType.ERROR
+            assert error_message["error"] == "Invalid JSON format"
 
     @pytest.mark.asyncio
-    async def test_location_update_invalid_coordinates(
-        self, ws_client, valid_jwt_token, sample_trip, sample_user
-    ):
+    async def test_location_update_invalid_coordinates(self, ws_client, trip_url):
         """Test location update with invalid coordinates."""
+        with ws_client.websocket_connect(trip_url) as websocket:
+            # Receive connection ack
+            websocket.receive_text()
 
-        with patch("pathpal_api.auth.security.authenticate_websocket_token") as mock_auth:
-            mock_auth.return_value = sample_user
+            # Send location update with invalid latitude (> 90)
+            websocket.send_text(INVALID_LATITUDE_MESSAGE)
 
-            with patch("pathpal_api.features.trips.services.get_trip_by_id") as mock_get_trip:
-                mock_get_trip.return_value = sample_trip
+            # Should receive error message
+            response = websocket.receive_text()
+            error_message = json.loads(response)
 
-                with ws_client.websocket_connect(
-                    f"/ws/{sample_trip.id}?token={valid_jwt_token}"
-                ) as websocket:
-                    # Receive connection ack
-                    websocket.receive_text()
-
-                    # Send location update with invalid latitude (> 90)
-                    invalid_location = {
-                        "type": MessageType.LOCATION_UPDATE,
-                        "latitude": 91.0,  # Invalid - exceeds max latitude
-                        "longitude": -73.9855,
-                    }
-                    websocket.send_text(json.dumps(invalid_location))
-
-                    # Should receive error message
-                    response = websocket.receive_text()
-                    error_message = json.loads(response)
-
-                    assert error_message["type"] == MessageType.ERROR
-                    assert "Message processing failed" in error_message["error"]
+            assert error_message["type"] == MessageType.ERROR
+            assert "Message processing failed" in error_message["error"]
 
 
 class TestWebSocketBroadcasting:
@@ -253,41 +258,25 @@ class TestWebSocketBroadcasting:
 
     @pytest.mark.asyncio
     async def test_multiple_users_same_trip(
-        self, ws_client, valid_jwt_token, sample_trip, sample_user
+        self, ws_client, ws_state, user_factory, trip_url, sample_trip
     ):
         """Test multiple users connected to same trip."""
 
-        # Create second user
-        user2 = User(
-            id=uuid4(),
-            email="test2@example.com",
-            full_name="Test User 2",
-            hashed_password="fake_hash",
-            is_active=True,
-        )
-
-        with patch("pathpal_api.auth.security.authenticate_websocket_token") as mock_auth:
-            with patch("pathpal_api.features.trips.services.get_trip_by_id") as mock_get_trip:
-                mock_get_trip.return_value = sample_trip
-
-                # Mock auth to return different users for different calls
-                mock_auth.side_effect = [sample_user, user2]
-
-                with ws_client.websocket_connect(
-                    f"/ws/{sample_trip.id}?token={valid_jwt_token}"
-                ) as ws1:
-                    with ws_client.websocket_connect(
-                        f"/ws/{sample_trip.id}?token={valid_jwt_token}"
-                    ) as ws2:
-                        # Both should receive connection acks
-                        ack1 = json.loads(ws1.receive_text())
-                        ack2 = json.loads(ws2.receive_text())
-
-                        assert ack1["type"] == MessageType.CONNECTION_ACK
-                        assert ack2["type"] == MessageType.CONNECTION_ACK
-
-                        # User 1 should receive notification that user 2 joined
-                        join_msg = json.loads(ws1.receive_text())
-                        assert join_msg["type"] == MessageType.PARTICIPANT_JOINED
-                        assert join_msg["user_id"] == str(user2.id)
-                        assert join_msg["participant_count"] == 2
+        # Create second user, authenticated by their own token
+        user2 = user_factory(email="test2@example.com", full_name="Test User 2")
+        ws_state["users"]["user2_jwt_token"] = user2
+
+        with ws_client.websocket_connect(trip_url) as ws1:
+            with ws_client.websocket_connect(f"/ws/{sample_trip.id}?token=user2_jwt_token") as ws2:
+                # Both should receive connection acks
+                ack1 = json.loads(ws1.receive_text())
+                ack2 = json.loads(ws2.receive_text())
+
+                assert ack1["type"] == MessageType.CONNECTION_ACK
+                assert ack2["type"] == MessageType.CONNECTION_ACK
+
+                # User 1 should receive notification that user 2 joined
+                join_msg = json.loads(ws1.receive_text())
+                assert join_msg["type"] == MessageType.PARTICIPANT_JOINED
+                assert join_msg["user_id"] == str(user2.id)
+                assert join_msg["participant_count"] == 2
@@ -0,0 +1,52 @@
+"""Unit tests for batched location history writes."""
+
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from pathpal_api.features.websockets.location_history import LocationHistoryWriter
+
+
+@pytest.mark.asyncio
+async def test_queued_rows_are_written_in_batches():
+    """Test that queued rows are flushed together, at most batch_size at a time."""
+    writer = LocationHistoryWriter(batch_size=2, flush_interval=60)
+
+    with patch.object(writer, "_write", new=AsyncMock()) as mock_write:
+        for i in range(3):
+            assert writer.put({"latitude": float(i)})
+        writer.start()
+        await asyncio.sleep(0)  # first batch fills up; the last row waits on the interval
+        await writer.stop()
+
+    batches = [call.args[0] for call in mock_write.await_args_list]
+    assert batches == [[{"latitude": 0.0}, {"latitude": 1.0}], [{"latitude": 2.0}]]
+
+
+@pytest.mark.asyncio
+async def test_stop_keeps_rows_being_written():
+    """Test that stopping during a write neither loses nor repeats that batch."""
+    writer = LocationHistoryWriter(batch_size=1, flush_interval=60)
+    written = []
+
+    async def slow_write(rows):
+        await asyncio.sleep(0.01)
+        written.extend(rows)
+
+    with patch.object(writer, "_write", new=slow_write):
+        for i in range(2):
+            assert writer.put({"latitude": float(i)})
+        writer.start()
+        await asyncio.sleep(0)  # the first row is now being written
+        await writer.stop()
+
+    assert written == [{"latitude": 0.0}, {"latitude": 1.0}]
+
+
+def test_put_drops_rows_when_queue_full():
+    """Test that a full queue drops new rows instead of blocking."""
+    writer = LocationHistoryWriter(batch_size=10, flush_interval=1, max_pending=1)
+
+    assert writer.put({"latitude": 1.0}) is True
+    assert writer.put({"latitude": 2.0}) is False
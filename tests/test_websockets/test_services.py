@@ -0,0 +1,21 @@
+"""Unit tests for location sharing services."""
+
+from uuid import uuid4
+
+from pathpal_api.features.websockets.models import Location, MessageType, ParticipantLocationMessage
+from pathpal_api.features.websockets.services import render_participant_location
+
+
+def test_render_participant_location_matches_model_json():
+    """Test that the fixed JSON template renders what the Pydantic model would."""
+    user_id = str(uuid4())
+    message = ParticipantLocationMessage(
+        type=MessageType.PARTICIPANT_LOCATION,
+        user_id=user_id,
+        full_name='Zoë "Z" Smith',
+        location=Location(latitude=40.7589, longitude=-73.9851),
+    )
+
+    rendered = render_participant_location(user_id, 'Zoë "Z" Smith', 40.7589, -73.9851)
+
+    assert rendered == message.model_dump_json()